@@ -0,0 +1,426 @@
+"""
+Motor de recomendação de acasalamentos (Genetic Match Engine).
+
+Os atributos das doadoras e dos garanhões são empacotados em arrays NumPy
+e a matriz doadora x garanhão de scores (genético, fertilidade, custo e
+penalidade de parentesco) é calculada numa única passada vetorizada. O
+top-k de cada doadora sai de `argpartition`, e rebanhos grandes são
+processados em blocos de doadoras para limitar a memória.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import numpy as np
+
+VERSAO_MODELO = 'xgboost_v1_demo'
+
+# Parâmetros econômicos do modelo de demonstração
+CUSTO_PROTOCOLO = 3500.0
+VALOR_BASE_POTRO = 25000.0
+PENALIDADE_PARENTESCO = 2.0
+BONUS_MESMA_RACA = 0.05
+BONUS_CATEGORIA = 0.05
+BLOCO_DOADORAS = 512
+
+class RecomendacaoAcasalamento:
+    """Resultado da avaliação de um par doadora x garanhão."""
+
+    def __init__(self, doadora_id, garanhao_id, garanhao_nome, score_final, score_genetico,
+                 taxa_prenhez_prevista, custo_estimado, valor_potro_estimado, roi_estimado,
+                 confianca, consanguinidade=0.0, justificativa='', fatores_positivos=None,
+                 fatores_atencao=None):
+        self.doadora_id = doadora_id
+        self.garanhao_id = garanhao_id
+        self.garanhao_nome = garanhao_nome
+        self.score_final = score_final
+        self.score_genetico = score_genetico
+        self.taxa_prenhez_prevista = taxa_prenhez_prevista
+        self.custo_estimado = custo_estimado
+        self.valor_potro_estimado = valor_potro_estimado
+        self.roi_estimado = roi_estimado
+        self.confianca = confianca
+        self.consanguinidade = consanguinidade
+        self.justificativa = justificativa
+        self.fatores_positivos = fatores_positivos or []
+        self.fatores_atencao = fatores_atencao or []
+
+    @property
+    def lucro_esperado(self):
+        return self.valor_potro_estimado * self.taxa_prenhez_prevista - self.custo_estimado
+
+    def to_dict(self):
+        return {
+            'doadora_id': self.doadora_id,
+            'garanhao_id': self.garanhao_id,
+            'garanhao_nome': self.garanhao_nome,
+            'score_final': round(self.score_final, 4),
+            'score_genetico': round(self.score_genetico, 4),
+            'taxa_prenhez_prevista': round(self.taxa_prenhez_prevista, 4),
+            'custo_estimado': round(self.custo_estimado, 2),
+            'valor_potro_estimado': round(self.valor_potro_estimado, 2),
+            'roi_estimado': round(self.roi_estimado, 4),
+            'lucro_esperado': round(self.lucro_esperado, 2),
+            'confianca': round(self.confianca, 4),
+            'consanguinidade': round(self.consanguinidade, 4),
+            'justificativa': self.justificativa,
+            'fatores_positivos': self.fatores_positivos,
+            'fatores_atencao': self.fatores_atencao
+        }
+
+def _idade(data_nascimento, agora):
+    if not data_nascimento:
+        return np.nan
+    return (agora - data_nascimento).days / 365.25
+
+def empacotar(animais, agora=None):
+    """Converte uma lista de dicts de animais em colunas NumPy."""
+    agora = agora or datetime.now()
+    def coluna(chave, padrao=0.0):
+        return np.array([a.get(chave) if a.get(chave) is not None else padrao for a in animais], dtype=float)
+    idades = np.array([_idade(a.get('data_nascimento'), agora) for a in animais], dtype=float)
+    return {
+        'id': [a['id'] for a in animais],
+        'nome': [a.get('nome') for a in animais],
+        'raca': np.array([a.get('raca') or '' for a in animais], dtype=object),
+        'tipo_morfologico': np.array([a.get('tipo_morfologico') or '' for a in animais], dtype=object),
+        'idade': np.nan_to_num(idades, nan=10.0),
+        'taxa_prenhez': coluna('taxa_prenhez_historica', 0.6),
+        'score_genetico': coluna('score_genetico', 0.5),
+        'performance_progenie': coluna('performance_media_progenie', 0.5),
+        'valor_cobertura': coluna('valor_cobertura', 0.0),
+    }
+
+# Limites da varredura Monte-Carlo, por requisição (o cliente só pode pedir menos)
+MAX_AMOSTRAS = int(os.environ.get('SIMULACAO_MAX_AMOSTRAS', 1_000_000))
+MAX_GRADE = 101
+LIMIAR_PROCESSOS = 500_000
+# Tamanho do pool de processos do worker, compartilhado entre as requisições
+MAX_PROCESSOS = int(os.environ.get('SIMULACAO_PROCESSOS', min(4, os.cpu_count() or 1)))
+DISTRIBUICOES = ('uniforme', 'normal', 'triangular')
+
+def _validar_spec(spec):
+    if spec is None or isinstance(spec, (int, float)):
+        return
+    if not isinstance(spec, dict):
+        raise ValueError("faixa deve ser um número ou um objeto")
+    tipo = spec.get('distribuicao', 'uniforme')
+    obrigatorios = {'uniforme': ('min', 'max'), 'normal': ('media', 'desvio'),
+                    'triangular': ('min', 'moda', 'max')}.get(tipo)
+    if obrigatorios is None:
+        raise ValueError(f"distribuicao deve ser uma de {', '.join(DISTRIBUICOES)}")
+    faltando = [c for c in obrigatorios if not isinstance(spec.get(c), (int, float))]
+    if faltando:
+        raise ValueError(f"distribuicao {tipo} exige {', '.join(faltando)}")
+    if tipo != 'normal' and spec['min'] > spec['max']:
+        raise ValueError("min maior que max")
+
+def _amostrar(spec, n, rng):
+    if spec is None:
+        return np.zeros(n)
+    if isinstance(spec, (int, float)):
+        return np.full(n, float(spec))
+    tipo = spec.get('distribuicao', 'uniforme')
+    if tipo == 'normal':
+        return rng.normal(spec['media'], spec['desvio'], n)
+    if tipo == 'triangular':
+        if spec['min'] == spec['max']:
+            return np.full(n, float(spec['min']))
+        return rng.triangular(spec['min'], spec['moda'], spec['max'], n)
+    return rng.uniform(spec['min'], spec['max'], n)
+
+def _limites(spec):
+    """Faixa usada nos eixos da grade (normal: média +- 2 desvios)."""
+    if spec is None:
+        return 0.0, 0.0
+    if isinstance(spec, (int, float)):
+        return float(spec), float(spec)
+    if spec.get('distribuicao') == 'normal':
+        return spec['media'] - 2 * spec['desvio'], spec['media'] + 2 * spec['desvio']
+    return float(spec['min']), float(spec['max'])
+
+# Sem fork: o worker gthread tem outras threads (e locks) que o filho herdaria travados
+CONTEXTO_PROCESSOS = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def _pool_simulacao():
+    """ProcessPoolExecutor único do worker, criado no primeiro uso (e de novo após um fork)."""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ProcessPoolExecutor(max_workers=MAX_PROCESSOS, mp_context=CONTEXTO_PROCESSOS)
+                _pool_pid = pid
+    return _pool
+
+def _descartar_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _validar_processos(processos):
+    if processos is None:
+        return 1
+    if isinstance(processos, bool) or not isinstance(processos, int):
+        raise ValueError("processos deve ser um número inteiro")
+    return max(1, min(processos, MAX_PROCESSOS))
+
+def _simular_bloco(tarefa):
+    """Amostra um bloco de cenários (função de módulo para rodar em subprocesso)."""
+    (valor_potro, custo, taxa), (spec_preco, spec_custo, spec_taxa), n, semente = tarefa
+    rng = np.random.default_rng(semente)
+    valor = valor_potro * (1 + _amostrar(spec_preco, n, rng))
+    custo_total = custo * (1 + _amostrar(spec_custo, n, rng))
+    taxas = np.clip(taxa * (1 + _amostrar(spec_taxa, n, rng)), 0.0, 1.0)
+    lucro = valor * taxas - custo_total
+    # Custo simulado pode chegar a zero numa distribuição normal larga
+    roi = np.divide(lucro, custo_total, out=np.zeros(n), where=np.abs(custo_total) > 1e-9)
+    return lucro, roi, float(taxas.mean())
+
+class MotorGenetico:
+    """Avaliação vetorizada de acasalamentos."""
+
+    feature_names = [
+        'idade_doadora', 'idade_garanhao', 'taxa_prenhez_doadora', 'taxa_prenhez_garanhao',
+        'score_genetico_doadora', 'score_genetico_garanhao', 'performance_media_progenie',
+        'valor_cobertura', 'compatibilidade_raca', 'categoria_objetivo', 'consanguinidade'
+    ]
+
+    def matriz_scores(self, D, G, parentesco=None, categoria_objetivo=None, orcamento_maximo=None,
+                      consanguinidade_maxima=None, prioridade_genetica=0.6, prioridade_financeira=0.4):
+        """Matrizes doadora x garanhão para doadoras D e garanhões G (empacotados).
+
+        `parentesco` é a matriz de coancestria (F esperado do potro); pares
+        fora do orçamento ou acima de `consanguinidade_maxima` ficam com
+        score_final = -inf.
+        """
+        m, s = len(D['id']), len(G['id'])
+        F = np.zeros((m, s)) if parentesco is None else np.asarray(parentesco, dtype=float)
+
+        mesma_raca = D['raca'][:, None] == G['raca'][None, :]
+        categoria = np.zeros(s, dtype=bool) if not categoria_objetivo else G['tipo_morfologico'] == categoria_objetivo
+
+        score_genetico = (0.4 * D['score_genetico'][:, None] + 0.4 * G['score_genetico'][None, :]
+                          + 0.2 * G['performance_progenie'][None, :])
+        score_genetico = score_genetico + BONUS_MESMA_RACA * mesma_raca + BONUS_CATEGORIA * categoria[None, :]
+        score_genetico = np.clip(score_genetico - PENALIDADE_PARENTESCO * F, 0.0, 1.0)
+
+        fator_idade_d = 1.0 - 0.02 * np.maximum(0.0, D['idade'] - 12.0)
+        fator_idade_g = 1.0 - 0.01 * np.maximum(0.0, G['idade'] - 18.0)
+        taxa_prenhez = (np.sqrt(D['taxa_prenhez'][:, None] * G['taxa_prenhez'][None, :])
+                        * fator_idade_d[:, None] * fator_idade_g[None, :] * (1.0 - F))
+        taxa_prenhez = np.clip(taxa_prenhez, 0.05, 0.95)
+
+        custo = np.broadcast_to(G['valor_cobertura'][None, :] + CUSTO_PROTOCOLO, (m, s))
+        valor_potro = VALOR_BASE_POTRO * (0.5 + score_genetico) * (1.0 + 0.5 * G['performance_progenie'][None, :])
+        roi = (valor_potro * taxa_prenhez - custo) / custo
+
+        # ROI comprimido para (-1, 1) antes de combinar com o score genético
+        score_final = prioridade_genetica * score_genetico + prioridade_financeira * roi / (1.0 + np.abs(roi))
+        invalido = np.zeros((m, s), dtype=bool)
+        if orcamento_maximo is not None:
+            invalido |= (G['valor_cobertura'] > orcamento_maximo)[None, :]
+        if consanguinidade_maxima is not None:
+            invalido |= F > consanguinidade_maxima
+        score_final = np.where(invalido, -np.inf, score_final)
+
+        confianca = np.clip(0.5 + 0.4 * np.minimum(D['taxa_prenhez'][:, None], G['taxa_prenhez'][None, :])
+                            + 0.1 * mesma_raca, 0.0, 0.99)
+        return {
+            'score_final': score_final,
+            'score_genetico': score_genetico,
+            'taxa_prenhez': taxa_prenhez,
+            'custo': custo,
+            'valor_potro': valor_potro,
+            'roi': roi,
+            'confianca': confianca,
+            'parentesco': F,
+            'mesma_raca': mesma_raca,
+            'categoria': categoria
+        }
+
+    @staticmethod
+    def top_k(scores, k):
+        """Índices das k maiores colunas de cada linha, em ordem decrescente."""
+        s = scores.shape[1]
+        k = min(k, s)
+        if k <= 0:
+            return np.empty((scores.shape[0], 0), dtype=int)
+        if k < s:
+            parcial = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            parcial = np.tile(np.arange(s), (scores.shape[0], 1))
+        ordem = np.argsort(-np.take_along_axis(scores, parcial, axis=1), axis=1, kind='stable')
+        return np.take_along_axis(parcial, ordem, axis=1)
+
+    def _recomendacao(self, M, D, G, i, j, i_global):
+        F = float(M['parentesco'][i, j])
+        positivos, atencao = [], []
+        if M['mesma_raca'][i, j]:
+            positivos.append('Mesma raça')
+        else:
+            atencao.append('Cruzamento entre raças diferentes')
+        if M['categoria'][j]:
+            positivos.append('Garanhão da categoria objetivo')
+        if G['performance_progenie'][j] >= 0.8:
+            positivos.append('Progênie com performance acima da média')
+        if M['taxa_prenhez'][i, j] >= 0.7:
+            positivos.append('Alta taxa de prenhez prevista')
+        elif M['taxa_prenhez'][i, j] < 0.5:
+            atencao.append('Taxa de prenhez prevista baixa')
+        if F > 0:
+            atencao.append(f'Consanguinidade esperada do potro de {F * 100:.1f}%')
+        if M['roi'][i, j] < 0:
+            atencao.append('Retorno financeiro negativo no cenário base')
+
+        return RecomendacaoAcasalamento(
+            doadora_id=D['id'][i_global],
+            garanhao_id=G['id'][j],
+            garanhao_nome=G['nome'][j],
+            score_final=float(M['score_final'][i, j]),
+            score_genetico=float(M['score_genetico'][i, j]),
+            taxa_prenhez_prevista=float(M['taxa_prenhez'][i, j]),
+            custo_estimado=float(M['custo'][i, j]),
+            valor_potro_estimado=float(M['valor_potro'][i, j]),
+            roi_estimado=float(M['roi'][i, j]),
+            confianca=float(M['confianca'][i, j]),
+            consanguinidade=F,
+            justificativa=f"Score combinado de {M['score_final'][i, j] * 100:.1f} "
+                          f"com ROI estimado de {M['roi'][i, j] * 100:.1f}%",
+            fatores_positivos=positivos,
+            fatores_atencao=atencao
+        )
+
+    def recomendar_em_lote(self, doadoras, garanhoes, k=5, parentesco=None, bloco=BLOCO_DOADORAS, **preferencias):
+        """Gera (doadora_id, [RecomendacaoAcasalamento]) doadora a doadora.
+
+        As doadoras são avaliadas em blocos de `bloco` linhas, então a memória
+        fica em O(bloco x garanhões) mesmo para rebanhos muito grandes.
+        `parentesco` pode ser uma matriz completa ou uma função
+        (ids_doadoras, ids_garanhoes) -> matriz.
+        """
+        D = doadoras if isinstance(doadoras, dict) else empacotar(doadoras)
+        G = garanhoes if isinstance(garanhoes, dict) else empacotar(garanhoes)
+        total = len(D['id'])
+        for inicio in range(0, total, bloco):
+            fatia = slice(inicio, min(inicio + bloco, total))
+            Db = {chave: valor[fatia] for chave, valor in D.items()}
+            if callable(parentesco):
+                Fb = parentesco(Db['id'], G['id'])
+            elif parentesco is not None:
+                Fb = np.asarray(parentesco)[fatia]
+            else:
+                Fb = None
+            M = self.matriz_scores(Db, G, Fb, **preferencias)
+            melhores = self.top_k(M['score_final'], k)
+            for i, linha in enumerate(melhores):
+                validos = [j for j in linha.tolist() if np.isfinite(M['score_final'][i, j])]
+                yield D['id'][inicio + i], [self._recomendacao(M, D, G, i, j, inicio + i) for j in validos]
+
+    def recomendar_acasalamentos(self, doadora, garanhoes, max_recomendacoes=5, **preferencias):
+        """Ranking de garanhões para uma doadora."""
+        if not garanhoes:
+            return []
+        for _, recomendacoes in self.recomendar_em_lote([doadora], garanhoes, max_recomendacoes, **preferencias):
+            return recomendacoes
+        return []
+
+    def simular_cenario(self, rec, variacao_preco=0.0, variacao_custo=0.0):
+        valor_potro = rec.valor_potro_estimado * (1 + variacao_preco)
+        custo = rec.custo_estimado * (1 + variacao_custo)
+        lucro = valor_potro * rec.taxa_prenhez_prevista - custo
+        roi = lucro / custo if custo else 0.0
+        return {
+            'valor_potro_simulado': valor_potro,
+            'custo_simulado': custo,
+            'lucro_simulado': lucro,
+            'roi_simulado': roi,
+            'diferenca_roi': roi - rec.roi_estimado
+        }
+
+    def varrer_cenarios(self, rec, preco=None, custo=None, taxa_prenhez=None, n_amostras=10000,
+                        grade=(21, 21), seed=None, processos=None):
+        """Monte-Carlo de cenários em torno de uma recomendação.
+
+        preco, custo e taxa_prenhez são variações relativas, dadas como
+        número fixo, {"min", "max"} (uniforme), {"distribuicao": "normal",
+        "media", "desvio"} ou {"distribuicao": "triangular", "min", "moda",
+        "max"}. Retorna percentis de ROI e lucro e uma grade preço x custo
+        (com a taxa média) para o mapa de calor. Com `processos`, amostras
+        acima de LIMIAR_PROCESSOS são divididas entre os processos do pool
+        do worker; n_amostras e processos são limitados a MAX_AMOSTRAS e
+        MAX_PROCESSOS.
+        """
+        n_amostras = int(min(max(n_amostras, 1), MAX_AMOSTRAS))
+        processos = _validar_processos(processos)
+        nx, ny = (max(2, min(int(g), MAX_GRADE)) for g in grade)
+        base = (rec.valor_potro_estimado, rec.custo_estimado, rec.taxa_prenhez_prevista)
+        specs = (preco, custo, taxa_prenhez)
+        for spec in specs:
+            _validar_spec(spec)
+
+        sementes = np.random.SeedSequence(seed)
+        partes = None
+        if processos > 1 and n_amostras >= LIMIAR_PROCESSOS:
+            tamanhos = [n_amostras // processos + (1 if i < n_amostras % processos else 0) for i in range(processos)]
+            tarefas = [(base, specs, n, filho) for n, filho in zip(tamanhos, sementes.spawn(processos))]
+            pool = _pool_simulacao()
+            try:
+                partes = list(pool.map(_simular_bloco, tarefas))
+            except BrokenProcessPool:
+                # Um subprocesso morreu: o pool é recriado na próxima chamada e esta roda aqui
+                _descartar_pool(pool)
+                partes = [_simular_bloco(tarefa) for tarefa in tarefas]
+        if partes is not None:
+            lucro = np.concatenate([p[0] for p in partes])
+            roi = np.concatenate([p[1] for p in partes])
+            taxa_media = float(np.average([p[2] for p in partes], weights=tamanhos))
+        else:
+            lucro, roi, taxa_media = _simular_bloco((base, specs, n_amostras, sementes))
+
+        # Grade determinística preço x custo, varrendo os limites de cada faixa
+        eixo_preco = np.linspace(*_limites(preco), nx)
+        eixo_custo = np.linspace(*_limites(custo), ny)
+        valor_potro, custo_total = base[0] * (1 + eixo_preco), base[1] * (1 + eixo_custo)
+        lucro_grade = valor_potro[:, None] * taxa_media - custo_total[None, :]
+        # Faixa de custo chegando a -100% zera o custo numa coluna da grade
+        roi_grade = np.divide(lucro_grade, custo_total[None, :], out=np.zeros_like(lucro_grade),
+                              where=np.abs(custo_total[None, :]) > 1e-9)
+
+        percentis = (5, 25, 50, 75, 95)
+        def resumo(valores):
+            pontos = np.percentile(valores, percentis)
+            dados = {f'p{p}': float(v) for p, v in zip(percentis, pontos)}
+            dados.update({'media': float(valores.mean()), 'desvio': float(valores.std())})
+            return dados
+
+        return {
+            'n_amostras': n_amostras,
+            'roi': resumo(roi),
+            'lucro': resumo(lucro),
+            'probabilidade_prejuizo': float((lucro < 0).mean()),
+            'taxa_prenhez_media': taxa_media,
+            'grade': {
+                'eixo_variacao_preco': eixo_preco.tolist(),
+                'eixo_variacao_custo': eixo_custo.tolist(),
+                'roi': roi_grade.tolist(),
+                'lucro': lucro_grade.tolist()
+            }
+        }
+
+    def calcular_consanguinidade(self, doadora_id, garanhao_id):
+        """F esperado do potro, pelo pedigree cadastrado."""
+        from models.genetic_match import calcular_parentesco
+        return calcular_parentesco(doadora_id, garanhao_id)
+
+genetic_engine = MotorGenetico()
@@ -1,62 +1,127 @@
 import os
+import click
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token
-from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
 from sqlalchemy import text
 
-# Rotas
-from routes.custo_prenhez import custo_bp
-from routes.integracao import integracao_bp
-from routes.animals import animals_bp
+# Rotas: carregadas sob demanda a partir do manifesto em routes/__init__.py
+from routes import registrar_blueprints
 
-from models.database import db_session, engine, Base
+from models.database import db_session, get_engine, estatisticas_pool, Base
+from auth.middleware import token_required, propagar_escritas
+from auth import senhas
+import estaticos
+from routes.serializacao import JSONProviderRapido
 from models.user import Usuario
-# Importacao dos Modelos
-import models.custo_prenhez
-import models.extras
-import models.animals 
+
+# Tentativas de login: rajada e reposicao por minuto, por IP e por e-mail
+limite_login_ip = senhas.LimitadorTentativas(
+    int(os.environ.get('LOGIN_IP_RAJADA', 20)), int(os.environ.get('LOGIN_IP_POR_MINUTO', 20)))
+limite_login_email = senhas.LimitadorTentativas(
+    int(os.environ.get('LOGIN_EMAIL_RAJADA', 5)), int(os.environ.get('LOGIN_EMAIL_POR_MINUTO', 2)))
+
+# Proxies na frente do app (nginx.conf: 1). O ProxyFix so confia nesses
+# ultimos saltos do X-Forwarded-For; o resto vem do cliente e pode ser forjado
+PROXIES_CONFIAVEIS = int(os.environ.get('PROXIES_CONFIAVEIS', 1))
+
+def _tente_depois(mensagem, status, segundos):
+    resposta = jsonify({"msg": mensagem})
+    resposta.headers['Retry-After'] = str(max(1, int(segundos + 0.999)))
+    return resposta, status
 
 def create_app():
-    app = Flask(__name__, static_folder='static', static_url_path='')
+    # static/ e servido por estaticos.servir (build pre-comprimido), nao pela rota padrao do Flask
+    app = Flask(__name__, static_folder=None)
+    if PROXIES_CONFIAVEIS:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXIES_CONFIAVEIS)
+    app.json = JSONProviderRapido(app)
     app.config['SECRET_KEY'] = 'dev-key'
     app.config['JWT_SECRET_KEY'] = 'jwt-key'
     CORS(app)
     JWTManager(app)
 
-    app.register_blueprint(custo_bp, url_prefix='/api/custo_prenhez')
-    app.register_blueprint(integracao_bp, url_prefix='/api')
-    app.register_blueprint(animals_bp, url_prefix='/api/animais')
+    registrar_blueprints(app)
     
+    app.after_request(propagar_escritas)
+
     @app.teardown_appcontext
     def shutdown(e=None): db_session.remove()
     
     @app.route('/api/login', methods=['POST'])
     def login():
-        d = request.get_json()
-        u = db_session.query(Usuario).filter_by(email=d.get('email')).first()
-        if u and check_password_hash(u.password_hash, d.get('password')):
-            t = create_access_token(identity=str(u.id), additional_claims={"role":u.role,"tenant_id":u.tenant_id})
-            return jsonify({"token":t, "user":{"nome":u.nome}}), 200
+        d = request.get_json() or {}
+        email = d.get('email') or ''
+        # Os dois baldes sao conferidos antes de gastar: bloqueio por e-mail nao consome a ficha do IP
+        espera = senhas.consumir_juntos((limite_login_ip, request.remote_addr),
+                                        (limite_login_email, email.strip().lower()))
+        if espera:
+            return _tente_depois("Muitas tentativas, aguarde", 429, espera)
+        u = db_session.query(Usuario).filter_by(email=email).first()
+        if u and u.password_hash:
+            try:
+                ok, novo_hash = senhas.verificar(u.password_hash, d.get('password') or '')
+            except senhas.SobrecargaSenha:
+                return _tente_depois("Servidor ocupado, tente novamente", 503, 1)
+            if ok:
+                if novo_hash:
+                    # Hash com parametros antigos: regrava com os atuais
+                    try:
+                        u.password_hash = novo_hash
+                        db_session.commit()
+                    except Exception as e:
+                        db_session.rollback()
+                        print(f"Falha no rehash da senha do usuario {u.id}: {e}")
+                t = create_access_token(identity=str(u.id), additional_claims={"role":u.role,"tenant_id":u.tenant_id})
+                return jsonify({"token":t, "user":{"nome":u.nome}}), 200
         return jsonify({"msg":"Erro"}), 401
 
+    @app.route('/api/_debug/pool', methods=['GET'])
+    @token_required
+    def pool_stats(current_user):
+        # Estado do pool deste worker (cada worker do gunicorn tem o seu)
+        return jsonify(estatisticas_pool()), 200
+
     @app.route('/api/resetar-banco-completo', methods=['GET'])
     def reset_db():
+        # Os modelos das rotas ainda nao carregadas tambem entram no create_all
+        import models.custo_prenhez, models.extras, models.animals, models.vaas
         try:
-            with engine.connect() as conn:
+            with get_engine().connect() as conn:
                 conn.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public;"))
                 conn.commit()
-            Base.metadata.create_all(bind=engine)
-            admin = Usuario(nome="Admin", email="admin@haras.com", password_hash=generate_password_hash("admin123"), role="proprietario", tenant_id="padrao")
+            Base.metadata.create_all(bind=get_engine())
+            admin = Usuario(nome="Admin", email="admin@haras.com", password_hash=senhas.gerar_hash("admin123"), role="proprietario", tenant_id="padrao")
             db_session.add(admin)
             db_session.commit()
             return jsonify({"message": "BANCO RESETADO."}), 200
         except Exception as e: return jsonify({"error": str(e)}), 500
 
+    @app.cli.command('rollup-financeiro')
+    @click.option('--tenant', default=None, help='Reconstroi apenas este tenant')
+    def rollup_financeiro(tenant):
+        """Reconstroi financeiro_rollup_mensal a partir das transacoes."""
+        from models.financeiro import reconstruir_rollup
+        reconstruir_rollup(db_session, tenant_id=tenant)
+        click.echo(f"Rollup financeiro reconstruido ({tenant or 'todos os tenants'}).")
+
+    @app.cli.command('faturar-vaas')
+    @click.option('--ano', type=int, required=True)
+    @click.option('--mes', type=int, required=True)
+    @click.option('--lote', type=int, default=100, help='Tenants por transacao')
+    @click.option('--tenant', multiple=True, help='Restringe a estes tenants')
+    def faturar_vaas(ano, mes, lote, tenant):
+        """Gera as faturas VaaS do mes para todos os tenants (idempotente)."""
+        from services.faturamento_vaas import faturar_mes
+        resumo = faturar_mes(db_session, ano, mes, lote, list(tenant) or None, log=click.echo)
+        click.echo(f"{resumo['total_faturas']} faturas geradas em {resumo['lotes']} lotes "
+                   f"({resumo['lotes_com_erro']} lotes com conflito).")
+
     @app.route('/')
-    def index(): return app.send_static_file('dashboard-avancado.html')
+    def index(): return estaticos.servir('dashboard-avancado.html')
     @app.route('/<path:path>')
-    def static_files(path): return app.send_static_file(path)
+    def static_files(path): return estaticos.servir(path)
     return app
 
 app = create_app()
@@ -1,32 +1,191 @@
+import os
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
-from flask import request, jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from types import MappingProxyType
+from flask import current_app, g, request, jsonify
+from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_header
+from sqlalchemy.exc import OperationalError
+from models.database import (db_session, replica_url, replica_disponivel, marcar_replica_indisponivel,
+                             escreveu_recentemente, REPLICA_RYW_SECONDS)
+
+# Cookie que mantem as leituras do cliente no primario logo apos uma escrita,
+# mesmo que a proxima requisicao caia em outro worker.
+COOKIE_PRIMARIO = 'haras_primario_ate'
+
+# Cache dos tokens ja verificados (assinatura HMAC + claims), por processo.
+# Clientes que fazem muitas requisicoes seguidas com o mesmo token pulam a
+# verificacao. A entrada vale ate o exp do token ou JWT_CACHE_SECONDS, o que
+# vier primeiro; JWT_CACHE_MAX=0 desliga o cache.
+JWT_CACHE_MAX = int(os.environ.get('JWT_CACHE_MAX', 1024))
+JWT_CACHE_SECONDS = int(os.environ.get('JWT_CACHE_SECONDS', 60))
+
+_tokens_verificados = OrderedDict()
+_tokens_lock = threading.Lock()
+
+class Principal:
+    """Usuario autenticado da requisicao. Imutavel; fica em flask.g."""
+
+    __slots__ = ('id', 'role', 'tenant_id', 'claims')
+
+    def __init__(self, claims):
+        object.__setattr__(self, 'id', claims.get("sub"))
+        object.__setattr__(self, 'role', claims.get("role"))
+        object.__setattr__(self, 'tenant_id', claims.get("tenant_id"))
+        object.__setattr__(self, 'claims', MappingProxyType(dict(claims)))
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError("Principal e somente leitura")
+
+    def __delattr__(self, nome):
+        raise AttributeError("Principal e somente leitura")
+
+    def __repr__(self):
+        return f"Principal(id={self.id!r}, role={self.role!r}, tenant_id={self.tenant_id!r})"
+
+def _token_do_header():
+    autorizacao = request.headers.get('Authorization', '')
+    return autorizacao[7:] if autorizacao.startswith('Bearer ') else None
+
+def _verificar_token():
+    """Verifica o JWT da requisicao e retorna os claims, usando o cache se puder."""
+    token = _token_do_header() if JWT_CACHE_MAX > 0 else None
+    chave = (current_app.name, token)
+    if token:
+        with _tokens_lock:
+            entrada = _tokens_verificados.get(chave)
+            if entrada:
+                _tokens_verificados.move_to_end(chave)
+        if entrada and time.time() < entrada[0]:
+            _, header, claims = entrada
+            # Mesmo estado que verify_jwt_in_request deixa em g, para get_jwt() continuar valendo
+            g._jwt_extended_jwt_header = header
+            g._jwt_extended_jwt = claims
+            g._jwt_extended_jwt_user = {"loaded_user": None}
+            g._jwt_extended_jwt_location = 'headers'
+            return claims
+
+    verify_jwt_in_request()
+    claims = get_jwt()
+    if token and g.get('_jwt_extended_jwt_location') == 'headers':
+        validade = min(claims.get('exp', float('inf')), time.time() + JWT_CACHE_SECONDS)
+        with _tokens_lock:
+            _tokens_verificados[chave] = (validade, get_jwt_header(), claims)
+            _tokens_verificados.move_to_end(chave)
+            while len(_tokens_verificados) > JWT_CACHE_MAX:
+                _tokens_verificados.popitem(last=False)
+    return claims
+
+def principal_atual():
+    """Principal da requisicao; o token e verificado uma vez so por requisicao."""
+    principal = g.get('principal')
+    if principal is None:
+        principal = Principal(_verificar_token())
+        g.principal = principal
+    return principal
+
+def _nao_autenticado(e):
+    return jsonify({"message": "Token invalido ou ausente", "error": str(e)}), 401
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         try:
-            verify_jwt_in_request()
-            claims = get_jwt()
-            # Cria um objeto mock para simular o current_user
-            class CurrentUser:
-                id = claims.get("sub")
-                role = claims.get("role")
-                tenant_id = claims.get("tenant_id")
-            
-            return f(CurrentUser(), *args, **kwargs)
+            current_user = principal_atual()
         except Exception as e:
-            return jsonify({"message": "Token invalido ou ausente", "error": str(e)}), 401
+            return _nao_autenticado(e)
+        return f(current_user, *args, **kwargs)
     return decorated
 
-def role_required(role):
+def role_required(*roles):
+    """Aceita um papel, varios (`role_required('a', 'b')`) ou uma lista."""
+    permitidos = set()
+    for role in roles:
+        permitidos.update([role] if isinstance(role, str) else role)
+
     def decorator(f):
         @wraps(f)
         def decorated(*args, **kwargs):
-            verify_jwt_in_request()
-            claims = get_jwt()
-            if claims.get("role") != role:
+            try:
+                principal = principal_atual()
+            except Exception as e:
+                return _nao_autenticado(e)
+            if principal.role not in permitidos:
                 return jsonify({"message": "Acesso negado"}), 403
             return f(*args, **kwargs)
         return decorated
     return decorator
+
+# Papeis com acesso aos dados financeiros do tenant
+PAPEIS_FINANCEIRO = ('proprietario', 'admin')
+
+def tenant_access_required(f):
+    """Passa `current_user` e `tenant_id` (do token) como argumentos nomeados.
+
+    403 se o token nao tiver tenant: toda consulta da rota filtra por ele.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            principal = principal_atual()
+        except Exception as e:
+            return _nao_autenticado(e)
+        if not principal.tenant_id:
+            return jsonify({"message": "Usuario sem tenant"}), 403
+        return f(*args, current_user=principal, tenant_id=principal.tenant_id, **kwargs)
+    return decorated
+
+def financial_access_required(f):
+    """Como tenant_access_required, restrito a PAPEIS_FINANCEIRO."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            principal = principal_atual()
+        except Exception as e:
+            return _nao_autenticado(e)
+        if principal.role not in PAPEIS_FINANCEIRO:
+            return jsonify({"message": "Acesso negado"}), 403
+        return tenant_access_required(f)(*args, **kwargs)
+    return decorated
+
+def _leitura_exige_primario(tenant_id):
+    if request.method not in ('GET', 'HEAD') or request.headers.get('X-Read-Primary'):
+        return True
+    try:
+        if float(request.cookies.get(COOKIE_PRIMARIO, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    return escreveu_recentemente(tenant_id)
+
+def usar_replica(f):
+    """Envia as consultas do endpoint para a replica de leitura, quando houver.
+
+    Usar abaixo de @token_required. Cai no primario se o tenant acabou de
+    gravar, se o cliente pedir (header X-Read-Primary) ou se a replica cair.
+    """
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        if not replica_url or _leitura_exige_primario(current_user.tenant_id) or not replica_disponivel():
+            return f(current_user, *args, **kwargs)
+        db_session.info['replica'] = True
+        try:
+            return f(current_user, *args, **kwargs)
+        except OperationalError as e:
+            # Replica caiu no meio da requisicao: repete a leitura no primario
+            print(f"Erro na replica, repetindo no primario: {e}")
+            marcar_replica_indisponivel()
+            db_session.rollback()
+            db_session.info['replica'] = False
+            return f(current_user, *args, **kwargs)
+        finally:
+            db_session.info.pop('replica', None)
+    return decorated
+
+def propagar_escritas(response):
+    """after_request: marca o cliente para ler do primario apos gravar."""
+    if replica_url and db_session.info.pop('tenants_commitados', None):
+        response.set_cookie(COOKIE_PRIMARIO, str(time.time() + REPLICA_RYW_SECONDS),
+                            max_age=REPLICA_RYW_SECONDS, httponly=True, samesite='Lax')
+    return response
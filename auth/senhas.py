@@ -0,0 +1,138 @@
+"""
+Verificação de senhas fora do fluxo principal da requisição.
+
+O hash (scrypt/PBKDF2) roda num pool pequeno de threads; o hashlib libera
+o GIL durante o cálculo, então as outras threads do worker continuam
+atendendo. A fila é limitada: se já houver SENHA_FILA_MAX verificações
+pendentes, a chamada falha na hora com SobrecargaSenha (a rota devolve
+503) em vez de empilhar logins atrás do PBKDF2.
+
+Isso só tem efeito com workers de várias threads (gunicorn gthread, ver o
+Procfile): num worker sync há um login por vez. As vagas
+(SENHA_WORKERS + SENHA_FILA_MAX) ficam abaixo do número de threads do
+worker, para que sempre sobrem threads para as outras rotas.
+
+Também ficam aqui o limitador de tentativas (token bucket por e-mail e por
+IP) e o rehash transparente de hashes com parâmetros antigos.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturoTimeout
+from werkzeug.security import check_password_hash, generate_password_hash
+
+SENHA_WORKERS = int(os.environ.get('SENHA_WORKERS', 2))
+SENHA_FILA_MAX = int(os.environ.get('SENHA_FILA_MAX', 4))
+SENHA_TIMEOUT = int(os.environ.get('SENHA_TIMEOUT', 5))
+# Parâmetros atuais do hash; senhas gravadas com outros são refeitas no login
+METODO_HASH = os.environ.get('SENHA_METODO_HASH', 'scrypt:32768:8:1')
+
+class SobrecargaSenha(Exception):
+    """Fila de verificação cheia ou verificação demorou demais."""
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_vagas = threading.BoundedSemaphore(SENHA_WORKERS + SENHA_FILA_MAX)
+
+def _obter_pool():
+    # Um pool por processo: threads não sobrevivem ao fork do gunicorn
+    global _pool, _pool_pid
+    if _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool_pid != os.getpid():
+                _pool = ThreadPoolExecutor(max_workers=SENHA_WORKERS, thread_name_prefix='senha')
+                _pool_pid = os.getpid()
+    return _pool
+
+def gerar_hash(senha):
+    return generate_password_hash(senha, method=METODO_HASH)
+
+def precisa_rehash(hash_senha):
+    return (hash_senha or '').split('$', 1)[0] != METODO_HASH
+
+def _verificar(hash_senha, senha):
+    if not check_password_hash(hash_senha, senha):
+        return False, None
+    return True, gerar_hash(senha) if precisa_rehash(hash_senha) else None
+
+def verificar(hash_senha, senha):
+    """Confere a senha no pool. Retorna (ok, novo_hash); novo_hash vem
+    preenchido quando o hash gravado usa parâmetros antigos."""
+    if not _vagas.acquire(blocking=False):
+        raise SobrecargaSenha("fila de verificacao cheia")
+    try:
+        futuro = _obter_pool().submit(_verificar, hash_senha, senha)
+    except Exception:
+        _vagas.release()
+        raise
+    futuro.add_done_callback(lambda _: _vagas.release())
+    try:
+        return futuro.result(timeout=SENHA_TIMEOUT)
+    except FuturoTimeout:
+        raise SobrecargaSenha("verificacao demorou demais")
+
+class LimitadorTentativas:
+    """Token bucket em memória: `capacidade` tentativas seguidas, repostas a
+    `por_minuto` por minuto. Guarda no máximo `max_chaves` chaves (LRU).
+    Com `por_minuto` <= 0 o limitador fica desligado."""
+
+    def __init__(self, capacidade, por_minuto, max_chaves=10000):
+        self.capacidade = float(capacidade)
+        self.taxa = por_minuto / 60.0
+        self.ativo = por_minuto > 0
+        self.max_chaves = max_chaves
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _saldo(self, chave, agora):
+        fichas, ultimo = self._baldes.get(chave, (self.capacidade, agora))
+        return min(self.capacidade, fichas + (agora - ultimo) * self.taxa)
+
+    def _reservar(self, chaves, agora):
+        """(saldos, espera) das chaves, sem gastar nada. Chamar com o lock."""
+        saldos = {chave: self._saldo(chave, agora) for chave in chaves}
+        faltando = [chave for chave, fichas in saldos.items() if fichas < 1]
+        return saldos, max(((1 - saldos[c]) / self.taxa for c in faltando), default=0)
+
+    def _gastar(self, saldos, agora):
+        for chave, fichas in saldos.items():
+            self._baldes[chave] = (fichas - 1, agora)
+            self._baldes.move_to_end(chave)
+        while len(self._baldes) > self.max_chaves:
+            self._baldes.popitem(last=False)
+
+    def consumir(self, *chaves):
+        """Gasta uma ficha de cada chave. Retorna 0 se liberou ou quantos
+        segundos esperar (nesse caso nada é gasto)."""
+        return consumir_juntos(*((self, chave) for chave in chaves))
+
+def consumir_juntos(*pares):
+    """Gasta uma ficha de cada (limitador, chave) só se todos liberarem.
+
+    Retorna 0 ou a maior espera; quando algum bloqueia nenhum balde é
+    tocado (ex.: o e-mail bloqueado não gasta a ficha do IP).
+    """
+    por_limitador = OrderedDict()
+    for limitador, chave in pares:
+        if limitador.ativo:
+            por_limitador.setdefault(limitador, []).append(chave)
+    # Locks sempre na mesma ordem para duas chamadas não se travarem
+    limitadores = sorted(por_limitador, key=id)
+    agora = time.monotonic()
+    for limitador in limitadores:
+        limitador._lock.acquire()
+    try:
+        reservas = [(limitador, *limitador._reservar(por_limitador[limitador], agora))
+                    for limitador in limitadores]
+        espera = max((espera for _, _, espera in reservas), default=0)
+        if espera:
+            return espera
+        for limitador, saldos, _ in reservas:
+            limitador._gastar(saldos, agora)
+        return 0
+    finally:
+        for limitador in reversed(limitadores):
+            limitador._lock.release()
@@ -0,0 +1,67 @@
+"""
+Tempo de importação do app_simple (cold start de um worker).
+
+Roda `python -X importtime -c "import app_simple"` em processos novos,
+pega a mediana do tempo acumulado do app_simple e falha (código 1) se
+passar do orçamento ou se algum módulo pesado proibido entrar na subida.
+
+    python -m benchmarks.inicializacao [--execucoes 5] [--orcamento-ms 900] [--top 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ORCAMENTO_MS = int(os.environ.get('STARTUP_ORCAMENTO_MS', 900))
+# Só podem ser carregados pelas rotas que os usam, nunca na subida
+PROIBIDOS = ('numpy', 'pandas', 'scipy')
+
+def medir(modulo='app_simple'):
+    """{módulo: (próprio_us, acumulado_us)} de uma importação em processo novo."""
+    saida = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    ).stderr
+    tempos = {}
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, acumulado, nome = linha[len('import time:'):].split('|')
+        tempos.setdefault(nome.strip(), (int(proprio), int(acumulado)))
+    return tempos
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--execucoes', type=int, default=5)
+    parser.add_argument('--orcamento-ms', type=float, default=ORCAMENTO_MS)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args(argv)
+
+    # A primeira execução só aquece o cache de bytecode
+    medir()
+    execucoes = [medir() for _ in range(args.execucoes)]
+    total_ms = statistics.median(t['app_simple'][1] for t in execucoes) / 1000
+
+    ultima = execucoes[-1]
+    print("Modulos mais lentos (tempo proprio, ultima execucao):")
+    for nome, (proprio, _) in sorted(ultima.items(), key=lambda i: -i[1][0])[:args.top]:
+        print(f"  {proprio / 1000:8.1f} ms  {nome}")
+
+    falhas = 0
+    carregados = [n for n in PROIBIDOS if n in ultima]
+    if carregados:
+        falhas += 1
+        print(f"FALHA modulos pesados importados na subida: {', '.join(carregados)}")
+    situacao = 'OK  ' if total_ms <= args.orcamento_ms else 'FALHA'
+    if total_ms > args.orcamento_ms:
+        falhas += 1
+    print(f"{situacao} import app_simple: {total_ms:.1f} ms (mediana de {args.execucoes}, "
+          f"orcamento {args.orcamento_ms:.0f} ms)")
+    return 1 if falhas else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Micro-benchmark da serialização de listas (rota de procedimentos OPU).
+
+Compara, para N linhas (padrão 50 mil) de um modelo com as 27 colunas de
+ProcedimentoOPU, o caminho atual (objetos do ORM + dict campo a campo +
+encoder padrão do Flask) com o novo (serializador gerado do mapper +
+JSONProviderRapido, com objetos ou só com as colunas, e em streaming).
+Mede só a serialização e também consulta + serialização num SQLite em
+memória.
+
+    python -m benchmarks.serializacao [--linhas 50000] [--repeticoes 3]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Column, Float, Integer, String, Text, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from routes import serializacao
+from routes.serializacao import JSONProviderRapido, serializador, lista_streaming
+
+Base = declarative_base()
+
+class ProcedimentoOPU(Base):
+    # Mesmas colunas de models/models.py, numa Base própria para rodar sem o app
+    __tablename__ = 'procedimentos_opu'
+    id = Column(Integer, primary_key=True)
+    egua_id = Column(Integer, nullable=False)
+    tipo_procedimento = Column(String(50))
+    data_procedimento = Column(String(10))
+    foliculos_aspirados = Column(Integer)
+    ccos_recuperados = Column(Integer)
+    taxa_recuperacao = Column(Float)
+    ciclo_estral = Column(String(50))
+    dia_ciclo = Column(Integer)
+    medicacao_utilizada = Column(String(255))
+    protocolo_hormonal = Column(String(255))
+    veterinario_responsavel = Column(String(100))
+    crmv_veterinario = Column(String(50))
+    tecnico_responsavel = Column(String(100))
+    equipamento_utilizado = Column(String(100))
+    complicacoes = Column(Text)
+    pressao_aspiracao = Column(String(50))
+    rotacao_agulha = Column(String(50))
+    metodo_lavagem = Column(String(50))
+    numero_lavagens_foliculo = Column(Integer)
+    medicacao_pos_opu = Column(Text)
+    observacoes = Column(Text)
+    proxima_opu = Column(String(10))
+    tamanhos_foliculos = Column(String(255))
+    qualidade_ccos = Column(String(255))
+    tempo_procedimento = Column(Integer)
+    custo_procedimento = Column(Float)
+    status = Column(String(50))
+
+def _custo_por_oocito(p):
+    return round(p.custo_procedimento / p.ccos_recuperados, 2) if p.ccos_recuperados > 0 else 0.0
+
+def dict_campo_a_campo(p):
+    # Como routes/procedimentos_opu.py montava cada item antes do serializador
+    return {
+        "id": p.id, "egua_id": p.egua_id, "tipo_procedimento": p.tipo_procedimento,
+        "data_procedimento": p.data_procedimento, "foliculos_aspirados": p.foliculos_aspirados,
+        "ccos_recuperados": p.ccos_recuperados, "taxa_recuperacao": p.taxa_recuperacao,
+        "ciclo_estral": p.ciclo_estral, "dia_ciclo": p.dia_ciclo,
+        "medicacao_utilizada": p.medicacao_utilizada, "protocolo_hormonal": p.protocolo_hormonal,
+        "veterinario_responsavel": p.veterinario_responsavel, "crmv_veterinario": p.crmv_veterinario,
+        "tecnico_responsavel": p.tecnico_responsavel, "equipamento_utilizado": p.equipamento_utilizado,
+        "complicacoes": p.complicacoes, "pressao_aspiracao": p.pressao_aspiracao,
+        "rotacao_agulha": p.rotacao_agulha, "metodo_lavagem": p.metodo_lavagem,
+        "numero_lavagens_foliculo": p.numero_lavagens_foliculo, "medicacao_pos_opu": p.medicacao_pos_opu,
+        "observacoes": p.observacoes, "proxima_opu": p.proxima_opu,
+        "tamanhos_foliculos": p.tamanhos_foliculos, "qualidade_ccos": p.qualidade_ccos,
+        "tempo_procedimento": p.tempo_procedimento, "custo_procedimento": p.custo_procedimento,
+        "status": p.status, "custo_por_oocito": _custo_por_oocito(p),
+    }
+
+def _popular(session, linhas):
+    session.execute(ProcedimentoOPU.__table__.insert(), [{
+        'id': i, 'egua_id': i % 300, 'tipo_procedimento': 'OPU', 'data_procedimento': '2024-03-15',
+        'foliculos_aspirados': 12 + i % 7, 'ccos_recuperados': i % 9, 'taxa_recuperacao': 0.61,
+        'ciclo_estral': 'diestro', 'dia_ciclo': i % 21, 'medicacao_utilizada': 'Detomidina 0,01 mg/kg',
+        'protocolo_hormonal': 'Sem protocolo', 'veterinario_responsavel': 'Dra. Ana Souza',
+        'crmv_veterinario': 'SP-12345', 'tecnico_responsavel': 'Carlos Lima',
+        'equipamento_utilizado': 'Ultrassom Mindray Z6', 'complicacoes': None,
+        'pressao_aspiracao': '150 mmHg', 'rotacao_agulha': '180 graus', 'metodo_lavagem': 'Continua',
+        'numero_lavagens_foliculo': 4, 'medicacao_pos_opu': 'Flunixina', 'observacoes': 'Sem intercorrencias',
+        'proxima_opu': '2024-04-05', 'tamanhos_foliculos': '[12, 15, 18, 22]', 'qualidade_ccos': '{"A": 3, "B": 2}',
+        'tempo_procedimento': 35, 'custo_procedimento': 1850.0 + i % 100, 'status': 'concluido',
+    } for i in range(1, linhas + 1)])
+    session.commit()
+
+def _cronometrar(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=50000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    app = Flask(__name__)
+    padrao = DefaultJSONProvider(app)
+    rapido = JSONProviderRapido(app)
+    ser = serializador(ProcedimentoOPU, extras={'custo_por_oocito': _custo_por_oocito})
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        _popular(session, args.linhas)
+        objetos = session.query(ProcedimentoOPU).all()
+        rows = session.query(*ser.colunas).all()
+
+        # Mesma saída nos dois caminhos
+        assert padrao.loads(padrao.dumps([dict_campo_a_campo(p) for p in objetos[:100]])) == \
+            rapido.loads(rapido.dumps([ser(p) for p in objetos[:100]])) == \
+            rapido.loads(rapido.dumps([ser.linha(r) for r in rows[:100]]))
+
+        def streaming(linhas, serializar):
+            app.json = rapido
+            with app.test_request_context():
+                resposta = lista_streaming(linhas, serializar)
+                return b''.join(resposta.iter_encoded())
+
+        casos = [
+            ('serializacao', 'atual: dict campo a campo + json padrao',
+             lambda: padrao.dumps([dict_campo_a_campo(p) for p in objetos])),
+            ('serializacao', 'novo: serializador(objetos) + provider rapido',
+             lambda: rapido.dumps([ser(p) for p in objetos])),
+            ('serializacao', 'novo: serializador(colunas) + provider rapido',
+             lambda: rapido.dumps([ser.linha(r) for r in rows])),
+            ('serializacao', 'novo: colunas em streaming',
+             lambda: streaming(rows, ser.linha)),
+            ('consulta', 'atual: query(Modelo).all() + dict + json padrao',
+             lambda: padrao.dumps([dict_campo_a_campo(p) for p in Session(engine).query(ProcedimentoOPU).all()])),
+            ('consulta', 'novo: query(*colunas).yield_per + streaming',
+             lambda: streaming(Session(engine).query(*ser.colunas).yield_per(1000), ser.linha)),
+        ]
+        print(f"{args.linhas} linhas, mediana de {args.repeticoes} "
+              f"(orjson {'ativo' if serializacao.orjson is not None else 'ausente: encoder padrao'})")
+        base = {}
+        for grupo, nome, funcao in casos:
+            ms = _cronometrar(funcao, args.repeticoes)
+            base.setdefault(grupo, ms)
+            print(f"  [{grupo:12}] {nome:50} {ms:9.1f} ms  {base[grupo] / ms:5.1f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Arquivos estáticos dos dashboards, servidos a partir do build.
+
+O build (`python -m estaticos`) fica em build/static. Na primeira
+requisição o worker carrega o manifesto e o conteúdo de todas as
+variantes para a memória, e cada resposta escolhe br, gzip ou o original
+pelo Accept-Encoding. O ETag é o hash do conteúdo: If-None-Match devolve
+304. Nomes com hash (JS/CSS) recebem cache imutável de um ano; os HTML,
+que mantêm o nome, são revalidados a cada acesso (no-cache + ETag).
+
+Sem build, os arquivos saem direto de static/ como antes.
+"""
+
+import json
+import mimetypes
+import os
+import threading
+from flask import Response, request, send_from_directory
+
+from estaticos.construcao import ORIGEM, DESTINO, MANIFESTO
+
+PASTA_BUILD = os.environ.get('ESTATICOS_DIR', DESTINO)
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'no-cache'
+# Preferência do servidor quando o cliente aceita mais de uma
+CODIFICACOES = ('br', 'gzip')
+EXTENSAO = {'br': '.br', 'gzip': '.gz'}
+
+class Arquivo:
+    __slots__ = ('hash', 'mimetype', 'imutavel', 'conteudos')
+
+    def __init__(self, hash, mimetype, imutavel, conteudos):
+        self.hash = hash
+        self.mimetype = mimetype
+        self.imutavel = imutavel
+        self.conteudos = conteudos   # {codificação ou None: bytes}
+
+_arquivos = None
+_lock = threading.Lock()
+
+def _ler(pasta, relativo):
+    with open(os.path.join(pasta, *relativo.split('/')), 'rb') as arquivo:
+        return arquivo.read()
+
+def carregar(pasta=None):
+    """{url: Arquivo} do build em `pasta`; vazio se o build não existir."""
+    pasta = pasta or PASTA_BUILD
+    caminho = os.path.join(pasta, MANIFESTO)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho) as arquivo:
+        manifesto = json.load(arquivo)
+    arquivos = {}
+    for nome, item in manifesto.items():
+        url = item['url']
+        conteudos = {None: _ler(pasta, url)}
+        for codificacao in item['variantes']:
+            conteudos[codificacao] = _ler(pasta, url + EXTENSAO[codificacao])
+        mimetype = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+        arquivos[url] = Arquivo(item['hash'], mimetype, url != nome, conteudos)
+        # O nome original continua valendo, mas sem cache imutável
+        arquivos.setdefault(nome, Arquivo(item['hash'], mimetype, False, conteudos))
+    return arquivos
+
+def _obter_arquivos():
+    global _arquivos
+    if _arquivos is None:
+        with _lock:
+            if _arquivos is None:
+                _arquivos = carregar()
+    return _arquivos
+
+def _codificacao(arquivo):
+    disponiveis = [c for c in CODIFICACOES if c in arquivo.conteudos]
+    return request.accept_encodings.best_match(disponiveis) if disponiveis else None
+
+def servir(caminho):
+    """Resposta para um arquivo estático (com negociação, ETag e cache)."""
+    arquivo = _obter_arquivos().get(caminho)
+    if arquivo is None:
+        return send_from_directory(ORIGEM, caminho)
+
+    codificacao = _codificacao(arquivo)
+    etag = arquivo.hash + ('-' + codificacao if codificacao else '')
+    if request.if_none_match.contains_weak(etag):
+        resposta = Response(status=304)
+    else:
+        resposta = Response(arquivo.conteudos[codificacao], mimetype=arquivo.mimetype)
+        if codificacao:
+            resposta.headers['Content-Encoding'] = codificacao
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = CACHE_IMUTAVEL if arquivo.imutavel else CACHE_REVALIDAR
+    resposta.vary.add('Accept-Encoding')
+    return resposta
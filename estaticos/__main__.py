@@ -0,0 +1,14 @@
+import sys
+from estaticos.construcao import construir, brotli, DESTINO
+
+def main(argv):
+    destino = argv[1] if len(argv) > 1 else DESTINO
+    manifesto = construir(destino=destino)
+    comprimidos = sum(1 for item in manifesto.values() if item['variantes'])
+    print(f"{len(manifesto)} arquivo(s) em {destino}, {comprimidos} com variantes comprimidas.")
+    if brotli is None:
+        print("Pacote brotli nao instalado: apenas variantes gzip.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,103 @@
+"""
+Build dos arquivos de static/ para servir direto da memória.
+
+Para cada arquivo gera uma cópia com o hash do conteúdo no nome (JS, CSS e
+imagens; os HTML mantêm o nome, porque são a URL que o usuário abre e se
+referenciam em ciclo) e as variantes .gz e .br dos arquivos de texto. As
+referências locais dentro de HTML e CSS são reescritas para os nomes com
+hash. O resultado, com o manifest.json, vai para build/static.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ORIGEM = os.path.join(RAIZ, 'static')
+DESTINO = os.path.join(RAIZ, 'build', 'static')
+MANIFESTO = 'manifest.json'
+
+TEXTO = ('.html', '.js', '.css', '.svg', '.json', '.txt', '.map')
+# Ordem de processamento: quem é referenciado vem antes de quem referencia
+ORDEM = {'.css': 1, '.js': 2, '.html': 3}
+TAMANHO_HASH = 12
+
+_REFERENCIA = re.compile(r'''(\b(?:src|href)\s*=\s*["']|url\(\s*["']?)([^"')\s]+)''')
+
+def _caminhos(origem):
+    for pasta, _, nomes in os.walk(origem):
+        for nome in nomes:
+            relativo = os.path.relpath(os.path.join(pasta, nome), origem).replace(os.sep, '/')
+            if not nome.startswith('.'):
+                yield relativo
+
+def _reescrever(conteudo, relativo, urls):
+    """Troca as referências locais conhecidas pelos nomes com hash."""
+    base = posixpath.dirname(relativo)
+    texto = conteudo.decode('utf-8')
+
+    def trocar(casamento):
+        prefixo, alvo = casamento.groups()
+        caminho, sufixo = re.match(r'([^?#]*)(.*)', alvo).groups()
+        if not caminho or '//' in caminho or ':' in caminho:
+            return casamento.group(0)
+        absoluto = caminho.startswith('/')
+        chave = posixpath.normpath(caminho.lstrip('/') if absoluto else posixpath.join(base, caminho))
+        if chave not in urls or urls[chave] == chave:
+            return casamento.group(0)
+        novo = '/' + urls[chave] if absoluto else posixpath.relpath(urls[chave], base or '.')
+        return prefixo + novo + sufixo
+
+    return _REFERENCIA.sub(trocar, texto).encode('utf-8')
+
+def _com_hash(relativo, digest):
+    raiz, extensao = posixpath.splitext(relativo)
+    return f'{raiz}.{digest[:TAMANHO_HASH]}{extensao}'
+
+def _variantes(conteudo):
+    variantes = {'gzip': gzip.compress(conteudo, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes['br'] = brotli.compress(conteudo, quality=11)
+    # Só vale a pena servir a variante se ela for menor que o original
+    return {nome: dados for nome, dados in variantes.items() if len(dados) < len(conteudo)}
+
+def _gravar(destino, relativo, dados):
+    caminho = os.path.join(destino, *relativo.split('/'))
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(dados)
+
+def construir(origem=ORIGEM, destino=DESTINO):
+    """Gera o build e devolve o manifesto {nome: {url, hash, variantes}}."""
+    if os.path.isdir(destino):
+        shutil.rmtree(destino)
+    relativos = sorted(_caminhos(origem), key=lambda r: (ORDEM.get(posixpath.splitext(r)[1], 0), r))
+    urls, manifesto = {}, {}
+    for relativo in relativos:
+        extensao = posixpath.splitext(relativo)[1].lower()
+        with open(os.path.join(origem, *relativo.split('/')), 'rb') as arquivo:
+            conteudo = arquivo.read()
+        if extensao in ('.html', '.css'):
+            conteudo = _reescrever(conteudo, relativo, urls)
+        digest = hashlib.sha256(conteudo).hexdigest()
+        url = relativo if extensao == '.html' else _com_hash(relativo, digest)
+        urls[relativo] = url
+
+        variantes = _variantes(conteudo) if extensao in TEXTO else {}
+        _gravar(destino, url, conteudo)
+        for nome, dados in variantes.items():
+            _gravar(destino, url + ('.br' if nome == 'br' else '.gz'), dados)
+        manifesto[relativo] = {'url': url, 'hash': digest[:TAMANHO_HASH], 'variantes': sorted(variantes)}
+
+    with open(os.path.join(destino, MANIFESTO), 'w') as arquivo:
+        json.dump(manifesto, arquivo, indent=1, sort_keys=True)
+    return manifesto
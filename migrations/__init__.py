@@ -0,0 +1,130 @@
+"""
+Migracoes versionadas do banco.
+
+Cada modulo `vNNN_*.py` deste pacote define VERSAO, DESCRICAO e
+`upgrade(conn)`. As versoes aplicadas ficam registradas na tabela
+`schema_migrations`, entao rodar de novo so aplica o que falta:
+
+    python -m migrations upgrade
+    python -m migrations status
+"""
+
+import importlib
+import pkgutil
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import text, inspect
+
+from models.database import get_engine
+
+TABELA_VERSOES = 'schema_migrations'
+
+def listar_migracoes():
+    """Retorna os modulos de migracao em ordem de versao."""
+    modulos = []
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith('v') and info.name[1:4].isdigit():
+            modulos.append(importlib.import_module(f'{__name__}.{info.name}'))
+    return sorted(modulos, key=lambda m: m.VERSAO)
+
+def _garantir_tabela_versoes(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {TABELA_VERSOES} ("
+            "versao VARCHAR(20) PRIMARY KEY, descricao VARCHAR(200), aplicada_em VARCHAR(30))"
+        ))
+
+def versoes_aplicadas(engine=None):
+    engine = engine or get_engine()
+    _garantir_tabela_versoes(engine)
+    with engine.connect() as conn:
+        return {r[0] for r in conn.execute(text(f"SELECT versao FROM {TABELA_VERSOES}"))}
+
+def upgrade(engine=None):
+    """Aplica as migracoes pendentes e retorna as versoes aplicadas agora."""
+    engine = engine or get_engine()
+    aplicadas = versoes_aplicadas(engine)
+    novas = []
+    for migracao in listar_migracoes():
+        if migracao.VERSAO in aplicadas:
+            continue
+        print(f"Aplicando {migracao.VERSAO}: {migracao.DESCRICAO}")
+        # Sem transacao envolvendo tudo: cada migracao controla a sua (ex.: CREATE INDEX CONCURRENTLY)
+        with engine.connect() as conn:
+            migracao.upgrade(conn)
+        with engine.begin() as conn:
+            conn.execute(
+                text(f"INSERT INTO {TABELA_VERSOES} (versao, descricao, aplicada_em) VALUES (:v, :d, :a)"),
+                {"v": migracao.VERSAO, "d": migracao.DESCRICAO, "a": datetime.utcnow().isoformat()}
+            )
+        novas.append(migracao.VERSAO)
+    return novas
+
+@contextmanager
+def autocommit(conn):
+    """Coloca a conexao em AUTOCOMMIT (exigido pelo CONCURRENTLY) e depois
+    volta ao nivel padrao.
+
+    O SQLAlchemy nao deixa trocar o isolamento com uma transacao aberta, e
+    qualquer consulta anterior (inclusive o inspect) abre uma; por isso ela
+    e encerrada antes, nos dois sentidos.
+    """
+    conn.commit()
+    conn.execution_options(isolation_level="AUTOCOMMIT")
+    try:
+        yield conn
+    finally:
+        conn.commit()
+        conn.execution_options(isolation_level=conn.default_isolation_level)
+
+def criar_indice_online(conn, nome, tabela, colunas):
+    """CREATE INDEX sem bloquear escritas (CONCURRENTLY no Postgres).
+
+    Ignora tabelas que ainda nao existem neste banco; elas recebem o indice
+    pelo create_all dos modelos quando forem criadas.
+    """
+    inspetor = inspect(conn)
+    if not inspetor.has_table(tabela):
+        print(f"  {tabela}: tabela inexistente, ignorada")
+        return False
+    cols = ', '.join(colunas)
+    if conn.dialect.name == 'postgresql':
+        with autocommit(conn):
+            # Um CONCURRENTLY interrompido deixa o indice INVALID: remove e recria
+            invalido = conn.execute(text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :nome AND NOT i.indisvalid"), {"nome": nome}).first()
+            if invalido:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nome}"))
+            conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nome} ON {tabela} ({cols})"))
+    else:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({cols})"))
+        conn.commit()
+    print(f"  {nome} ON {tabela} ({cols})")
+    return True
+
+def remover_indice_online(conn, nome):
+    """DROP INDEX sem bloquear escritas (CONCURRENTLY no Postgres)."""
+    if conn.dialect.name == 'postgresql':
+        with autocommit(conn):
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nome}"))
+    else:
+        conn.execute(text(f"DROP INDEX IF EXISTS {nome}"))
+        conn.commit()
+    print(f"  {nome} removido")
+
+def adicionar_coluna(conn, coluna):
+    """ALTER TABLE ... ADD COLUMN a partir da Column do modelo.
+
+    Ignora tabelas inexistentes e colunas que ja existem. Colunas novas sao
+    nulaveis e sem default, entao o Postgres nao reescreve a tabela.
+    """
+    tabela = coluna.table.name
+    inspetor = inspect(conn)
+    if not inspetor.has_table(tabela) or coluna.name in {c['name'] for c in inspetor.get_columns(tabela)}:
+        return False
+    tipo = coluna.type.compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna.name} {tipo}"))
+    conn.commit()
+    print(f"  {tabela}.{coluna.name} {tipo}")
+    return True
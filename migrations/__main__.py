@@ -0,0 +1,30 @@
+import sys
+from models.database import get_engine
+from migrations import upgrade, versoes_aplicadas, listar_migracoes
+from migrations.planos import verificar_planos
+
+def main(argv):
+    comando = argv[1] if len(argv) > 1 else 'upgrade'
+    engine = get_engine()
+    if comando == 'upgrade':
+        novas = upgrade(engine)
+        print(f"{len(novas)} migracao(oes) aplicada(s)." if novas else "Banco ja esta atualizado.")
+    elif comando == 'status':
+        aplicadas = versoes_aplicadas(engine)
+        for m in listar_migracoes():
+            print(f"[{'x' if m.VERSAO in aplicadas else ' '}] {m.VERSAO} {m.DESCRICAO}")
+    elif comando == 'explain':
+        falhas = 0
+        for indice, usado, plano in verificar_planos(engine):
+            print(f"{'OK  ' if usado else 'FALHA'} {indice}")
+            if not usado:
+                falhas += 1
+                print('      ' + plano.replace('\n', '\n      '))
+        return 1 if falhas else 0
+    else:
+        print("Uso: python -m migrations [upgrade|status|explain]")
+        return 2
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,99 @@
+"""
+Verificacao de planos (EXPLAIN) das consultas quentes das listagens.
+
+As consultas sao montadas com o mesmo codigo das rotas (filtro por tenant
+da rota, `ordenar` da paginacao e as funcoes de services/), na primeira
+pagina e na pagina seguinte (com cursor), e compiladas para o dialeto do
+banco. `python -m migrations explain` e tests/test_planos.py falham se
+alguma nao usar o indice esperado ou, nas listagens paginadas, se o banco
+precisar ordenar depois de filtrar (a ordem tem que sair do indice).
+"""
+
+import re
+from datetime import date
+from sqlalchemy import text, inspect
+from sqlalchemy.orm import Session
+
+TENANT = 'tenant'
+
+def _listagem(session, modelo, coluna, desc=False, apos=None):
+    # Mesma forma de routes/*: filter_by(tenant_id) + paginar(coluna, id)
+    from routes.paginacao import ordenar
+    query = session.query(modelo).filter_by(tenant_id=TENANT)
+    return ordenar(query, coluna, modelo.id, desc, apos)
+
+def consultas_quentes(session):
+    """[(indice esperado, tabela, consulta, ordem_pelo_indice)] das rotas de listagem."""
+    from models.animals import Egua, Receptora, EventoAnimal
+    from models.custo_prenhez import ItemCusto, Procedimento, CalculoPrenhez
+    from models.embryo import Embriao
+    from models.extras import Lancamento
+    from models.financeiro import TransacaoFinanceira
+    from routes.paginacao import ordenar
+    from services import eventos_animal, inventario_embrioes as inventario
+
+    listagens = [
+        ('ix_eguas_tenant_nome_id', Egua, Egua.nome, False, 'M'),
+        ('ix_receptoras_new_tenant_nome_id', Receptora, Receptora.nome, False, 'M'),
+        ('ix_itens_custo_tenant_nome_id', ItemCusto, ItemCusto.nome, False, 'M'),
+        ('ix_procedimentos_tenant_nome_id', Procedimento, Procedimento.nome, False, 'M'),
+        ('ix_calculos_prenhez_tenant_id', CalculoPrenhez, CalculoPrenhez.id, False, 10),
+        ('ix_financeiro_lancamentos_tenant_data_vencimento_id', Lancamento, Lancamento.data_vencimento, True,
+         date(2024, 1, 1)),
+        ('ix_transacoes_financeiras_tenant_data_transacao_id', TransacaoFinanceira,
+         TransacaoFinanceira.data_transacao, True, date(2024, 1, 1)),
+    ]
+    consultas = []
+    for indice, modelo, coluna, desc, valor in listagens:
+        tabela = modelo.__tablename__
+        consultas.append((indice, tabela, _listagem(session, modelo, coluna, desc), True))
+        consultas.append((indice, tabela, _listagem(session, modelo, coluna, desc, apos=(valor, 10)), True))
+
+    estoque = inventario.consultar(session, TENANT, {})
+    consultas += [
+        # status IN (...) cobre dois trechos do indice: aqui so o filtro conta
+        ('ix_embrioes_tenant_status_local', 'embrioes', ordenar(estoque, Embriao.id, Embriao.id), False),
+        ('ix_embrioes_tenant_status_local', 'embrioes',
+         inventario.consultar_locais(session, TENANT, {'botijao': ['B1']}), False),
+        ('ix_embrioes_tenant_doadora_garanhao', 'embrioes',
+         inventario.consultar(session, TENANT, {'doadora': [1], 'garanhao': ['G']}), False),
+    ]
+    eventos = eventos_animal.consultar(session, TENANT, 1)
+    consultas += [
+        ('ix_eventos_animal_tenant_animal_data_id', 'eventos_animal',
+         ordenar(eventos, EventoAnimal.data, EventoAnimal.id, desc=True), True),
+        ('ix_eventos_animal_tenant_animal_data_id', 'eventos_animal',
+         ordenar(eventos, EventoAnimal.data, EventoAnimal.id, desc=True, apos=(date(2024, 1, 1), 10)), True),
+    ]
+    return consultas
+
+def _sql(conn, query):
+    return str(query.statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+def _plano(conn, sql):
+    if conn.dialect.name == 'postgresql':
+        # Em tabelas pequenas o planner prefere seq scan; aqui so importa se o indice e elegivel
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        linhas = conn.execute(text("EXPLAIN " + sql)).fetchall()
+    else:
+        linhas = conn.execute(text("EXPLAIN QUERY PLAN " + sql)).fetchall()
+    return '\n'.join(str(l[-1]) for l in linhas)
+
+# Passo de ordenacao explicito no plano
+_ORDENACAO = re.compile(r'TEMP B-TREE FOR ORDER BY|^\s*(->\s*)?(Incremental )?Sort\b', re.M)
+
+def verificar_planos(engine):
+    """Retorna [(indice, usado, plano)] para as consultas cujas tabelas existem."""
+    resultados = []
+    inspetor = inspect(engine)
+    with engine.begin() as conn:
+        for indice, tabela, query, ordem_pelo_indice in consultas_quentes(Session(bind=conn)):
+            if not inspetor.has_table(tabela):
+                continue
+            sql = _sql(conn, query)
+            plano = _plano(conn, sql)
+            usado = re.search(rf'\b{indice}\b', plano) is not None
+            if ordem_pelo_indice and _ORDENACAO.search(plano):
+                usado = False
+            resultados.append((indice, usado, plano + '\n' + sql))
+    return resultados
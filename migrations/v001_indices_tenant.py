@@ -0,0 +1,25 @@
+"""Indices compostos (tenant_id, coluna de ordenacao) em todas as tabelas multi-tenant."""
+
+from migrations import criar_indice_online
+
+VERSAO = '001'
+DESCRICAO = 'Indices (tenant_id, ordenacao) nas tabelas multi-tenant'
+
+INDICES = [
+    ('ix_eguas_tenant_nome', 'eguas', ['tenant_id', 'nome']),
+    ('ix_receptoras_new_tenant_nome', 'receptoras_new', ['tenant_id', 'nome']),
+    ('ix_itens_custo_tenant_nome', 'itens_custo', ['tenant_id', 'nome']),
+    ('ix_procedimentos_tenant_nome', 'procedimentos', ['tenant_id', 'nome']),
+    ('ix_calculos_prenhez_tenant_id', 'calculos_prenhez', ['tenant_id', 'id']),
+    ('ix_financeiro_lancamentos_tenant_data_vencimento', 'financeiro_lancamentos', ['tenant_id', 'data_vencimento']),
+    ('ix_vaas_atendimentos_tenant_data_agendada', 'vaas_atendimentos', ['tenant_id', 'data_agendada']),
+    ('ix_transacoes_financeiras_tenant_data_transacao', 'transacoes_financeiras', ['tenant_id', 'data_transacao']),
+    ('ix_embrioes_tenant_status', 'embrioes', ['tenant_id', 'status']),
+    ('ix_sessoes_opu_tenant_data_procedimento', 'sessoes_opu', ['tenant_id', 'data_procedimento']),
+    ('ix_potros_tenant_data_nascimento', 'potros', ['tenant_id', 'data_nascimento']),
+    ('ix_propriedades_tenant_nome', 'propriedades', ['tenant_id', 'nome']),
+]
+
+def upgrade(conn):
+    for nome, tabela, colunas in INDICES:
+        criar_indice_online(conn, nome, tabela, colunas)
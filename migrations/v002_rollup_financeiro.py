@@ -0,0 +1,18 @@
+"""Tabela financeiro_rollup_mensal e backfill a partir de transacoes_financeiras."""
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+VERSAO = '002'
+DESCRICAO = 'Rollup financeiro mensal (tenant, ano, mes, categoria, tipo)'
+
+def upgrade(conn):
+    from models.financeiro import RollupFinanceiroMensal, reconstruir_rollup
+    RollupFinanceiroMensal.__table__.create(conn, checkfirst=True)
+    conn.commit()
+    if inspect(conn).has_table('transacoes_financeiras'):
+        # A conn ja tem transacao aberta: a sessao trabalha num savepoint
+        # dela e o commit da conn e que grava o backfill
+        reconstruir_rollup(Session(bind=conn, join_transaction_mode="create_savepoint"))
+        conn.commit()
+        print("  financeiro_rollup_mensal reconstruido")
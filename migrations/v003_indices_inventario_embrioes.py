@@ -0,0 +1,23 @@
+"""Indices do inventario de embrioes (local no botijao e cruzamento)."""
+
+from sqlalchemy import inspect
+
+from migrations import criar_indice_online, remover_indice_online
+
+VERSAO = '003'
+DESCRICAO = 'Indices do inventario de embrioes'
+
+INDICES = [
+    ('ix_embrioes_tenant_status_local', 'embrioes', ['tenant_id', 'status', 'botijao', 'caneca']),
+    ('ix_embrioes_tenant_doadora_garanhao', 'embrioes', ['tenant_id', 'doadora_id', 'garanhao_nome']),
+]
+
+# Prefixo do novo indice de local, fica redundante
+INDICE_SUBSTITUIDO = 'ix_embrioes_tenant_status'
+
+def upgrade(conn):
+    criados = [criar_indice_online(conn, nome, tabela, colunas) for nome, tabela, colunas in INDICES]
+    if not criados[0] or INDICE_SUBSTITUIDO not in {i['name'] for i in inspect(conn).get_indexes('embrioes')}:
+        return
+    # O get_indexes abriu uma transacao; remover_indice_online encerra antes do CONCURRENTLY
+    remover_indice_online(conn, INDICE_SUBSTITUIDO)
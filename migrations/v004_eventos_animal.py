@@ -0,0 +1,55 @@
+"""Tabela eventos_animal e migracao das strings Egua.historico para eventos."""
+
+from datetime import datetime, time
+from sqlalchemy import inspect, select
+
+VERSAO = '004'
+DESCRICAO = 'Historico dos animais em eventos_animal'
+
+TAMANHO_LOTE = 500
+
+def upgrade(conn):
+    from models.animals import Egua, EventoAnimal
+    from services.eventos_animal import separar_historico
+    EventoAnimal.__table__.create(conn, checkfirst=True)
+    conn.commit()
+    if not inspect(conn).has_table('eguas'):
+        return
+
+    E, V = Egua.__table__, EventoAnimal.__table__
+    ultimo_id = 0
+    total = 0
+    while True:
+        eguas = conn.execute(
+            select(E.c.id, E.c.tenant_id, E.c.historico, E.c.data_cadastro)
+            .where(E.c.id > ultimo_id, E.c.historico.is_not(None), E.c.historico != '')
+            .order_by(E.c.id).limit(TAMANHO_LOTE)
+        ).fetchall()
+        if not eguas:
+            break
+        ultimo_id = eguas[-1].id
+        # Cada lote e gravado inteiro: eguas com eventos migrados ja passaram
+        # por uma execucao anterior interrompida e nao sao duplicadas
+        migradas = set(conn.execute(
+            select(V.c.animal_id).distinct()
+            .where(V.c.animal_id.in_([e.id for e in eguas]), V.c.tipo == 'migrado')
+        ).scalars())
+        linhas = []
+        for egua in eguas:
+            if egua.id in migradas:
+                continue
+            # Trechos sem data ficam com a data de cadastro da egua
+            padrao = datetime.combine(egua.data_cadastro, time()) if egua.data_cadastro else datetime.utcnow()
+            for descricao, data in separar_historico(egua.historico, data_padrao=padrao):
+                linhas.append({
+                    'tenant_id': egua.tenant_id or '',
+                    'animal_id': egua.id,
+                    'tipo': 'migrado',
+                    'descricao': descricao,
+                    'data': data,
+                })
+        if linhas:
+            conn.execute(V.insert(), linhas)
+        conn.commit()
+        total += len(linhas)
+    print(f"  {total} evento(s) migrado(s) de eguas.historico")
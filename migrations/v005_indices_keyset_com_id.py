@@ -0,0 +1,32 @@
+"""Indices (tenant_id, ordenacao, id) para a paginacao por cursor.
+
+Com o id no fim, a ORDER BY coluna, id das listagens sai direto do indice
+(nos dois sentidos), sem ordenar depois de filtrar. Os indices antigos
+(tenant_id, ordenacao) viram prefixo dos novos e sao removidos.
+"""
+
+from migrations import criar_indice_online, remover_indice_online
+
+VERSAO = '005'
+DESCRICAO = 'Indices (tenant_id, ordenacao, id) da paginacao por cursor'
+
+# (novo, tabela, colunas, substituido)
+INDICES = [
+    ('ix_eguas_tenant_nome_id', 'eguas', ['tenant_id', 'nome', 'id'], 'ix_eguas_tenant_nome'),
+    ('ix_receptoras_new_tenant_nome_id', 'receptoras_new', ['tenant_id', 'nome', 'id'],
+     'ix_receptoras_new_tenant_nome'),
+    ('ix_itens_custo_tenant_nome_id', 'itens_custo', ['tenant_id', 'nome', 'id'], 'ix_itens_custo_tenant_nome'),
+    ('ix_procedimentos_tenant_nome_id', 'procedimentos', ['tenant_id', 'nome', 'id'],
+     'ix_procedimentos_tenant_nome'),
+    ('ix_financeiro_lancamentos_tenant_data_vencimento_id', 'financeiro_lancamentos',
+     ['tenant_id', 'data_vencimento', 'id'], 'ix_financeiro_lancamentos_tenant_data_vencimento'),
+    ('ix_transacoes_financeiras_tenant_data_transacao_id', 'transacoes_financeiras',
+     ['tenant_id', 'data_transacao', 'id'], 'ix_transacoes_financeiras_tenant_data_transacao'),
+    ('ix_eventos_animal_tenant_animal_data_id', 'eventos_animal', ['tenant_id', 'animal_id', 'data', 'id'],
+     'ix_eventos_animal_tenant_animal_data'),
+]
+
+def upgrade(conn):
+    for nome, tabela, colunas, substituido in INDICES:
+        if criar_indice_online(conn, nome, tabela, colunas):
+            remover_indice_online(conn, substituido)
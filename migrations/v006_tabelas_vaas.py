@@ -0,0 +1,31 @@
+"""Tabelas do VaaS, incluindo itens_fatura_vaas do faturamento em lote."""
+
+from sqlalchemy import text, inspect
+
+VERSAO = '006'
+DESCRICAO = 'Tabelas VaaS e itens_fatura_vaas'
+
+# Uma fatura por tenant/competencia (faturas_vaas criadas antes da restricao)
+UNICO_FATURA = 'uq_faturas_vaas_tenant_competencia'
+
+def upgrade(conn):
+    import models.user  # alvo das chaves estrangeiras para usuarios
+    from models.vaas import (PlanoVaaS, AssinaturaVaaS, ContratoVeterinario, AtendimentoVaaS,
+                             FaturaVaaS, ItemFaturaVaaS, MetricaVaaS)
+    faturas_existiam = inspect(conn).has_table('faturas_vaas')
+    # Em ordem de dependencia das chaves estrangeiras
+    for modelo in (PlanoVaaS, AssinaturaVaaS, ContratoVeterinario, AtendimentoVaaS,
+                   FaturaVaaS, ItemFaturaVaaS, MetricaVaaS):
+        modelo.__table__.create(conn, checkfirst=True)
+    conn.commit()
+    if not faturas_existiam:
+        return
+    inspetor = inspect(conn)
+    nomes = {u['name'] for u in inspetor.get_unique_constraints('faturas_vaas')}
+    nomes |= {i['name'] for i in inspetor.get_indexes('faturas_vaas')}
+    if UNICO_FATURA not in nomes:
+        # Falha se ja houver faturas duplicadas: elas precisam ser resolvidas antes
+        conn.execute(text(f"CREATE UNIQUE INDEX {UNICO_FATURA} "
+                          "ON faturas_vaas (tenant_id, ano_referencia, mes_referencia)"))
+        conn.commit()
+        print(f"  {UNICO_FATURA} criado")
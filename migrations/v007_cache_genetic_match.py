@@ -0,0 +1,16 @@
+"""Tabelas do genetic match, versao do plantel e fingerprint das solicitacoes."""
+
+from migrations import adicionar_coluna, criar_indice_online
+
+VERSAO = '007'
+DESCRICAO = 'Genetic match: match_pool_versions e cache por fingerprint'
+
+def upgrade(conn):
+    from models import genetic_match
+    # Cria o que falta (inclusive match_pool_versions); tabelas existentes ficam como estao
+    genetic_match.Base.metadata.create_all(conn, checkfirst=True)
+    conn.commit()
+    S = genetic_match.SolicitacaoMatch.__table__
+    for coluna in (S.c.fingerprint, S.c.versao_plantel):
+        adicionar_coluna(conn, coluna)
+    criar_indice_online(conn, 'ix_match_requests_tenant_fingerprint', 'match_requests', ['tenant_id', 'fingerprint'])
@@ -0,0 +1,11 @@
+"""Coluna animals.valor_cobertura lida pelo catalogo do genetic match."""
+
+from migrations import adicionar_coluna
+
+VERSAO = '008'
+DESCRICAO = 'Genetic match: animals.valor_cobertura'
+
+def upgrade(conn):
+    from models.genetic_match import Animal
+    # A versao do plantel (match_pool_versions) que o catalogo compara vem da 007
+    adicionar_coluna(conn, Animal.__table__.c.valor_cobertura)
@@ -0,0 +1,23 @@
+"""Tabela animal_repro_stats, populada a partir de OPU, transferencias e gestacoes."""
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+VERSAO = '009'
+DESCRICAO = 'Estatisticas reprodutivas por egua (animal_repro_stats)'
+
+def upgrade(conn):
+    from models.animals import EstatisticaReprodutiva
+    EstatisticaReprodutiva.__table__.create(conn, checkfirst=True)
+    conn.commit()
+    if not inspect(conn).has_table('procedimentos_opu'):
+        return  # banco sem o schema legado: nada a calcular
+
+    from src.models.models import ProcedimentoOPU, TransferenciaEmbriao, Gestacao
+    from services import estatisticas_reprodutivas
+    estatisticas_reprodutivas.instalar(ProcedimentoOPU, TransferenciaEmbriao, Gestacao)
+    # Savepoint na transacao da conexao: o commit da sessao nao a encerra
+    total = estatisticas_reprodutivas.reconstruir_estatisticas(
+        Session(bind=conn, join_transaction_mode="create_savepoint"))
+    conn.commit()
+    print(f"  {total} animal(is) com estatisticas calculadas")
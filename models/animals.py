@@ -1,24 +1,78 @@
-from sqlalchemy import Column, Integer, String, Date, Float
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Text, ForeignKey, Index
 from models.database import Base
 from datetime import datetime
+# Egua estende a tabela eguas de models.user, que precisa ser definida antes
+import models.user
 
 class Egua(Base):
     __tablename__ = 'eguas'
-    __table_args__ = {'extend_existing': True} 
+    __table_args__ = (
+        Index('ix_eguas_tenant_nome_id', 'tenant_id', 'nome', 'id'),
+        {'extend_existing': True},
+    )
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50))
     nome = Column(String(100))
     registro = Column(String(50))
     status = Column(String(50))
-    historico = Column(String(500))
+    historico = Column(String(500)) # Legado: substituido por eventos_animal
     data_cadastro = Column(Date, default=datetime.utcnow)
 
 class Receptora(Base):
     __tablename__ = 'receptoras_new'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_receptoras_new_tenant_nome_id', 'tenant_id', 'nome', 'id'),
+        {'extend_existing': True},
+    )
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50))
     nome = Column(String(100))
     lote = Column(String(50))
     status = Column(String(50))
     obs = Column(String(255))
+
+# Tipos de evento no historico do animal
+TIPOS_EVENTO = ('cadastro', 'anotacao', 'status', 'migrado')
+
+class EventoAnimal(Base):
+    """Historico do animal, um registro por evento (somente insercao)."""
+    __tablename__ = 'eventos_animal'
+    __table_args__ = (
+        Index('ix_eventos_animal_tenant_animal_data_id', 'tenant_id', 'animal_id', 'data', 'id'),
+    )
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String(50), nullable=False)
+    animal_id = Column(Integer, ForeignKey('eguas.id'), nullable=False)
+    tipo = Column(String(20), nullable=False, default='anotacao')
+    descricao = Column(Text)
+    data = Column(DateTime, nullable=False, default=datetime.utcnow) # Quando o evento aconteceu
+    data_registro = Column(DateTime, default=datetime.utcnow)
+    usuario_id = Column(String(50))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "animal_id": self.animal_id,
+            "tipo": self.tipo,
+            "descricao": self.descricao,
+            "data": self.data.isoformat() if self.data else None,
+            "data_registro": self.data_registro.isoformat() if self.data_registro else None,
+            "usuario_id": self.usuario_id,
+        }
+
+class EstatisticaReprodutiva(Base):
+    """Totais reprodutivos por egua (OPU, transferencias e gestacoes).
+
+    Mantida por services/estatisticas_reprodutivas.py a cada alteracao
+    nessas tabelas; criada e populada pela migracao 009.
+    """
+    __tablename__ = 'animal_repro_stats'
+    animal_id = Column(Integer, ForeignKey('eguas.id'), primary_key=True)
+    total_coletas = Column(Integer, nullable=False, default=0)
+    total_ccos = Column(Integer, nullable=False, default=0)
+    data_ultimo_procedimento = Column(String(10))
+    total_transferencias = Column(Integer, nullable=False, default=0)
+    total_gestacoes = Column(Integer, nullable=False, default=0)
+    gestacoes_confirmadas = Column(Integer, nullable=False, default=0)
+    perdas_embrionarias = Column(Integer, nullable=False, default=0)
+    data_atualizacao = Column(DateTime)
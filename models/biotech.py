@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Boolean, Text, DateTime
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Boolean, Text, DateTime, Index
 from sqlalchemy.orm import relationship
 from models.database import Base
 from datetime import datetime
 
 class SessaoOPU(Base):
     __tablename__ = 'sessoes_opu'
+    __table_args__ = (Index('ix_sessoes_opu_tenant_data_procedimento', 'tenant_id', 'data_procedimento'),)
 
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 from models.database import Base
 
@@ -17,7 +17,10 @@ calculo_procedimentos = Table('calculo_procedimentos', Base.metadata,
 
 class ItemCusto(Base):
     __tablename__ = 'itens_custo'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_itens_custo_tenant_nome_id', 'tenant_id', 'nome', 'id'),
+        {'extend_existing': True},
+    )
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50))
     nome = Column(String(100))
@@ -31,7 +34,10 @@ class ItemCusto(Base):
 
 class Procedimento(Base):
     __tablename__ = 'procedimentos'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_procedimentos_tenant_nome_id', 'tenant_id', 'nome', 'id'),
+        {'extend_existing': True},
+    )
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50))
     nome = Column(String(100))
@@ -42,7 +48,10 @@ class Procedimento(Base):
 
 class CalculoPrenhez(Base):
     __tablename__ = 'calculos_prenhez'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_calculos_prenhez_tenant_id', 'tenant_id', 'id'),
+        {'extend_existing': True},
+    )
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50))
     nome = Column(String(100))
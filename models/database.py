@@ -1,20 +1,222 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker, declarative_base
+import threading
+import time
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import scoped_session, sessionmaker, declarative_base, Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.pool import QueuePool
 
 # 1. Tenta pegar a URL do Banco do Render. Se nao tiver, usa sqlite local.
 database_url = os.environ.get('DATABASE_URL', 'sqlite:///haras.db')
 
 # 2. Correcao necessaria para o Render (ele fornece 'postgres://' mas o SQLAlchemy pede 'postgresql://')
-if database_url and database_url.startswith("postgres://"):
-    database_url = database_url.replace("postgres://", "postgresql://", 1)
+def _normalizar_url(url):
+    if url and url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
 
-# 3. Cria a conexao
-engine = create_engine(database_url)
+database_url = _normalizar_url(database_url)
 
-db_session = scoped_session(sessionmaker(autocommit=False,
-                                         autoflush=False,
-                                         bind=engine))
+# Replica somente leitura (opcional). Sem ela tudo vai para o primario.
+replica_url = _normalizar_url(os.environ.get('DATABASE_REPLICA_URL'))
+
+# 3. Configuracao do pool (cada worker do gunicorn tem o seu proprio pool)
+def _env_int(nome, padrao):
+    try:
+        return int(os.environ.get(nome, padrao))
+    except ValueError:
+        return padrao
+
+def _env_bool(nome, padrao):
+    valor = os.environ.get(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() in ('1', 'true', 'sim', 'yes', 'on')
+
+POOL_CONFIG = {
+    'pool_size': _env_int('DB_POOL_SIZE', 5),
+    'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+    'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+    'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+    'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+}
+
+class PoolMedido(QueuePool):
+    """QueuePool que mede o tempo de espera por uma conexao livre."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.esperas = 0
+        self.tempo_espera_total = 0.0
+        self.tempo_espera_max = 0.0
+        self.timeouts = 0
+        self._lock_metricas = threading.Lock()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._lock_metricas:
+                self.timeouts += 1
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with self._lock_metricas:
+                self.esperas += 1
+                self.tempo_espera_total += espera
+                self.tempo_espera_max = max(self.tempo_espera_max, espera)
+
+def criar_engine(url=None):
+    """Cria uma engine com o pool configurado pelas variaveis DB_POOL_*."""
+    url = url or database_url
+    if url.startswith('sqlite'):
+        # SQLite e um arquivo local: sem pool de rede para dimensionar
+        return create_engine(url)
+    return create_engine(url, poolclass=PoolMedido, **POOL_CONFIG)
+
+# 4. As engines sao criadas sob demanda e por processo: o master do gunicorn
+#    nunca abre conexoes e cada worker recebe um pool novo depois do fork.
+_engines = {}
+_engines_pid = None
+_engine_lock = threading.Lock()
+
+def get_engine(replica=False):
+    global _engines_pid
+    pid = os.getpid()
+    if _engines_pid != pid:
+        with _engine_lock:
+            if _engines_pid != pid:
+                for herdada in _engines.values():
+                    # Conexoes herdadas do processo pai nao podem ser reutilizadas
+                    herdada.dispose(close=False)
+                _engines.clear()
+                _engines_pid = pid
+    papel = 'replica' if replica and replica_url else 'primario'
+    engine = _engines.get(papel)
+    if engine is None:
+        with _engine_lock:
+            engine = _engines.get(papel)
+            if engine is None:
+                engine = criar_engine(replica_url if papel == 'replica' else database_url)
+                _engines[papel] = engine
+    return engine
+
+# 5. Saude da replica: o teste de conexao vale por REPLICA_HEALTHCHECK_SECONDS;
+#    se ela cair, as leituras voltam para o primario e so tentamos de novo
+#    depois de REPLICA_RETRY_SECONDS.
+REPLICA_HEALTHCHECK_SECONDS = _env_int('REPLICA_HEALTHCHECK_SECONDS', 5)
+REPLICA_RETRY_SECONDS = _env_int('REPLICA_RETRY_SECONDS', 30)
+_replica_ok_ate = 0.0
+_replica_indisponivel_ate = 0.0
+
+def marcar_replica_indisponivel():
+    global _replica_ok_ate, _replica_indisponivel_ate
+    _replica_ok_ate = 0.0
+    _replica_indisponivel_ate = time.monotonic() + REPLICA_RETRY_SECONDS
+
+def replica_disponivel():
+    """Indica se as leituras podem ir para a replica neste momento."""
+    global _replica_ok_ate
+    agora = time.monotonic()
+    if not replica_url or agora < _replica_indisponivel_ate:
+        return False
+    if agora < _replica_ok_ate:
+        return True
+    try:
+        with get_engine(replica=True).connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        print(f"Replica indisponivel, usando primario: {e}")
+        marcar_replica_indisponivel()
+        return False
+    _replica_ok_ate = agora + REPLICA_HEALTHCHECK_SECONDS
+    return True
+
+# 6. Read-your-writes: depois que um tenant grava, as leituras dele ficam no
+#    primario por REPLICA_RYW_SECONDS (tempo maximo de atraso da replica).
+REPLICA_RYW_SECONDS = _env_int('REPLICA_RYW_SECONDS', 5)
+_ultimas_escritas = {}
+
+def registrar_escrita(tenant_id):
+    _ultimas_escritas[tenant_id] = time.monotonic()
+
+def escreveu_recentemente(tenant_id):
+    ultima = _ultimas_escritas.get(tenant_id)
+    return ultima is not None and time.monotonic() - ultima < REPLICA_RYW_SECONDS
+
+def estatisticas_pool(replica=False):
+    """Retorna o estado atual do pool do worker corrente."""
+    pool = get_engine(replica=replica).pool
+    stats = {
+        'pid': os.getpid(),
+        'pool_class': type(pool).__name__,
+        'status': pool.status(),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'pool_size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+        })
+    if isinstance(pool, PoolMedido):
+        with pool._lock_metricas:
+            stats.update({
+                'checkouts': pool.esperas,
+                'timeouts': pool.timeouts,
+                'wait_total_ms': round(pool.tempo_espera_total * 1000, 3),
+                'wait_avg_ms': round(pool.tempo_espera_total * 1000 / pool.esperas, 3) if pool.esperas else 0.0,
+                'wait_max_ms': round(pool.tempo_espera_max * 1000, 3),
+            })
+    return stats
+
+def __getattr__(nome):
+    # Compatibilidade com `from models.database import engine`
+    if nome == 'engine':
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+class SessaoHaras(Session):
+    """Sessao que resolve a engine do processo atual a cada operacao.
+
+    Com `info['replica']` ligado, consultas vao para a replica; escritas,
+    flushes e qualquer sessao com alteracoes pendentes ficam no primario.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (self.info.get('replica') and not self._flushing
+                and not isinstance(clause, UpdateBase)
+                and not (self.new or self.dirty or self.deleted)):
+            return get_engine(replica=True)
+        return get_engine()
+
+@event.listens_for(SessaoHaras, 'after_flush')
+def _coletar_tenants_escritos(session, flush_context):
+    tenants = session.info.setdefault('tenants_pendentes', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tenant_id = getattr(obj, 'tenant_id', None)
+        if tenant_id:
+            tenants.add(tenant_id)
+
+@event.listens_for(SessaoHaras, 'after_commit')
+def _registrar_tenants_escritos(session):
+    tenants = session.info.pop('tenants_pendentes', None)
+    if tenants:
+        for tenant_id in tenants:
+            registrar_escrita(tenant_id)
+        session.info.setdefault('tenants_commitados', set()).update(tenants)
+
+@event.listens_for(SessaoHaras, 'after_rollback')
+def _descartar_tenants_escritos(session):
+    session.info.pop('tenants_pendentes', None)
+
+db_session = scoped_session(sessionmaker(class_=SessaoHaras,
+                                         autocommit=False,
+                                         autoflush=False))
 
 Base = declarative_base()
 Base.query = db_session.query_property()
@@ -26,5 +228,5 @@ def init_db():
     import models.financeiro
     import models.custo_prenhez
     import models.potro
-    
-    Base.metadata.create_all(bind=engine)
+
+    Base.metadata.create_all(bind=get_engine())
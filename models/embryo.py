@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from models.database import Base
 from datetime import datetime
 
 class Embriao(Base):
     __tablename__ = 'embrioes'
+    __table_args__ = (
+        # Inventário: busca por local e por cruzamento (services/inventario_embrioes.py).
+        # O primeiro também atende os filtros só por (tenant_id, status).
+        Index('ix_embrioes_tenant_status_local', 'tenant_id', 'status', 'botijao', 'caneca'),
+        Index('ix_embrioes_tenant_doadora_garanhao', 'tenant_id', 'doadora_id', 'garanhao_nome'),
+    )
 
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50))
@@ -28,7 +34,7 @@ class Embriao(Base):
     palheta_cor = Column(String(50))
     
     # Destino (Se transferido)
-    receptora_id = Column(Integer, ForeignKey('receptoras.id'), nullable=True)
+    receptora_id = Column(Integer, ForeignKey('receptoras_new.id'), nullable=True) # tabela do modelo Receptora
     data_transferencia = Column(Date, nullable=True)
     
     # Relacionamento
@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, Date, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, Boolean, ForeignKey, Index
 from models.database import Base
 from datetime import datetime
 
 # --- FINANCEIRO ---
 class Lancamento(Base):
     __tablename__ = 'financeiro_lancamentos'
+    __table_args__ = (Index('ix_financeiro_lancamentos_tenant_data_vencimento_id', 'tenant_id', 'data_vencimento', 'id'),)
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50))
     tipo = Column(String(20)) # Receita / Despesa
@@ -18,6 +19,7 @@ class Lancamento(Base):
 # --- VaaS (Veterinarios) ---
 class AtendimentoVaas(Base):
     __tablename__ = 'vaas_atendimentos'
+    __table_args__ = (Index('ix_vaas_atendimentos_tenant_data_agendada', 'tenant_id', 'data_agendada'),)
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50))
     veterinario_nome = Column(String(100))
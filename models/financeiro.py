@@ -1,9 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
-from models.database import Base
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, event, inspect, func, extract, cast, literal, literal_column, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from models.database import Base, SessaoHaras
 from datetime import datetime
 
 class TransacaoFinanceira(Base):
     __tablename__ = 'transacoes_financeiras'
+    __table_args__ = (Index('ix_transacoes_financeiras_tenant_data_transacao_id', 'tenant_id', 'data_transacao', 'id'),)
 
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50))
@@ -14,3 +16,122 @@ class TransacaoFinanceira(Base):
     data_transacao = Column(Date, default=datetime.utcnow)
     observacoes = Column(String(500))
     animal_id = Column(Integer, nullable=True) 
+
+# --- ROLLUP MENSAL (materializado) ---
+# Totais por (tenant, ano, mes, categoria, tipo), mantidos a cada flush de
+# TransacaoFinanceira na mesma transacao da escrita. Escritas em massa que
+# nao passam pelo ORM (query.update/delete) exigem reconstruir_rollup().
+class RollupFinanceiroMensal(Base):
+    __tablename__ = 'financeiro_rollup_mensal'
+
+    tenant_id = Column(String(50), primary_key=True)
+    ano = Column(Integer, primary_key=True)
+    mes = Column(Integer, primary_key=True)
+    categoria = Column(String(100), primary_key=True)
+    tipo = Column(String(20), primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    quantidade = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, default=datetime.utcnow)
+
+# Categoria vazia ou nula vai para 'Geral', aqui e no reconstruir_rollup
+CATEGORIA_PADRAO = 'Geral'
+
+def _chave_rollup(tenant_id, data, categoria, tipo):
+    if data is None:
+        return None
+    return (tenant_id, data.year, data.month, categoria or CATEGORIA_PADRAO, tipo or '')
+
+def _manter_valor_antigo(target, value, oldvalue, initiator):
+    return value
+
+# active_history: ao alterar um campo ainda nao carregado, o ORM busca o valor
+# antigo, que o rollup precisa para descontar da linha anterior
+for _campo in (TransacaoFinanceira.tenant_id, TransacaoFinanceira.data_transacao, TransacaoFinanceira.categoria,
+               TransacaoFinanceira.tipo, TransacaoFinanceira.valor):
+    event.listen(_campo, 'set', _manter_valor_antigo, active_history=True, retval=True)
+
+def _valores_antigos(obj):
+    # Valores anteriores ao flush para os campos que definem a linha do rollup
+    estado = inspect(obj)
+    antigos = {}
+    for campo in ('tenant_id', 'data_transacao', 'categoria', 'tipo', 'valor'):
+        historico = estado.attrs[campo].history
+        if historico.deleted:
+            antigos[campo] = historico.deleted[0]
+        elif historico.unchanged:
+            antigos[campo] = historico.unchanged[0]
+        else:
+            antigos[campo] = getattr(obj, campo)
+    return antigos
+
+def _aplicar_deltas(conn, deltas):
+    tabela = RollupFinanceiroMensal.__table__
+    agora = datetime.utcnow()
+    dialeto = postgresql if conn.dialect.name == 'postgresql' else sqlite
+    for (tenant_id, ano, mes, categoria, tipo), (valor, qtd) in deltas.items():
+        if not valor and not qtd:
+            continue
+        stmt = dialeto.insert(tabela).values(tenant_id=tenant_id, ano=ano, mes=mes, categoria=categoria,
+                                             tipo=tipo, total=valor, quantidade=qtd, atualizado_em=agora)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['tenant_id', 'ano', 'mes', 'categoria', 'tipo'],
+            set_={'total': tabela.c.total + stmt.excluded.total,
+                  'quantidade': tabela.c.quantidade + stmt.excluded.quantidade,
+                  'atualizado_em': stmt.excluded.atualizado_em})
+        conn.execute(stmt)
+
+@event.listens_for(SessaoHaras, 'after_flush')
+def _atualizar_rollup(session, flush_context):
+    deltas = {}
+    def somar(chave, valor, qtd):
+        if chave is None:
+            return
+        atual = deltas.get(chave, (0.0, 0))
+        deltas[chave] = (atual[0] + valor, atual[1] + qtd)
+
+    for obj in session.new:
+        if isinstance(obj, TransacaoFinanceira):
+            somar(_chave_rollup(obj.tenant_id, obj.data_transacao, obj.categoria, obj.tipo), obj.valor or 0.0, 1)
+    for obj in session.dirty:
+        if isinstance(obj, TransacaoFinanceira) and session.is_modified(obj, include_collections=False):
+            a = _valores_antigos(obj)
+            somar(_chave_rollup(a['tenant_id'], a['data_transacao'], a['categoria'], a['tipo']), -(a['valor'] or 0.0), -1)
+            somar(_chave_rollup(obj.tenant_id, obj.data_transacao, obj.categoria, obj.tipo), obj.valor or 0.0, 1)
+    for obj in session.deleted:
+        if isinstance(obj, TransacaoFinanceira):
+            a = _valores_antigos(obj)
+            somar(_chave_rollup(a['tenant_id'], a['data_transacao'], a['categoria'], a['tipo']), -(a['valor'] or 0.0), -1)
+
+    if deltas:
+        _aplicar_deltas(session.connection(), deltas)
+
+def reconstruir_rollup(session, tenant_id=None):
+    """Recalcula o rollup a partir de transacoes_financeiras (backfill/correcao)."""
+    T = TransacaoFinanceira
+    R = RollupFinanceiroMensal.__table__
+    limpar = delete(R)
+    # Agrupado pelas expressoes: GROUP BY categoria/tipo pelo nome pegaria a
+    # coluna crua da tabela, nao o rotulo normalizado. As constantes vao no
+    # SQL (nao como parametros) para o Postgres ver SELECT e GROUP BY iguais
+    vazio, padrao = literal_column("''"), literal_column(f"'{CATEGORIA_PADRAO}'")
+    chave = (
+        T.tenant_id,
+        cast(extract('year', T.data_transacao), Integer),
+        cast(extract('month', T.data_transacao), Integer),
+        func.coalesce(func.nullif(T.categoria, vazio), padrao),
+        func.coalesce(T.tipo, vazio),
+    )
+    origem = select(
+        *chave,
+        func.sum(T.valor).label('total'),
+        func.count(T.id).label('quantidade'),
+        literal(datetime.utcnow(), DateTime).label('atualizado_em'),
+    ).where(T.data_transacao.is_not(None))
+    if tenant_id:
+        limpar = limpar.where(R.c.tenant_id == tenant_id)
+        origem = origem.where(T.tenant_id == tenant_id)
+    origem = origem.group_by(*chave)
+    session.execute(limpar)
+    session.execute(R.insert().from_select(
+        ['tenant_id', 'ano', 'mes', 'categoria', 'tipo', 'total', 'quantidade', 'atualizado_em'], origem))
+    session.commit()
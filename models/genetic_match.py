@@ -3,11 +3,21 @@ Módulo de Acasalamento Inteligente (Genetic Match Engine)
 Modelos de dados para análise genética e recomendações de acasalamento.
 """
 
+import hashlib
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, Index, event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import json
+import numpy as np
+
+from models.database import db_session, SessaoHaras
 
 Base = declarative_base()
 
@@ -39,6 +49,9 @@ class Animal(Base):
     condicao_corporal = Column(Float)  # 1-9
     tipo_morfologico = Column(String(50))  # corrida, conformação, trabalho
     
+    # Comercial (garanhões)
+    valor_cobertura = Column(Float)
+    
     # Status e metadados
     ativo = Column(Boolean, default=True)
     data_cadastro = Column(DateTime, default=datetime.utcnow)
@@ -49,10 +62,12 @@ class Animal(Base):
     mae = relationship("Animal", remote_side=[id], foreign_keys=[mae_id])
     
     # Histórico reprodutivo
-    historico_reprodutivo = relationship("HistoricoReprodutivo", back_populates="animal")
+    historico_reprodutivo = relationship("HistoricoReprodutivo", back_populates="animal",
+                                         foreign_keys="HistoricoReprodutivo.animal_id")
     
     # Performance da progênie
-    performance_filhos = relationship("PerformanceProgenie", back_populates="animal")
+    performance_filhos = relationship("PerformanceProgenie", back_populates="animal",
+                                      foreign_keys="PerformanceProgenie.animal_id")
 
 class HistoricoReprodutivo(Base):
     """Histórico de prenhez e protocolos reprodutivos."""
@@ -84,7 +99,7 @@ class HistoricoReprodutivo(Base):
     observacoes = Column(Text)
     
     # Relacionamentos
-    animal = relationship("Animal", back_populates="historico_reprodutivo")
+    animal = relationship("Animal", back_populates="historico_reprodutivo", foreign_keys=[animal_id])
     garanhao = relationship("Animal", foreign_keys=[garanhao_id])
 
 class PerformanceProgenie(Base):
@@ -150,6 +165,7 @@ class DadosGenomicos(Base):
 class SolicitacaoMatch(Base):
     """Solicitações e resultados das recomendações de acasalamento."""
     __tablename__ = 'match_requests'
+    __table_args__ = (Index('ix_match_requests_tenant_fingerprint', 'tenant_id', 'fingerprint'),)
     
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50), nullable=False)
@@ -175,10 +191,27 @@ class SolicitacaoMatch(Base):
     tempo_processamento = Column(Float)  # em segundos
     versao_modelo = Column(String(20))
     
+    # Cache: hash dos parâmetros + versão do plantel + versão do modelo
+    fingerprint = Column(String(64))
+    versao_plantel = Column(Integer)
+    
     # Relacionamentos
     doadora = relationship("Animal", foreign_keys=[doadora_id])
     melhor_garanhao = relationship("Animal", foreign_keys=[melhor_garanhao_id])
 
+class VersaoPlantelMatch(Base):
+    """Versão dos dados de entrada do matching de cada tenant.
+
+    Incrementada no mesmo flush em que um animal (ou seus históricos) ou a
+    ConfiguracaoMatch do tenant muda; resultados calculados com uma versão
+    anterior deixam de ser encontrados pelo cache.
+    """
+    __tablename__ = 'match_pool_versions'
+    
+    tenant_id = Column(String(50), primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
+    data_atualizacao = Column(DateTime, default=datetime.utcnow)
+
 class ConfiguracaoMatch(Base):
     """Configurações do sistema de matching por tenant."""
     __tablename__ = 'match_config'
@@ -207,20 +240,274 @@ class ConfiguracaoMatch(Base):
 
 # Funções auxiliares para cálculos genéticos
 
-def calcular_consanguinidade(animal_id, profundidade=4):
+# Consanguinidade (F) e parentesco pelo método de Meuwissen & Luo (1992):
+# os animais do tenant são ordenados pais-antes-de-filhos e o F de cada um
+# sai da decomposição A = LDL' percorrendo apenas os seus ancestrais. O F de
+# todo o rebanho é calculado de uma vez e fica em cache por tenant; gravações
+# que mudam pai_id/mae_id invalidam o cache do tenant no commit.
+
+PEDIGREE_CACHE_SECONDS = int(os.environ.get('PEDIGREE_CACHE_SECONDS', 300))
+PARENTESCO_CACHE_MAX = 10000
+
+class Pedigree:
+    """Pedigree de um tenant com o F de todos os animais já calculado."""
+
+    def __init__(self, pais):
+        # pais: {animal_id: (pai_id, mae_id)}; pais fora do tenant entram como fundadores
+        self.pais = dict(pais)
+        for pai, mae in list(self.pais.values()):
+            for p in (pai, mae):
+                if p is not None and p not in self.pais:
+                    self.pais[p] = (None, None)
+        self._ordenar()
+        self.F = {}
+        self.D = {}
+        for animal_id in self._por_ordem:
+            pai, mae = self.pais[animal_id]
+            self.F[animal_id] = self._f_descendente(pai, mae)
+            self.D[animal_id] = self._variancia_mendeliana(pai, mae)
+        self._parentesco = OrderedDict()
+        self._lock = threading.Lock()
+        self.criado_em = time.monotonic()
+
+    def _ordenar(self):
+        """Ordem topológica (pais antes dos filhos). Ciclos têm o elo removido."""
+        estado = {}
+        ordem = []
+        for raiz in self.pais:
+            if raiz in estado:
+                continue
+            estado[raiz] = 1
+            pilha = [(raiz, 0)]
+            while pilha:
+                no, k = pilha.pop()
+                if k == 2:
+                    estado[no] = 2
+                    ordem.append(no)
+                    continue
+                pilha.append((no, k + 1))
+                p = self.pais[no][k]
+                if p is None:
+                    continue
+                if p not in estado:
+                    estado[p] = 1
+                    pilha.append((p, 0))
+                elif estado[p] == 1:
+                    # Pedigree inconsistente (animal ancestral de si mesmo)
+                    elo = list(self.pais[no])
+                    elo[k] = None
+                    self.pais[no] = tuple(elo)
+        self._por_ordem = ordem
+        self.ordem = {animal_id: i for i, animal_id in enumerate(ordem)}
+
+    def _variancia_mendeliana(self, pai, mae):
+        if pai is not None and mae is not None:
+            return 0.5 - 0.25 * (self.F[pai] + self.F[mae])
+        if pai is not None or mae is not None:
+            return 0.75 - 0.25 * self.F[pai if pai is not None else mae]
+        return 1.0
+
+    def _f_descendente(self, pai, mae):
+        """F de um (possível) filho de pai x mae."""
+        if pai is None or mae is None:
+            return 0.0
+        L = {}
+        heap = []
+        def somar(j, valor):
+            if j in L:
+                L[j] += valor
+            else:
+                L[j] = valor
+                heapq.heappush(heap, -self.ordem[j])
+        somar(pai, 0.5)
+        somar(mae, 0.5)
+        # Ancestrais do mais novo para o mais velho: quando j sai do heap,
+        # todos os descendentes dele já contribuíram para L[j]
+        soma = 0.0
+        while heap:
+            j = self._por_ordem[-heapq.heappop(heap)]
+            l = L.pop(j)
+            soma += l * l * self.D[j]
+            for p in self.pais[j]:
+                if p is not None:
+                    somar(p, 0.5 * l)
+        return soma - 0.5 - 0.25 * (self.F[pai] + self.F[mae])
+
+    def consanguinidade(self, animal_id):
+        return self.F.get(animal_id, 0.0)
+
+    def parentesco(self, animal1_id, animal2_id):
+        """Coancestria: igual ao F do potro de um acasalamento entre os dois."""
+        if animal1_id not in self.ordem or animal2_id not in self.ordem:
+            return 0.0
+        chave = (min(animal1_id, animal2_id), max(animal1_id, animal2_id))
+        with self._lock:
+            if chave in self._parentesco:
+                self._parentesco.move_to_end(chave)
+                return self._parentesco[chave]
+        valor = self._f_descendente(*chave)
+        with self._lock:
+            self._parentesco[chave] = valor
+            if len(self._parentesco) > PARENTESCO_CACHE_MAX:
+                self._parentesco.popitem(last=False)
+        return valor
+
+    def matriz_parentesco(self, linhas, colunas):
+        """Coancestria de cada par linhas x colunas (matriz NumPy).
+
+        Método indireto de Colleau: A = T D T' aplicado às colunas pedidas
+        sem montar A; cada passada percorre o pedigree uma vez e opera sobre
+        vetores de tamanho len(colunas).
+        """
+        n = len(self._por_ordem)
+        U = np.zeros((n, len(colunas)))
+        for k, animal_id in enumerate(colunas):
+            if animal_id in self.ordem:
+                U[self.ordem[animal_id], k] = 1.0
+        # u = T'^-1 e: dos mais novos para os mais velhos
+        for pos in range(n - 1, -1, -1):
+            linha = U[pos]
+            if not linha.any():
+                continue
+            for p in self.pais[self._por_ordem[pos]]:
+                if p is not None:
+                    U[self.ordem[p]] += 0.5 * linha
+        U *= np.array([self.D[a] for a in self._por_ordem])[:, None]
+        # w = T (D u): dos mais velhos para os mais novos
+        for pos in range(n):
+            for p in self.pais[self._por_ordem[pos]]:
+                if p is not None:
+                    U[pos] += 0.5 * U[self.ordem[p]]
+        resultado = np.zeros((len(linhas), len(colunas)))
+        for i, animal_id in enumerate(linhas):
+            if animal_id in self.ordem:
+                resultado[i] = 0.5 * U[self.ordem[animal_id]]
+        return resultado
+
+_pedigrees = {}
+_pedigrees_lock = threading.Lock()
+
+def obter_pedigree(tenant_id, session=None):
+    """Pedigree do tenant, do cache ou montado com uma única consulta."""
+    pedigree = _pedigrees.get(tenant_id)
+    if pedigree and time.monotonic() - pedigree.criado_em < PEDIGREE_CACHE_SECONDS:
+        return pedigree
+    session = session or db_session
+    linhas = session.query(Animal.id, Animal.pai_id, Animal.mae_id).filter(
+        Animal.tenant_id == tenant_id
+    ).all()
+    pedigree = Pedigree({id: (pai_id, mae_id) for id, pai_id, mae_id in linhas})
+    with _pedigrees_lock:
+        _pedigrees[tenant_id] = pedigree
+    return pedigree
+
+def invalidar_pedigree(tenant_id=None):
+    with _pedigrees_lock:
+        if tenant_id is None:
+            _pedigrees.clear()
+        else:
+            _pedigrees.pop(tenant_id, None)
+
+@event.listens_for(SessaoHaras, 'after_flush')
+def _coletar_pedigrees_alterados(session, flush_context):
+    tenants = session.info.setdefault('pedigrees_alterados', set())
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Animal):
+            tenants.add(obj.tenant_id)
+    for obj in session.dirty:
+        if isinstance(obj, Animal):
+            estado = inspect(obj)
+            if any(estado.attrs[c].history.has_changes() for c in ('pai_id', 'mae_id', 'tenant_id')):
+                tenants.add(obj.tenant_id)
+                tenants.update(estado.attrs.tenant_id.history.deleted or ())
+
+@event.listens_for(SessaoHaras, 'after_commit')
+def _invalidar_pedigrees_alterados(session):
+    for tenant_id in session.info.pop('pedigrees_alterados', ()):
+        invalidar_pedigree(tenant_id)
+
+@event.listens_for(SessaoHaras, 'after_rollback')
+def _descartar_pedigrees_alterados(session):
+    session.info.pop('pedigrees_alterados', None)
+
+# Cache das recomendações (SolicitacaoMatch) por fingerprint das entradas
+
+_ENTRADAS_MATCH = (Animal, HistoricoReprodutivo, PerformanceProgenie, DadosGenomicos, ConfiguracaoMatch)
+
+@event.listens_for(SessaoHaras, 'after_flush')
+def _versionar_plantel(session, flush_context):
+    tenants = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, _ENTRADAS_MATCH):
+            tenants.add(obj.tenant_id)
+    for obj in session.dirty:
+        if isinstance(obj, _ENTRADAS_MATCH) and session.is_modified(obj):
+            tenants.add(obj.tenant_id)
+    tenants.discard(None)
+    if not tenants:
+        return
+    conn = session.connection()
+    tabela = VersaoPlantelMatch.__table__
+    dialeto = postgresql if conn.dialect.name == 'postgresql' else sqlite
+    agora = datetime.utcnow()
+    for tenant_id in tenants:
+        stmt = dialeto.insert(tabela).values(tenant_id=tenant_id, versao=1, data_atualizacao=agora)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['tenant_id'],
+            set_={'versao': tabela.c.versao + 1, 'data_atualizacao': stmt.excluded.data_atualizacao})
+        conn.execute(stmt)
+
+def versao_plantel(tenant_id, session=None):
+    session = session or db_session
+    versao = session.query(VersaoPlantelMatch.versao).filter(
+        VersaoPlantelMatch.tenant_id == tenant_id
+    ).scalar()
+    return versao or 0
+
+def fingerprint_match(parametros, versao_plantel, versao_modelo):
+    """SHA-256 dos parâmetros da solicitação e das versões de plantel e modelo."""
+    bruto = json.dumps({'parametros': parametros, 'versao_plantel': versao_plantel,
+                        'versao_modelo': versao_modelo}, sort_keys=True, default=str)
+    return hashlib.sha256(bruto.encode()).hexdigest()
+
+def buscar_resultado_match(tenant_id, fingerprint, session=None):
+    """Última solicitação com o mesmo fingerprint que já tem resultado."""
+    session = session or db_session
+    return session.query(SolicitacaoMatch).filter(
+        SolicitacaoMatch.tenant_id == tenant_id,
+        SolicitacaoMatch.fingerprint == fingerprint,
+        SolicitacaoMatch.resultados_json.is_not(None)
+    ).order_by(SolicitacaoMatch.id.desc()).first()
+
+def _tenant_do_animal(animal_id, session):
+    return session.query(Animal.tenant_id).filter(Animal.id == animal_id).scalar()
+
+def calcular_consanguinidade(animal_id, profundidade=None, session=None):
     """
-    Calcula o coeficiente de consanguinidade de um animal.
-    Implementação simplificada - em produção usar algoritmo de Wright.
+    Calcula o coeficiente de consanguinidade (Wright) de um animal.
+    Usa o pedigree completo; `profundidade` é mantido só por compatibilidade.
     """
-    # Implementação básica - expandir conforme necessário
-    return 0.0
+    session = session or db_session
+    tenant_id = _tenant_do_animal(animal_id, session)
+    if tenant_id is None:
+        return 0.0
+    return obter_pedigree(tenant_id, session).consanguinidade(animal_id)
 
-def calcular_parentesco(animal1_id, animal2_id):
+def calcular_parentesco(animal1_id, animal2_id, session=None):
     """
-    Calcula o coeficiente de parentesco entre dois animais.
+    Calcula o coeficiente de parentesco (coancestria) entre dois animais,
+    que é o F esperado do potro do acasalamento.
     """
-    # Implementação básica - expandir conforme necessário
-    return 0.0
+    session = session or db_session
+    tenant_id = _tenant_do_animal(animal1_id, session)
+    if tenant_id is None:
+        return 0.0
+    return obter_pedigree(tenant_id, session).parentesco(animal1_id, animal2_id)
+
+def calcular_consanguinidade_rebanho(tenant_id, session=None):
+    """F de todos os animais do tenant: {animal_id: F}."""
+    pedigree = obter_pedigree(tenant_id, session)
+    return {animal_id: pedigree.F[animal_id] for animal_id in pedigree.ordem}
 
 def extrair_features_geneticas(doadora_id, garanhao_id):
     """
@@ -242,4 +529,8 @@ def extrair_features_geneticas(doadora_id, garanhao_id):
         'score_genetico_combinado': 0
     }
     
+    coancestria = calcular_parentesco(doadora_id, garanhao_id)
+    features['consanguinidade'] = coancestria
+    features['parentesco'] = 2 * coancestria
+    
     return features
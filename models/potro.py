@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Index
 from models.database import Base
 
 class Potro(Base):
     __tablename__ = 'potros'
+    __table_args__ = (Index('ix_potros_tenant_data_nascimento', 'tenant_id', 'data_nascimento'),)
 
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50))
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index
 from models.database import Base
 
 class Propriedade(Base):
     __tablename__ = 'propriedades'
+    __table_args__ = (Index('ix_propriedades_tenant_nome', 'tenant_id', 'nome'),)
     id = Column(Integer, primary_key=True)
     tenant_id = Column(String(50))
     nome = Column(String(100), nullable=False)
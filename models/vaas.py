@@ -2,22 +2,26 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 import json
 
-from .user import db
+from sqlalchemy import (Column, Integer, String, Text, Numeric, Boolean, DateTime, Date,
+                        ForeignKey, UniqueConstraint)
+from sqlalchemy.orm import relationship
 
-class PlanoVaaS(db.Model):
+from models.database import Base
+
+class PlanoVaaS(Base):
     """Planos de assinatura VaaS disponíveis"""
     __tablename__ = 'planos_vaas'
     
-    id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(100), nullable=False)
-    descricao = db.Column(db.Text)
-    preco_mensal = db.Column(db.Numeric(10, 2), nullable=False)
-    max_veterinarios = db.Column(db.Integer, nullable=False)
-    max_consultas_mes = db.Column(db.Integer)
-    max_procedimentos_mes = db.Column(db.Integer)
-    recursos_inclusos = db.Column(db.Text)  # JSON com recursos
-    ativo = db.Column(db.Boolean, default=True)
-    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(100), nullable=False)
+    descricao = Column(Text)
+    preco_mensal = Column(Numeric(10, 2), nullable=False)
+    max_veterinarios = Column(Integer, nullable=False)
+    max_consultas_mes = Column(Integer)
+    max_procedimentos_mes = Column(Integer)
+    recursos_inclusos = Column(Text)  # JSON com recursos
+    ativo = Column(Boolean, default=True)
+    data_criacao = Column(DateTime, default=datetime.utcnow)
     
     def to_dict(self):
         return {
@@ -32,30 +36,30 @@ class PlanoVaaS(db.Model):
             'ativo': self.ativo
         }
 
-class AssinaturaVaaS(db.Model):
+class AssinaturaVaaS(Base):
     """Assinaturas VaaS dos proprietários"""
     __tablename__ = 'assinaturas_vaas'
     
-    id = db.Column(db.Integer, primary_key=True)
-    tenant_id = db.Column(db.String(50), nullable=False)
-    proprietario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
-    plano_id = db.Column(db.Integer, db.ForeignKey('planos_vaas.id'), nullable=False)
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String(50), nullable=False)
+    proprietario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False)
+    plano_id = Column(Integer, ForeignKey('planos_vaas.id'), nullable=False)
     
     # Datas da assinatura
-    data_inicio = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    data_fim = db.Column(db.DateTime)
-    data_cancelamento = db.Column(db.DateTime)
+    data_inicio = Column(DateTime, nullable=False, default=datetime.utcnow)
+    data_fim = Column(DateTime)
+    data_cancelamento = Column(DateTime)
     
     # Status
-    status = db.Column(db.String(50), nullable=False, default='ativa')  # ativa, cancelada, suspensa, expirada
+    status = Column(String(50), nullable=False, default='ativa')  # ativa, cancelada, suspensa, expirada
     
     # Configurações personalizadas
-    veterinarios_contratados = db.Column(db.Integer, default=0)
-    limite_personalizado_consultas = db.Column(db.Integer)
-    limite_personalizado_procedimentos = db.Column(db.Integer)
+    veterinarios_contratados = Column(Integer, default=0)
+    limite_personalizado_consultas = Column(Integer)
+    limite_personalizado_procedimentos = Column(Integer)
     
     # Relacionamentos
-    plano = db.relationship('PlanoVaaS', backref='assinaturas')
+    plano = relationship('PlanoVaaS', backref='assinaturas')
     
     def to_dict(self):
         return {
@@ -98,32 +102,32 @@ class AssinaturaVaaS(db.Model):
         """Retorna o limite de procedimentos (personalizado ou do plano)"""
         return self.limite_personalizado_procedimentos or self.plano.max_procedimentos_mes
 
-class ContratoVeterinario(db.Model):
+class ContratoVeterinario(Base):
     """Contratos de veterinários com proprietários"""
     __tablename__ = 'contratos_veterinario'
     
-    id = db.Column(db.Integer, primary_key=True)
-    tenant_id = db.Column(db.String(50), nullable=False)
-    proprietario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
-    veterinario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
-    assinatura_id = db.Column(db.Integer, db.ForeignKey('assinaturas_vaas.id'), nullable=False)
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String(50), nullable=False)
+    proprietario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False)
+    veterinario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False)
+    assinatura_id = Column(Integer, ForeignKey('assinaturas_vaas.id'), nullable=False)
     
     # Dados do contrato
-    data_inicio = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    data_fim = db.Column(db.DateTime)
-    status = db.Column(db.String(50), nullable=False, default='ativo')  # ativo, suspenso, finalizado
+    data_inicio = Column(DateTime, nullable=False, default=datetime.utcnow)
+    data_fim = Column(DateTime)
+    status = Column(String(50), nullable=False, default='ativo')  # ativo, suspenso, finalizado
     
     # Precificação
-    valor_hora = db.Column(db.Numeric(10, 2))
-    valor_consulta = db.Column(db.Numeric(10, 2))
-    valor_procedimento = db.Column(db.Numeric(10, 2))
+    valor_hora = Column(Numeric(10, 2))
+    valor_consulta = Column(Numeric(10, 2))
+    valor_procedimento = Column(Numeric(10, 2))
     
     # Configurações de acesso
-    permissoes_especiais = db.Column(db.Text)  # JSON com permissões específicas
-    horarios_disponibilidade = db.Column(db.Text)  # JSON com horários
+    permissoes_especiais = Column(Text)  # JSON com permissões específicas
+    horarios_disponibilidade = Column(Text)  # JSON com horários
     
     # Relacionamentos
-    assinatura = db.relationship('AssinaturaVaaS', backref='contratos')
+    assinatura = relationship('AssinaturaVaaS', backref='contratos')
     
     def to_dict(self):
         return {
@@ -142,33 +146,33 @@ class ContratoVeterinario(db.Model):
             'horarios_disponibilidade': json.loads(self.horarios_disponibilidade) if self.horarios_disponibilidade else {}
         }
 
-class AtendimentoVaaS(db.Model):
+class AtendimentoVaaS(Base):
     """Registro de atendimentos realizados via VaaS"""
     __tablename__ = 'atendimentos_vaas'
     
-    id = db.Column(db.Integer, primary_key=True)
-    tenant_id = db.Column(db.String(50), nullable=False)
-    contrato_id = db.Column(db.Integer, db.ForeignKey('contratos_veterinario.id'), nullable=False)
-    veterinario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
-    animal_id = db.Column(db.Integer)  # Referência ao animal atendido
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String(50), nullable=False)
+    contrato_id = Column(Integer, ForeignKey('contratos_veterinario.id'), nullable=False)
+    veterinario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False)
+    animal_id = Column(Integer)  # Referência ao animal atendido
     
     # Dados do atendimento
-    data_atendimento = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    tipo_atendimento = db.Column(db.String(100), nullable=False)  # consulta, procedimento, emergencia
-    duracao_minutos = db.Column(db.Integer)
-    descricao = db.Column(db.Text)
-    observacoes = db.Column(db.Text)
+    data_atendimento = Column(DateTime, nullable=False, default=datetime.utcnow)
+    tipo_atendimento = Column(String(100), nullable=False)  # consulta, procedimento, emergencia
+    duracao_minutos = Column(Integer)
+    descricao = Column(Text)
+    observacoes = Column(Text)
     
     # Precificação
-    valor_cobrado = db.Column(db.Numeric(10, 2), nullable=False)
-    forma_cobranca = db.Column(db.String(50))  # hora, consulta, procedimento, fixo
+    valor_cobrado = Column(Numeric(10, 2), nullable=False)
+    forma_cobranca = Column(String(50))  # hora, consulta, procedimento, fixo
     
     # Status
-    status = db.Column(db.String(50), default='realizado')  # agendado, realizado, cancelado, faturado
-    data_faturamento = db.Column(db.DateTime)
+    status = Column(String(50), default='realizado')  # agendado, realizado, cancelado, faturado
+    data_faturamento = Column(DateTime)
     
     # Relacionamentos
-    contrato = db.relationship('ContratoVeterinario', backref='atendimentos')
+    contrato = relationship('ContratoVeterinario', backref='atendimentos')
     
     def to_dict(self):
         return {
@@ -188,40 +192,44 @@ class AtendimentoVaaS(db.Model):
             'data_faturamento': self.data_faturamento.isoformat() if self.data_faturamento else None
         }
 
-class FaturaVaaS(db.Model):
+class FaturaVaaS(Base):
     """Faturas mensais do serviço VaaS"""
     __tablename__ = 'faturas_vaas'
+    # Uma fatura por tenant e competência: reexecutar o faturamento não duplica
+    __table_args__ = (UniqueConstraint('tenant_id', 'ano_referencia', 'mes_referencia',
+                                       name='uq_faturas_vaas_tenant_competencia'),)
     
-    id = db.Column(db.Integer, primary_key=True)
-    tenant_id = db.Column(db.String(50), nullable=False)
-    assinatura_id = db.Column(db.Integer, db.ForeignKey('assinaturas_vaas.id'), nullable=False)
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String(50), nullable=False)
+    assinatura_id = Column(Integer, ForeignKey('assinaturas_vaas.id'), nullable=False)
     
     # Período da fatura
-    mes_referencia = db.Column(db.Integer, nullable=False)  # 1-12
-    ano_referencia = db.Column(db.Integer, nullable=False)
-    data_vencimento = db.Column(db.Date, nullable=False)
+    mes_referencia = Column(Integer, nullable=False)  # 1-12
+    ano_referencia = Column(Integer, nullable=False)
+    data_vencimento = Column(Date, nullable=False)
     
     # Valores
-    valor_plano = db.Column(db.Numeric(10, 2), nullable=False)
-    valor_atendimentos = db.Column(db.Numeric(10, 2), default=0)
-    valor_adicional = db.Column(db.Numeric(10, 2), default=0)
-    desconto = db.Column(db.Numeric(10, 2), default=0)
-    valor_total = db.Column(db.Numeric(10, 2), nullable=False)
+    valor_plano = Column(Numeric(10, 2), nullable=False)
+    valor_atendimentos = Column(Numeric(10, 2), default=0)
+    valor_adicional = Column(Numeric(10, 2), default=0)
+    desconto = Column(Numeric(10, 2), default=0)
+    valor_total = Column(Numeric(10, 2), nullable=False)
     
     # Status
-    status = db.Column(db.String(50), default='pendente')  # pendente, paga, vencida, cancelada
-    data_pagamento = db.Column(db.DateTime)
-    metodo_pagamento = db.Column(db.String(50))
+    status = Column(String(50), default='pendente')  # pendente, paga, vencida, cancelada
+    data_pagamento = Column(DateTime)
+    metodo_pagamento = Column(String(50))
     
     # Detalhes
-    detalhes_cobranca = db.Column(db.Text)  # JSON com detalhes dos atendimentos
-    observacoes = db.Column(db.Text)
+    detalhes_cobranca = Column(Text)  # JSON com detalhes dos atendimentos
+    observacoes = Column(Text)
     
     # Relacionamentos
-    assinatura = db.relationship('AssinaturaVaaS', backref='faturas')
+    assinatura = relationship('AssinaturaVaaS', backref='faturas')
+    itens = relationship('ItemFaturaVaaS', backref='fatura', lazy='dynamic')
     
-    def to_dict(self):
-        return {
+    def to_dict(self, incluir_itens=False):
+        dados = {
             'id': self.id,
             'tenant_id': self.tenant_id,
             'assinatura_id': self.assinatura_id,
@@ -239,30 +247,61 @@ class FaturaVaaS(db.Model):
             'detalhes_cobranca': json.loads(self.detalhes_cobranca) if self.detalhes_cobranca else {},
             'observacoes': self.observacoes
         }
+        if incluir_itens:
+            dados['itens'] = [item.to_dict() for item in self.itens.order_by(ItemFaturaVaaS.id)]
+        return dados
+
+class ItemFaturaVaaS(Base):
+    """Linhas da fatura VaaS (um atendimento faturado por linha)"""
+    __tablename__ = 'itens_fatura_vaas'
+    
+    id = Column(Integer, primary_key=True)
+    fatura_id = Column(Integer, ForeignKey('faturas_vaas.id'), nullable=False, index=True)
+    tenant_id = Column(String(50), nullable=False)
+    # Único: um atendimento nunca entra em duas faturas
+    atendimento_id = Column(Integer, ForeignKey('atendimentos_vaas.id'), nullable=False, unique=True)
+    veterinario_id = Column(Integer, ForeignKey('usuarios.id'))
+    
+    data_atendimento = Column(DateTime)
+    tipo_atendimento = Column(String(100))
+    descricao = Column(Text)
+    valor = Column(Numeric(10, 2), nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'fatura_id': self.fatura_id,
+            'atendimento_id': self.atendimento_id,
+            'veterinario_id': self.veterinario_id,
+            'data_atendimento': self.data_atendimento.isoformat() if self.data_atendimento else None,
+            'tipo_atendimento': self.tipo_atendimento,
+            'descricao': self.descricao,
+            'valor': float(self.valor)
+        }
 
-class MetricaVaaS(db.Model):
+class MetricaVaaS(Base):
     """Métricas e analytics do serviço VaaS"""
     __tablename__ = 'metricas_vaas'
     
-    id = db.Column(db.Integer, primary_key=True)
-    tenant_id = db.Column(db.String(50), nullable=False)
-    data_metrica = db.Column(db.Date, nullable=False, default=datetime.utcnow().date())
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String(50), nullable=False)
+    data_metrica = Column(Date, nullable=False, default=datetime.utcnow().date())
     
     # Métricas de uso
-    total_atendimentos = db.Column(db.Integer, default=0)
-    total_consultas = db.Column(db.Integer, default=0)
-    total_procedimentos = db.Column(db.Integer, default=0)
-    tempo_total_atendimento = db.Column(db.Integer, default=0)  # em minutos
+    total_atendimentos = Column(Integer, default=0)
+    total_consultas = Column(Integer, default=0)
+    total_procedimentos = Column(Integer, default=0)
+    tempo_total_atendimento = Column(Integer, default=0)  # em minutos
     
     # Métricas financeiras
-    receita_dia = db.Column(db.Numeric(10, 2), default=0)
-    custo_veterinarios = db.Column(db.Numeric(10, 2), default=0)
-    economia_gerada = db.Column(db.Numeric(10, 2), default=0)
+    receita_dia = Column(Numeric(10, 2), default=0)
+    custo_veterinarios = Column(Numeric(10, 2), default=0)
+    economia_gerada = Column(Numeric(10, 2), default=0)
     
     # Métricas de satisfação
-    nota_satisfacao_media = db.Column(db.Numeric(3, 2))
-    veterinarios_ativos = db.Column(db.Integer, default=0)
-    taxa_utilizacao = db.Column(db.Numeric(5, 2), default=0)  # % de uso do plano
+    nota_satisfacao_media = Column(Numeric(3, 2))
+    veterinarios_ativos = Column(Integer, default=0)
+    taxa_utilizacao = Column(Numeric(5, 2), default=0)  # % de uso do plano
     
     def to_dict(self):
         return {
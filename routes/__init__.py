@@ -1 +1,112 @@
-# Init
+"""
+Blueprints da API, declarados no manifesto BLUEPRINTS.
+
+Todas as regras de URL são registradas na criação do app, então o url_map
+não muda depois que o worker começa a atender. Cada regra aponta para uma
+VisaoPreguicosa (o padrão de "lazy views" do Flask): o módulo de rotas, e
+os modelos que ele puxa, só é importado na primeira chamada a uma das
+suas views. tests/test_blueprints.py confere o manifesto com as rotas
+reais. Com BLUEPRINTS_PRECARREGAR=1 os módulos são importados na criação
+do app (útil com gunicorn --preload).
+"""
+
+import importlib
+import os
+import threading
+from flask import Flask
+
+# (módulo, atributo, nome do blueprint, url_prefix, [(regra, view, métodos)])
+BLUEPRINTS = (
+    ('routes.custo_prenhez', 'custo_bp', 'custo_prenhez', '/api/custo_prenhez', (
+        ('/custo_itens', 'get_itens', ('GET',)),
+        ('/custo_itens', 'add_item', ('POST',)),
+        ('/procedimentos', 'get_procs', ('GET',)),
+        ('/procedimentos', 'add_proc', ('POST',)),
+        ('/prenhez', 'get_calcs', ('GET',)),
+        ('/prenhez', 'add_calc', ('POST',)),
+    )),
+    ('routes.animals', 'animals_bp', 'animals', '/api/animais', (
+        ('/eguas', 'list_eguas', ('GET',)),
+        ('/eguas', 'add_egua', ('POST',)),
+        ('/eguas/<int:id>', 'update_egua', ('PUT',)),
+        ('/eguas/<int:id>/eventos', 'list_eventos_egua', ('GET',)),
+        ('/receptoras', 'list_recept', ('GET',)),
+        ('/receptoras', 'add_recept', ('POST',)),
+    )),
+    ('routes.integracao', 'integracao_bp', 'integracao', '/api', (
+        ('/users', 'list_users', ('GET',)),
+        ('/financeiro/lancamentos', 'list_financas', ('GET',)),
+        ('/ai/predictions', 'ai_predictions', ('GET',)),
+    )),
+    ('routes.vaas', 'vaas_bp', 'vaas', '/api/vaas', (
+        ('/planos', 'get_planos_vaas', ('GET',)),
+        ('/assinatura', 'get_assinatura_atual', ('GET',)),
+        ('/assinatura', 'criar_assinatura', ('POST',)),
+        ('/veterinarios', 'get_veterinarios_contratados', ('GET',)),
+        ('/veterinarios/contratar', 'contratar_veterinario', ('POST',)),
+        ('/atendimentos', 'get_atendimentos', ('GET',)),
+        ('/atendimentos', 'registrar_atendimento', ('POST',)),
+        ('/dashboard', 'get_dashboard_vaas', ('GET',)),
+        ('/faturas', 'get_faturas_vaas', ('GET',)),
+        ('/faturas/gerar', 'gerar_fatura_mes', ('POST',)),
+        ('/faturas/gerar-lote', 'gerar_faturas_lote', ('POST',)),
+        ('/analytics', 'get_analytics_vaas', ('GET',)),
+    )),
+    ('routes.genetic_match', 'genetic_match_bp', 'genetic_match', '/api/genetic-match', (
+        ('/sugerir', 'sugerir_acasalamentos', ('POST',)),
+        ('/sugerir/lote', 'sugerir_acasalamentos_lote', ('POST',)),
+        ('/predict/prenhez', 'prever_prenhez', ('POST',)),
+        ('/simular', 'simular_cenario', ('POST',)),
+        ('/simular/varredura', 'varrer_cenarios', ('POST',)),
+        ('/doadoras', 'listar_doadoras', ('GET',)),
+        ('/garanhoes', 'listar_garanhoes', ('GET',)),
+        ('/stats', 'estatisticas_sistema', ('GET',)),
+    )),
+)
+
+_views = {}
+_lock = threading.Lock()
+
+def app_do_blueprint(modulo, atributo, url_prefix):
+    """App auxiliar (nunca atende requisições) com o blueprint registrado."""
+    blueprint = getattr(importlib.import_module(modulo), atributo)
+    auxiliar = Flask(modulo, static_folder=None)
+    auxiliar.register_blueprint(blueprint, url_prefix=url_prefix)
+    return auxiliar
+
+def carregar_views(modulo, atributo, url_prefix):
+    """{endpoint: view} do blueprint; o módulo é importado uma vez por processo."""
+    views = _views.get(modulo)
+    if views is None:
+        with _lock:
+            views = _views.get(modulo)
+            if views is None:
+                views = _views[modulo] = app_do_blueprint(modulo, atributo, url_prefix).view_functions
+    return views
+
+class VisaoPreguicosa:
+    """View registrada no app que só importa o módulo de rotas na primeira chamada."""
+
+    def __init__(self, modulo, atributo, url_prefix, endpoint):
+        self.modulo = modulo
+        self.atributo = atributo
+        self.url_prefix = url_prefix
+        self.endpoint = endpoint
+        self.__name__ = endpoint.rsplit('.', 1)[-1]
+        self._view = None
+
+    def __call__(self, *args, **kwargs):
+        view = self._view
+        if view is None:
+            view = self._view = carregar_views(self.modulo, self.atributo, self.url_prefix)[self.endpoint]
+        return view(*args, **kwargs)
+
+def registrar_blueprints(app, manifesto=BLUEPRINTS):
+    for modulo, atributo, nome, url_prefix, regras in manifesto:
+        for regra, view, metodos in regras:
+            endpoint = f'{nome}.{view}'
+            app.add_url_rule(url_prefix + regra, endpoint,
+                             VisaoPreguicosa(modulo, atributo, url_prefix, endpoint), methods=metodos)
+    if os.environ.get('BLUEPRINTS_PRECARREGAR') == '1':
+        for modulo, atributo, _, url_prefix, _ in manifesto:
+            carregar_views(modulo, atributo, url_prefix)
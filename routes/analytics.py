@@ -3,8 +3,13 @@ Rotas da API para Analytics, Matching e Predições IA
 Endpoints para funcionalidades avançadas do sistema de haras
 """
 
+import os
+import threading
+import time
 from flask import Blueprint, request, jsonify
-from datetime import datetime, timedelta
+from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from datetime import date, datetime, timedelta
+from sqlalchemy import Date, cast, event, func, select
 from src.algorithms.matching import (
     MatchingEngine, PerfilDoadora, PerfilReceptora, 
     StatusReproductivo, FaseEstral, ProtocoloSincronizacao
@@ -14,9 +19,14 @@ from src.algorithms.predictions import (
 )
 from src.models.user import db
 from src.models.models import Egual, ProcedimentoOPU, TransferenciaEmbriao, Gestacao
+from services import estatisticas_reprodutivas
+from services.estatisticas_reprodutivas import carregar_estatisticas
 
 analytics_bp = Blueprint("analytics", __name__)
 
+# animal_repro_stats acompanha os flushes de OPU, transferência e gestação
+estatisticas_reprodutivas.instalar(ProcedimentoOPU, TransferenciaEmbriao, Gestacao, sessao=db.session)
+
 # Instâncias dos sistemas
 matching_engine = MatchingEngine()
 sistema_predictivo = SistemaPredictivo()
@@ -39,17 +49,18 @@ def sugerir_receptoras():
         if not doadora_db:
             return jsonify({"error": "Doadora não encontrada"}), 404
         
-        # Criar perfil da doadora
-        perfil_doadora = _criar_perfil_doadora(doadora_db)
-        
         # Buscar receptoras disponíveis
         receptoras_db = Egual.query.filter(
             Egual.classificacao == 'receptora',
             Egual.status_reprodutivo == 'ativa'
         ).all()
         
-        # Criar perfis das receptoras
-        perfis_receptoras = [_criar_perfil_receptora(r) for r in receptoras_db]
+        # Históricos de todos os animais numa consulta só
+        estatisticas = carregar_estatisticas([doadora_db.id] + [r.id for r in receptoras_db])
+        
+        # Criar perfis
+        perfil_doadora = _criar_perfil_doadora(doadora_db, estatisticas)
+        perfis_receptoras = [_criar_perfil_receptora(r, estatisticas) for r in receptoras_db]
         
         # Executar matching
         melhores_receptoras = matching_engine.encontrar_melhores_receptoras(
@@ -66,6 +77,108 @@ def sugerir_receptoras():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@analytics_bp.route("/matching/alocar-lote", methods=["POST"])
+def alocar_lote_embrioes():
+    """
+    Aloca um lote de embriões (ou de doadoras) nas receptoras ativas com
+    atribuição global, respeitando a janela de sincronia
+    """
+    # NumPy só é carregado por quem usa o alocador
+    from services import alocacao_receptoras as alocacao
+    try:
+        data = request.get_json() or {}
+        hoje = datetime.now().date()
+        data_transferencia = date.fromisoformat(data['data_transferencia']) if data.get('data_transferencia') else hoje
+        janela = data.get('janela_sincronia', alocacao.JANELA_SINCRONIA_PADRAO)
+        if len(janela) != 2 or janela[0] > janela[1]:
+            return jsonify({"error": "janela_sincronia deve ser [min, max] em dias"}), 400
+        
+        # Embriões explícitos ou N embriões por doadora
+        embrioes = list(data.get('embrioes') or [])
+        for d in data.get('doadoras') or []:
+            for n in range(int(d.get('quantidade_embrioes', 1))):
+                embrioes.append({
+                    'id': f"{d['doadora_id']}-{n + 1}",
+                    'doadora_id': d['doadora_id'],
+                    'data_ovulacao': d.get('data_ovulacao'),
+                    'grau': d.get('grau')
+                })
+        if not embrioes:
+            return jsonify({"error": "Informe embrioes ou doadoras"}), 400
+        
+        # Doadoras e receptoras numa consulta cada
+        ids_doadoras = {e['doadora_id'] for e in embrioes if e.get('doadora_id')}
+        doadoras = {d.id: d for d in Egual.query.filter(Egual.id.in_(ids_doadoras))} if ids_doadoras else {}
+        query_receptoras = Egual.query.filter(
+            Egual.classificacao == 'receptora',
+            Egual.status_reprodutivo == 'ativa'
+        )
+        if data.get('receptora_ids'):
+            query_receptoras = query_receptoras.filter(Egual.id.in_(data['receptora_ids']))
+        receptoras = query_receptoras.order_by(Egual.id).all()
+        estatisticas = carregar_estatisticas([r.id for r in receptoras])
+        
+        # Ovulação equivalente do embrião: informada, pela idade (dias) ou a da doadora
+        def ovulacao_embriao(e):
+            if e.get('data_ovulacao'):
+                return e['data_ovulacao']
+            if e.get('dia_embriao') is not None:
+                return str(data_transferencia - timedelta(days=int(e['dia_embriao'])))
+            doadora = doadoras.get(e.get('doadora_id'))
+            return getattr(doadora, 'data_ultimo_cio', None)
+        
+        def sucesso(receptora_id):
+            stats = estatisticas.get(receptora_id)
+            if stats is None:
+                return alocacao.TAXA_SUCESSO_PADRAO
+            return alocacao.taxa_sucesso(stats.gestacoes_confirmadas, stats.total_transferencias)
+        
+        scores, atraso, viavel = alocacao.matriz_compatibilidade(
+            [_data_ou_nat(ovulacao_embriao(e)) for e in embrioes],
+            [alocacao.fator_qualidade(e.get('grau')) for e in embrioes],
+            [_data_ou_nat(r.data_ultimo_cio) for r in receptoras],
+            [sucesso(r.id) for r in receptoras],
+            janela
+        )
+        pares = alocacao.alocar(scores, viavel)
+        
+        plano = []
+        alocados = set()
+        for i, j in pares:
+            e, r = embrioes[i], receptoras[j]
+            alocados.add(i)
+            plano.append({
+                'embriao_id': e.get('id', i + 1),
+                'doadora_id': e.get('doadora_id'),
+                'receptora_id': r.id,
+                'receptora_nome': r.nome_egua,
+                'diferenca_sincronia_dias': int(atraso[i, j]),
+                'probabilidade_prenhez': round(float(scores[i, j]), 4)
+            })
+        nao_alocados = [{
+            'embriao_id': e.get('id', i + 1),
+            'doadora_id': e.get('doadora_id'),
+            'motivo': 'sem receptora na janela de sincronia' if not viavel[i].any() else 'receptoras insuficientes'
+        } for i, e in enumerate(embrioes) if i not in alocados]
+        
+        return jsonify({
+            'data_transferencia': data_transferencia.isoformat(),
+            'janela_sincronia': list(janela),
+            'plano': plano,
+            'nao_alocados': nao_alocados,
+            'resumo': {
+                'embrioes': len(embrioes),
+                'receptoras_disponiveis': len(receptoras),
+                'alocados': len(plano),
+                'prenhezes_esperadas': round(sum(p['probabilidade_prenhez'] for p in plano), 2)
+            }
+        })
+        
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Dados invalidos: {e}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @analytics_bp.route("/matching/protocolo-sincronizacao", methods=["POST"])
 def sugerir_protocolo_sincronizacao():
     """
@@ -165,11 +278,12 @@ def predizer_qualidade_embrioes():
             return jsonify({"error": "Doadora não encontrada"}), 404
         
         # Preparar dados para predição
+        estatisticas = carregar_estatisticas([doadora_id])
         dados_predicao = {
             'idade_doadora': doadora.idade,
             'condicao_corporal_doadora': doadora.condicao_corporal,
-            'numero_coletas_anteriores': _contar_coletas_anteriores(doadora_id),
-            'intervalo_dias_ultima_coleta': _calcular_intervalo_ultima_coleta(doadora_id),
+            'numero_coletas_anteriores': _contar_coletas_anteriores(doadora_id, estatisticas),
+            'intervalo_dias_ultima_coleta': _calcular_intervalo_ultima_coleta(doadora_id, estatisticas),
             'nutricao_score': data.get('nutricao_score', 8),
             'ccos_esperados': data.get('ccos_esperados', 10)
         }
@@ -239,13 +353,14 @@ def analise_completa_doadora():
             return jsonify({"error": "Doadora não encontrada"}), 404
         
         # Preparar dados completos
+        estatisticas = carregar_estatisticas([doadora_id])
         dados_doadora = {
             'idade_doadora': doadora.idade,
             'peso_doadora': doadora.peso,
             'condicao_corporal_doadora': doadora.condicao_corporal,
-            'historico_medio_ccos': _calcular_media_ccos_historica(doadora_id),
-            'numero_coletas_anteriores': _contar_coletas_anteriores(doadora_id),
-            'intervalo_dias_ultima_coleta': _calcular_intervalo_ultima_coleta(doadora_id),
+            'historico_medio_ccos': _calcular_media_ccos_historica(doadora_id, estatisticas),
+            'numero_coletas_anteriores': _contar_coletas_anteriores(doadora_id, estatisticas),
+            'intervalo_dias_ultima_coleta': _calcular_intervalo_ultima_coleta(doadora_id, estatisticas),
             'nutricao_score': data.get('nutricao_score', 8),
             'dias_protocolo_superovulacao': data.get('dias_protocolo', 10),
             'experiencia_veterinario': data.get('experiencia_veterinario', 5),
@@ -297,11 +412,12 @@ def analise_transferencia_embriao():
             'condicao_corporal_doadora': doadora.condicao_corporal
         }
         
+        estatisticas = carregar_estatisticas([receptora.id])
         dados_receptora = {
             'idade_receptora': receptora.idade,
             'condicao_corporal_receptora': receptora.condicao_corporal,
-            'historico_sucesso_receptora': _calcular_historico_sucesso_receptora(receptora.id),
-            'historico_perdas_receptora': _calcular_historico_perdas_receptora(receptora.id)
+            'historico_sucesso_receptora': _calcular_historico_sucesso_receptora(receptora.id, estatisticas),
+            'historico_perdas_receptora': _calcular_historico_perdas_receptora(receptora.id, estatisticas)
         }
         
         dados_embriao = {
@@ -342,78 +458,158 @@ def obter_kpis_dashboard():
     Retorna KPIs principais para o dashboard
     """
     try:
-        # Período de análise (últimos 12 meses)
-        data_inicio = datetime.now() - timedelta(days=365)
-        
-        # KPIs básicos
-        total_eguas = Egual.query.count()
-        eguas_ativas = Egual.query.filter(Egual.status_reprodutivo == 'ativa').count()
-        
-        # Procedimentos no período
-        procedimentos_periodo = ProcedimentoOPU.query.filter(
-            ProcedimentoOPU.data_procedimento >= data_inicio
-        ).count()
-        
-        # Taxa de prenhez (últimos 6 meses)
-        data_prenhez = datetime.now() - timedelta(days=180)
-        transferencias = TransferenciaEmbriao.query.filter(
-            TransferenciaEmbriao.data_transferencia >= data_prenhez
-        ).count()
-        
-        gestacoes_confirmadas = Gestacao.query.filter(
-            Gestacao.data_diagnostico >= data_prenhez.strftime('%Y-%m-%d'),
-            Gestacao.status_gestacao == 'confirmada'
-        ).count()
-        
-        taxa_prenhez = (gestacoes_confirmadas / max(transferencias, 1)) * 100
-        
-        # Análise mensal (últimos 6 meses)
-        dados_mensais = []
-        for i in range(6):
-            mes_inicio = datetime.now() - timedelta(days=30 * (i + 1))
-            mes_fim = datetime.now() - timedelta(days=30 * i)
-            
-            proc_mes = ProcedimentoOPU.query.filter(
-                ProcedimentoOPU.data_procedimento >= mes_inicio,
-                ProcedimentoOPU.data_procedimento < mes_fim
-            ).count()
-            
-            dados_mensais.append({
-                'mes': mes_inicio.strftime('%Y-%m'),
-                'procedimentos': proc_mes
-            })
-        
-        dados_mensais.reverse()  # Ordem cronológica
-        
-        return jsonify({
-            'kpis_principais': {
-                'total_eguas': total_eguas,
-                'eguas_ativas': eguas_ativas,
-                'procedimentos_ano': procedimentos_periodo,
-                'taxa_prenhez_percentual': round(taxa_prenhez, 1)
-            },
-            'tendencias_mensais': dados_mensais,
-            'ultima_atualizacao': datetime.now().isoformat()
-        })
+        tenant_id = _tenant_atual()
+        resultado = _kpis_em_cache(tenant_id)
+        if resultado is None:
+            resultado = _calcular_kpis(tenant_id)
+            _guardar_kpis(tenant_id, resultado)
+        return jsonify(resultado)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# KPIs do dashboard: duas consultas agregadas (totais e tendência mensal) e
+# cache curto por tenant, já que todo dashboard aberto consulta este endpoint.
+# Gravações nas tabelas de origem invalidam o cache no commit.
+
+KPIS_CACHE_SECONDS = int(os.environ.get('KPIS_CACHE_SECONDS', 30))
+MESES_TENDENCIA = 6
+
+_kpis_cache = {}
+_kpis_lock = threading.Lock()
+
+def _tenant_atual():
+    try:
+        verify_jwt_in_request(optional=True)
+        return (get_jwt() or {}).get('tenant_id')
+    except Exception:
+        return None
+
+def _kpis_em_cache(tenant_id):
+    entrada = _kpis_cache.get(tenant_id)
+    if entrada and time.monotonic() < entrada[0]:
+        return entrada[1]
+    return None
+
+def _guardar_kpis(tenant_id, resultado):
+    with _kpis_lock:
+        _kpis_cache[tenant_id] = (time.monotonic() + KPIS_CACHE_SECONDS, resultado)
+
+def invalidar_kpis(tenant_id=None):
+    with _kpis_lock:
+        if tenant_id is None:
+            _kpis_cache.clear()
+        else:
+            _kpis_cache.pop(tenant_id, None)
+
+def _do_tenant(modelo, tenant_id):
+    # Só filtra quando a tabela tem tenant_id
+    coluna = getattr(modelo, 'tenant_id', None)
+    if tenant_id is None or coluna is None:
+        return []
+    return [coluna == tenant_id]
+
+def _mes(coluna):
+    """Expressão 'AAAA-MM' da coluna de data (texto ISO) no dialeto do banco."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.to_char(func.date_trunc('month', cast(coluna, Date)), 'YYYY-MM')
+    return func.strftime('%Y-%m', coluna)
+
+def _meses_anteriores(hoje, quantidade):
+    ano, mes = hoje.year, hoje.month
+    meses = []
+    for _ in range(quantidade):
+        meses.append(f"{ano:04d}-{mes:02d}")
+        ano, mes = (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+    return meses[::-1]
+
+def _calcular_kpis(tenant_id):
+    agora = datetime.now()
+    # As datas dessas tabelas são texto 'AAAA-MM-DD'
+    inicio_ano = (agora - timedelta(days=365)).strftime('%Y-%m-%d')
+    inicio_prenhez = (agora - timedelta(days=180)).strftime('%Y-%m-%d')
+    meses = _meses_anteriores(agora, MESES_TENDENCIA)
+
+    def contagem(modelo, *condicoes):
+        return select(func.count()).select_from(modelo).where(
+            *condicoes, *_do_tenant(modelo, tenant_id)
+        ).scalar_subquery()
+
+    # Totais: uma única ida ao banco
+    totais = db.session.execute(select(
+        contagem(Egual).label('total_eguas'),
+        contagem(Egual, Egual.status_reprodutivo == 'ativa').label('eguas_ativas'),
+        contagem(ProcedimentoOPU, ProcedimentoOPU.data_procedimento >= inicio_ano).label('procedimentos_ano'),
+        contagem(TransferenciaEmbriao,
+                 TransferenciaEmbriao.data_transferencia >= inicio_prenhez).label('transferencias'),
+        contagem(Gestacao, Gestacao.data_diagnostico >= inicio_prenhez,
+                 Gestacao.status_gestacao == 'confirmada').label('gestacoes_confirmadas')
+    )).one()
+
+    # Tendência: procedimentos por mês-calendário
+    mes = _mes(ProcedimentoOPU.data_procedimento)
+    por_mes = dict(db.session.execute(
+        select(mes, func.count()).where(
+            ProcedimentoOPU.data_procedimento >= meses[0] + '-01',
+            *_do_tenant(ProcedimentoOPU, tenant_id)
+        ).group_by(mes)
+    ).all())
+
+    taxa_prenhez = (totais.gestacoes_confirmadas / max(totais.transferencias, 1)) * 100
+    return {
+        'kpis_principais': {
+            'total_eguas': totais.total_eguas,
+            'eguas_ativas': totais.eguas_ativas,
+            'procedimentos_ano': totais.procedimentos_ano,
+            'taxa_prenhez_percentual': round(taxa_prenhez, 1)
+        },
+        'tendencias_mensais': [{'mes': m, 'procedimentos': por_mes.get(m, 0)} for m in meses],
+        'ultima_atualizacao': agora.isoformat()
+    }
+
+_FONTES_KPIS = (Egual, ProcedimentoOPU, TransferenciaEmbriao, Gestacao)
+
+@event.listens_for(db.session, 'after_flush')
+def _coletar_kpis_alterados(session, flush_context):
+    tenants = session.info.setdefault('kpis_alterados', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, _FONTES_KPIS):
+            # Sem tenant_id na linha não dá para saber quem ela afeta
+            tenants.add(getattr(obj, 'tenant_id', None))
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidar_kpis_alterados(session):
+    tenants = session.info.pop('kpis_alterados', None)
+    if not tenants:
+        return
+    if None in tenants:
+        invalidar_kpis()
+        return
+    with _kpis_lock:
+        for tenant_id in tenants:
+            _kpis_cache.pop(tenant_id, None)
+        # A entrada sem tenant soma todos os tenants, então também muda
+        _kpis_cache.pop(None, None)
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_kpis_alterados(session):
+    session.info.pop('kpis_alterados', None)
+
 # Funções auxiliares
-def _criar_perfil_doadora(doadora_db) -> PerfilDoadora:
+def _criar_perfil_doadora(doadora_db, estatisticas=None) -> PerfilDoadora:
     """Cria perfil de doadora a partir dos dados do banco"""
     return PerfilDoadora(
         id=doadora_db.id,
         nome=doadora_db.nome_egua,
         idade=doadora_db.idade,
         qualidade_genetica=8.0,  # Valor padrão, pode ser calculado
-        taxa_recuperacao_ccos=_calcular_media_ccos_historica(doadora_db.id),
+        taxa_recuperacao_ccos=_calcular_media_ccos_historica(doadora_db.id, estatisticas),
         qualidade_embrioes=75.0,  # Valor padrão
-        ciclos_anteriores=_contar_coletas_anteriores(doadora_db.id),
-        data_ultimo_procedimento=_obter_data_ultimo_procedimento(doadora_db.id)
+        ciclos_anteriores=_contar_coletas_anteriores(doadora_db.id, estatisticas),
+        data_ultimo_procedimento=_obter_data_ultimo_procedimento(doadora_db.id, estatisticas)
     )
 
-def _criar_perfil_receptora(receptora_db) -> PerfilReceptora:
+def _criar_perfil_receptora(receptora_db, estatisticas=None) -> PerfilReceptora:
     """Cria perfil de receptora a partir dos dados do banco"""
     return PerfilReceptora(
         id=receptora_db.id,
@@ -425,100 +621,88 @@ def _criar_perfil_receptora(receptora_db) -> PerfilReceptora:
         status_reprodutivo=StatusReproductivo.VAZIA,  # Simplificado
         fase_estral=FaseEstral.DIESTRO,  # Simplificado
         data_ultimo_cio=None,  # Seria obtido de outra tabela
-        historico_gestacoes=_contar_gestacoes_anteriores(receptora_db.id),
-        taxa_sucesso_historica=_calcular_historico_sucesso_receptora(receptora_db.id),
+        historico_gestacoes=_contar_gestacoes_anteriores(receptora_db.id, estatisticas),
+        taxa_sucesso_historica=_calcular_historico_sucesso_receptora(receptora_db.id, estatisticas),
         dias_pos_parto=None,  # Seria calculado
         protocolos_anteriores=[],
         disponivel=receptora_db.status_reprodutivo == 'ativa',
         custo_manutencao=150.0
     )
 
-def _calcular_historico_sucesso_receptora(receptora_id: int) -> float:
+# Os históricos vêm de animal_repro_stats. Quem monta vários perfis carrega
+# as estatísticas de todos de uma vez (carregar_estatisticas) e passa o dict.
+def _data_ou_nat(valor):
+    """Data (texto ISO, date ou datetime) como datetime64[D]; NaT se ausente."""
+    import numpy as np
+    if not valor:
+        return np.datetime64('NaT', 'D')
+    return np.datetime64(str(valor)[:10], 'D')
+
+def _estatisticas(animal_id, estatisticas=None):
+    if estatisticas is None:
+        estatisticas = carregar_estatisticas([animal_id])
+    return estatisticas.get(animal_id)
+
+def _calcular_historico_sucesso_receptora(receptora_id: int, estatisticas=None) -> float:
     """Calcula taxa de sucesso histórica da receptora"""
     try:
-        transferencias = TransferenciaEmbriao.query.filter(
-            TransferenciaEmbriao.receptora_id == receptora_id
-        ).count()
-        
-        gestacoes = Gestacao.query.join(TransferenciaEmbriao).filter(
-            TransferenciaEmbriao.receptora_id == receptora_id,
-            Gestacao.status_gestacao == 'confirmada'
-        ).count()
-        
-        return gestacoes / max(transferencias, 1)
+        stats = _estatisticas(receptora_id, estatisticas)
+        if stats is None:
+            return 0.0
+        return stats.gestacoes_confirmadas / max(stats.total_transferencias, 1)
     except:
         return 0.7  # Valor padrão
 
-def _calcular_historico_perdas_receptora(receptora_id: int) -> float:
+def _calcular_historico_perdas_receptora(receptora_id: int, estatisticas=None) -> float:
     """Calcula taxa de perdas embrionárias da receptora"""
     try:
-        gestacoes_confirmadas = Gestacao.query.join(TransferenciaEmbriao).filter(
-            TransferenciaEmbriao.receptora_id == receptora_id,
-            Gestacao.status_gestacao == 'confirmada'
-        ).count()
-        
-        perdas = Gestacao.query.join(TransferenciaEmbriao).filter(
-            TransferenciaEmbriao.receptora_id == receptora_id,
-            Gestacao.status_gestacao == 'perda_embrionaria'
-        ).count()
-        
-        return perdas / max(gestacoes_confirmadas + perdas, 1)
+        stats = _estatisticas(receptora_id, estatisticas)
+        if stats is None:
+            return 0.0
+        return stats.perdas_embrionarias / max(stats.gestacoes_confirmadas + stats.perdas_embrionarias, 1)
     except:
         return 0.15  # Valor padrão
 
-def _calcular_media_ccos_historica(doadora_id: int) -> float:
+def _calcular_media_ccos_historica(doadora_id: int, estatisticas=None) -> float:
     """Calcula média histórica de CCOs recuperados"""
     try:
-        procedimentos = ProcedimentoOPU.query.filter(
-            ProcedimentoOPU.doadora_id == doadora_id
-        ).all()
-        
-        if not procedimentos:
+        stats = _estatisticas(doadora_id, estatisticas)
+        if stats is None or not stats.total_coletas:
             return 10.0  # Valor padrão
-        
-        total_ccos = sum(p.ccos_recuperados for p in procedimentos if p.ccos_recuperados)
-        return total_ccos / len(procedimentos)
+        return stats.total_ccos / stats.total_coletas
     except:
         return 10.0
 
-def _contar_coletas_anteriores(doadora_id: int) -> int:
+def _contar_coletas_anteriores(doadora_id: int, estatisticas=None) -> int:
     """Conta número de coletas anteriores"""
     try:
-        return ProcedimentoOPU.query.filter(
-            ProcedimentoOPU.doadora_id == doadora_id
-        ).count()
+        stats = _estatisticas(doadora_id, estatisticas)
+        return stats.total_coletas if stats else 0
     except:
         return 0
 
-def _calcular_intervalo_ultima_coleta(doadora_id: int) -> int:
+def _calcular_intervalo_ultima_coleta(doadora_id: int, estatisticas=None) -> int:
     """Calcula dias desde última coleta"""
     try:
-        ultimo_proc = ProcedimentoOPU.query.filter(
-            ProcedimentoOPU.doadora_id == doadora_id
-        ).order_by(ProcedimentoOPU.data_procedimento.desc()).first()
-        
-        if ultimo_proc:
-            return (datetime.now().date() - ultimo_proc.data_procedimento).days
+        ultima = _obter_data_ultimo_procedimento(doadora_id, estatisticas)
+        if ultima:
+            return (datetime.now().date() - date.fromisoformat(str(ultima)[:10])).days
         return 30  # Valor padrão
     except:
         return 30
 
-def _obter_data_ultimo_procedimento(doadora_id: int):
+def _obter_data_ultimo_procedimento(doadora_id: int, estatisticas=None):
     """Obtém data do último procedimento"""
     try:
-        ultimo_proc = ProcedimentoOPU.query.filter(
-            ProcedimentoOPU.doadora_id == doadora_id
-        ).order_by(ProcedimentoOPU.data_procedimento.desc()).first()
-        
-        return ultimo_proc.data_procedimento if ultimo_proc else None
+        stats = _estatisticas(doadora_id, estatisticas)
+        return stats.data_ultimo_procedimento if stats else None
     except:
         return None
 
-def _contar_gestacoes_anteriores(receptora_id: int) -> int:
+def _contar_gestacoes_anteriores(receptora_id: int, estatisticas=None) -> int:
     """Conta gestações anteriores da receptora"""
     try:
-        return Gestacao.query.join(TransferenciaEmbriao).filter(
-            TransferenciaEmbriao.receptora_id == receptora_id
-        ).count()
+        stats = _estatisticas(receptora_id, estatisticas)
+        return stats.total_gestacoes if stats else 0
     except:
         return 0
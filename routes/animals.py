@@ -1,16 +1,31 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import OperationalError
 from models.database import db_session
-from models.animals import Egua, Receptora
-from auth.middleware import token_required
+from models.animals import Egua, Receptora, EventoAnimal, TIPOS_EVENTO
+from auth.middleware import token_required, usar_replica
+from routes.paginacao import paginar, resposta_paginada, modo_legado, CursorInvalido
+from services import eventos_animal
 
 animals_bp = Blueprint("animals", __name__)
 
 @animals_bp.route("/eguas", methods=["GET"])
 @token_required
+@usar_replica
 def list_eguas(current_user):
     try:
-        lista = db_session.query(Egua).filter_by(tenant_id=current_user.tenant_id).all()
-        return jsonify([{"id":e.id, "nome":e.nome, "status":e.status, "historico":e.historico or ""} for e in lista]), 200
+        query = db_session.query(Egua).filter_by(tenant_id=current_user.tenant_id)
+        # "historico" continua como texto, montado dos eventos mais recentes
+        def serializar_lista(eguas):
+            historicos = eventos_animal.resumo_historico(db_session, current_user.tenant_id, [e.id for e in eguas])
+            return [{"id":e.id, "nome":e.nome, "status":e.status, "historico":historicos.get(e.id, "")} for e in eguas]
+        if modo_legado():
+            return jsonify(serializar_lista(query.all())), 200
+        lista, next_cursor, limite = paginar(query, Egua.nome, Egua.id)
+        return jsonify(resposta_paginada(serializar_lista(lista), next_cursor, limite)), 200
+    except CursorInvalido as e:
+        return jsonify({"error": str(e)}), 400
+    except OperationalError:
+        raise  # @usar_replica repete a leitura no primario
     except Exception as e:
         print(f"Erro GET Eguas: {e}")
         return jsonify([]), 200
@@ -23,10 +38,13 @@ def add_egua(current_user):
         nova = Egua(
             tenant_id=current_user.tenant_id, 
             nome=data.get("nome"), 
-            status=data.get("status"), 
-            historico=data.get("historico", "")
+            status=data.get("status")
         )
         db_session.add(nova)
+        db_session.flush()
+        if data.get("historico"):
+            eventos_animal.registrar(db_session, current_user.tenant_id, nova.id, data["historico"],
+                                     tipo='cadastro', data=data.get("data"), usuario_id=current_user.id)
         db_session.commit()
         return jsonify({"msg": "Salvo"}), 201
     except Exception as e:
@@ -38,24 +56,55 @@ def add_egua(current_user):
 def update_egua(current_user, id):
     data = request.get_json()
     try:
-        egua = db_session.query(Egua).get(id)
+        egua = db_session.query(Egua).filter_by(id=id, tenant_id=current_user.tenant_id).first()
         if egua:
-            if 'historico' in data: 
-                antigo = egua.historico or ""
-                novo = f"{data['historico']} ({data.get('data','')})"
-                egua.historico = novo + " | " + antigo # Novo na frente
+            if data.get('historico'):
+                tipo = data.get('tipo') if data.get('tipo') in TIPOS_EVENTO else 'anotacao'
+                eventos_animal.registrar(db_session, current_user.tenant_id, egua.id, data['historico'],
+                                         tipo=tipo, data=data.get('data'), usuario_id=current_user.id)
             db_session.commit()
             return jsonify({"msg": "Atualizado"}), 200
         return jsonify({"error": "Nao achou"}), 404
     except Exception as e:
+        db_session.rollback()
         return jsonify({"error": str(e)}), 500
 
+@animals_bp.route("/eguas/<int:id>/eventos", methods=["GET"])
+@token_required
+@usar_replica
+def list_eventos_egua(current_user, id):
+    # Mais recentes primeiro; ?data_inicio=&data_fim= (AAAA-MM-DD, fim exclusivo) e ?tipo=a,b
+    periodo = {}
+    for campo in ('data_inicio', 'data_fim'):
+        valor = request.args.get(campo)
+        periodo[campo] = eventos_animal.interpretar_data(valor) if valor else None
+        if valor and periodo[campo] is None:
+            return jsonify({"error": f"{campo} deve estar no formato AAAA-MM-DD"}), 400
+    tipos = [t for t in request.args.get('tipo', '').split(',') if t]
+    try:
+        if any(t not in TIPOS_EVENTO for t in tipos):
+            return jsonify({"error": f"tipo deve ser um de {', '.join(TIPOS_EVENTO)}"}), 400
+        query = eventos_animal.consultar(db_session, current_user.tenant_id, id, tipos=tipos, **periodo)
+        lista, next_cursor, limite = paginar(query, EventoAnimal.data, EventoAnimal.id, desc=True)
+        return jsonify(resposta_paginada([e.to_dict() for e in lista], next_cursor, limite, animal_id=id)), 200
+    except CursorInvalido as e:
+        return jsonify({"error": str(e)}), 400
+
 @animals_bp.route("/receptoras", methods=["GET"])
 @token_required
+@usar_replica
 def list_recept(current_user):
     try:
-        lista = db_session.query(Receptora).filter_by(tenant_id=current_user.tenant_id).all()
-        return jsonify([{"id":r.id, "nome":r.nome, "status":r.status, "lote":r.lote} for r in lista]), 200
+        query = db_session.query(Receptora).filter_by(tenant_id=current_user.tenant_id)
+        serializar = lambda r: {"id":r.id, "nome":r.nome, "status":r.status, "lote":r.lote}
+        if modo_legado():
+            return jsonify([serializar(r) for r in query.all()]), 200
+        lista, next_cursor, limite = paginar(query, Receptora.nome, Receptora.id)
+        return jsonify(resposta_paginada([serializar(r) for r in lista], next_cursor, limite)), 200
+    except CursorInvalido as e:
+        return jsonify({"error": str(e)}), 400
+    except OperationalError:
+        raise  # @usar_replica repete a leitura no primario
     except: return jsonify([]), 200
 
 @animals_bp.route("/receptoras", methods=["POST"])
@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import OperationalError
 from models.custo_prenhez import ItemCusto, Procedimento, CalculoPrenhez
 from models.database import db_session
-from auth.middleware import token_required
+from auth.middleware import token_required, usar_replica
+from routes.paginacao import paginar, resposta_paginada, modo_legado, CursorInvalido
 from datetime import datetime
 
 custo_bp = Blueprint("custo_prenhez", __name__)
@@ -9,14 +11,23 @@ custo_bp = Blueprint("custo_prenhez", __name__)
 # --- ITENS ---
 @custo_bp.route("/custo_itens", methods=["GET"])
 @token_required
+@usar_replica
 def get_itens(current_user):
     try:
-        itens = db_session.query(ItemCusto).filter_by(tenant_id=current_user.tenant_id).all()
-        return jsonify([{
+        query = db_session.query(ItemCusto).filter_by(tenant_id=current_user.tenant_id)
+        serializar = lambda i: {
             "id": i.id, "nome": i.nome, "categoria": i.categoria,
             "dose_usada": i.dose_usada, "unidade_medida": i.unidade_medida,
             "custo_da_dose": i.custo_da_dose
-        } for i in itens]), 200
+        }
+        if modo_legado():
+            return jsonify([serializar(i) for i in query.all()]), 200
+        itens, next_cursor, limite = paginar(query, ItemCusto.nome, ItemCusto.id)
+        return jsonify(resposta_paginada([serializar(i) for i in itens], next_cursor, limite)), 200
+    except CursorInvalido as e:
+        return jsonify({"error": str(e)}), 400
+    except OperationalError:
+        raise  # @usar_replica repete a leitura no primario
     except: return jsonify([]), 200
 
 @custo_bp.route("/custo_itens", methods=["POST"])
@@ -53,9 +64,17 @@ def add_item(current_user):
 # --- PROCEDIMENTOS ---
 @custo_bp.route("/procedimentos", methods=["GET"])
 @token_required
+@usar_replica
 def get_procs(current_user):
-    l = db_session.query(Procedimento).filter_by(tenant_id=current_user.tenant_id).all()
-    return jsonify([{"id":p.id,"nome":p.nome,"custo_total":p.custo_total} for p in l]), 200
+    query = db_session.query(Procedimento).filter_by(tenant_id=current_user.tenant_id)
+    serializar = lambda p: {"id":p.id,"nome":p.nome,"custo_total":p.custo_total}
+    if modo_legado():
+        return jsonify([serializar(p) for p in query.all()]), 200
+    try:
+        l, next_cursor, limite = paginar(query, Procedimento.nome, Procedimento.id)
+    except CursorInvalido as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(resposta_paginada([serializar(p) for p in l], next_cursor, limite)), 200
 
 @custo_bp.route("/procedimentos", methods=["POST"])
 @token_required
@@ -83,9 +102,17 @@ def add_proc(current_user):
 # --- PRENHEZ ---
 @custo_bp.route("/prenhez", methods=["GET"])
 @token_required
+@usar_replica
 def get_calcs(current_user):
-    l = db_session.query(CalculoPrenhez).filter_by(tenant_id=current_user.tenant_id).all()
-    return jsonify([{"id":c.id,"nome":c.nome,"total":c.custo_total_prenhez, "data":c.data_criacao} for c in l]), 200
+    query = db_session.query(CalculoPrenhez).filter_by(tenant_id=current_user.tenant_id)
+    serializar = lambda c: {"id":c.id,"nome":c.nome,"total":c.custo_total_prenhez, "data":c.data_criacao}
+    if modo_legado():
+        return jsonify([serializar(c) for c in query.all()]), 200
+    try:
+        l, next_cursor, limite = paginar(query, CalculoPrenhez.id, CalculoPrenhez.id)
+    except CursorInvalido as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(resposta_paginada([serializar(c) for c in l], next_cursor, limite)), 200
 
 @custo_bp.route("/prenhez", methods=["POST"])
 @token_required
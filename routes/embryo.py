@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from models.embryo import Embriao
 from models.database import db_session
 from auth.middleware import token_required, role_required
+from routes.paginacao import paginar, resposta_paginada, modo_legado, CursorInvalido
+from services import inventario_embrioes as inventario
 from datetime import datetime
 
 embryo_bp = Blueprint("embryo", __name__)
@@ -33,16 +35,50 @@ def add_embryo(current_user):
 @embryo_bp.route("", methods=["GET"])
 @token_required
 def list_embryos(current_user):
-    # Lista apenas os que estao no estoque (Congelados ou Frescos aguardando TE)
-    embrioes = db_session.query(Embriao).filter_by(tenant_id=current_user.tenant_id).filter(Embriao.status.in_(['Congelado', 'Fresco'])).all()
-    
-    lista = []
-    for e in embrioes:
-        lista.append({
-            "id": e.id,
-            "cruzamento": f"Doadora {e.doadora_id} x {e.garanhao_nome}",
-            "qualidade": f"{e.estagio_desenvolvimento} (G{e.grau_qualidade})",
-            "local": f"Botijão {e.botijao} / Caneca {e.caneca}",
-            "data": e.data_producao.strftime("%d/%m/%Y")
-        })
-    return jsonify(lista), 200
+    # Lista apenas os que estao no estoque (Congelados ou Frescos aguardando TE),
+    # com os mesmos filtros de faceta do inventario (?doadora=&garanhao=&grau=...)
+    try:
+        filtros = inventario.ler_filtros(request.args)
+    except ValueError:
+        return jsonify({"error": "doadora deve ser numerica"}), 400
+    query = inventario.consultar(db_session, current_user.tenant_id, filtros)
+    serializar = lambda e: {
+        "id": e.id,
+        "cruzamento": f"Doadora {e.doadora_id} x {e.garanhao_nome}",
+        "qualidade": f"{e.estagio_desenvolvimento} (G{e.grau_qualidade})",
+        "local": f"Botijão {e.botijao} / Caneca {e.caneca}",
+        "data": e.data_producao.strftime("%d/%m/%Y")
+    }
+    if modo_legado():
+        return jsonify([serializar(e) for e in query.all()]), 200
+    try:
+        embrioes, next_cursor, limite = paginar(query, Embriao.id, Embriao.id)
+    except CursorInvalido as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(resposta_paginada([serializar(e) for e in embrioes], next_cursor, limite)), 200
+
+@embryo_bp.route("/inventario", methods=["GET"])
+@token_required
+def inventario_facetas(current_user):
+    # Contagens por doadora, garanhao, grau, estagio, botijao e caneca
+    try:
+        filtros = inventario.ler_filtros(request.args)
+    except ValueError:
+        return jsonify({"error": "doadora deve ser numerica"}), 400
+    total, facetas = inventario.contar_facetas(db_session, current_user.tenant_id, filtros)
+    return jsonify({"total": total, "filtros": filtros, "facetas": facetas}), 200
+
+@embryo_bp.route("/inventario/localizacao", methods=["GET"])
+@token_required
+def inventario_localizacao(current_user):
+    # Ex.: ?doadora=12&garanhao=Hunter&grau=1&estagio=Blastocisto -> botijao/caneca
+    try:
+        filtros = inventario.ler_filtros(request.args)
+    except ValueError:
+        return jsonify({"error": "doadora deve ser numerica"}), 400
+    locais = inventario.localizar(db_session, current_user.tenant_id, filtros)
+    return jsonify({
+        "filtros": filtros,
+        "total": sum(l['quantidade'] for l in locais),
+        "locais": locais
+    }), 200
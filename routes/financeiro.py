@@ -1,7 +1,12 @@
-from flask import Blueprint, request, jsonify
+import csv
+import io
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from sqlalchemy import func
 from models.financeiro import TransacaoFinanceira
 from models.database import db_session
-from auth.middleware import token_required, role_required
+from auth.middleware import token_required, role_required, usar_replica
+from routes.paginacao import paginar, modo_legado, CursorInvalido
 from datetime import datetime
 
 financeiro_bp = Blueprint("financeiro", __name__)
@@ -10,20 +15,36 @@ financeiro_bp = Blueprint("financeiro", __name__)
 @financeiro_bp.route("", methods=["GET"])
 @token_required
 @role_required(["proprietario", "veterinario"])
+@usar_replica
 def get_financeiro(current_user):
     tenant_id = current_user.tenant_id
-    transacoes = db_session.query(TransacaoFinanceira).filter_by(tenant_id=tenant_id).order_by(TransacaoFinanceira.data_transacao.desc()).all()
+
+    # Resumo calculado no banco (um GROUP BY), sem carregar as transacoes
+    totais = dict(db_session.query(TransacaoFinanceira.tipo, func.coalesce(func.sum(TransacaoFinanceira.valor), 0.0))
+                  .filter_by(tenant_id=tenant_id).group_by(TransacaoFinanceira.tipo).all())
+    total_receitas = totais.pop('Receita', 0.0)
+    total_despesas = sum(totais.values(), 0.0)
+    saldo = total_receitas - total_despesas
+    resumo = {
+        "receitas": f"R$ {total_receitas:.2f}",
+        "despesas": f"R$ {total_despesas:.2f}",
+        "saldo": f"R$ {saldo:.2f}"
+    }
+    if request.args.get('resumo_only', '').lower() in ('1', 'true', 'sim'):
+        return jsonify({"resumo": resumo}), 200
+
+    query = db_session.query(TransacaoFinanceira).filter_by(tenant_id=tenant_id)
+    next_cursor = limite = None
+    if modo_legado():
+        transacoes = query.order_by(TransacaoFinanceira.data_transacao.desc()).all()
+    else:
+        try:
+            transacoes, next_cursor, limite = paginar(query, TransacaoFinanceira.data_transacao, TransacaoFinanceira.id, desc=True)
+        except CursorInvalido as e:
+            return jsonify({"message": str(e)}), 400
     
     lista = []
-    total_receitas = 0.0
-    total_despesas = 0.0
-
     for t in transacoes:
-        if t.tipo == 'Receita':
-            total_receitas += t.valor
-        else:
-            total_despesas += t.valor
-            
         lista.append({
             "id": t.id,
             "descricao": t.descricao,
@@ -32,17 +53,82 @@ def get_financeiro(current_user):
             "categoria": t.categoria,
             "data": t.data_transacao.strftime('%d/%m/%Y')
         })
-    
-    saldo = total_receitas - total_despesas
 
-    return jsonify({
-        "extrato": lista,
-        "resumo": {
-            "receitas": f"R$ {total_receitas:.2f}",
-            "despesas": f"R$ {total_despesas:.2f}",
-            "saldo": f"R$ {saldo:.2f}"
-        }
-    }), 200
+    resposta = {"extrato": lista, "resumo": resumo}
+    if limite is not None:
+        resposta.update({"next_cursor": next_cursor, "limit": limite})
+    return jsonify(resposta), 200
+
+# Exportar Extrato (streaming NDJSON ou CSV)
+EXPORT_LOTE = 1000
+EXPORT_COLUNAS = ["id", "data", "tipo", "categoria", "descricao", "valor"]
+
+@financeiro_bp.route("/exportar", methods=["GET"])
+@token_required
+@role_required(["proprietario", "veterinario"])
+@usar_replica
+def exportar_financeiro(current_user):
+    formato = request.args.get('formato', 'ndjson').lower()
+    if formato not in ('ndjson', 'csv'):
+        return jsonify({"message": "formato deve ser ndjson ou csv"}), 400
+
+    T = TransacaoFinanceira
+    query = db_session.query(T.id, T.data_transacao, T.tipo, T.categoria, T.descricao, T.valor)\
+        .filter(T.tenant_id == current_user.tenant_id)
+    try:
+        if request.args.get('data_inicio'):
+            query = query.filter(T.data_transacao >= datetime.strptime(request.args['data_inicio'], '%Y-%m-%d').date())
+        if request.args.get('data_fim'):
+            query = query.filter(T.data_transacao <= datetime.strptime(request.args['data_fim'], '%Y-%m-%d').date())
+    except ValueError:
+        return jsonify({"message": "datas devem estar no formato AAAA-MM-DD"}), 400
+
+    # yield_per usa cursor no servidor: as linhas chegam em lotes, sem carregar o extrato inteiro.
+    # A consulta ja e executada aqui, na conexao escolhida pelo @usar_replica.
+    linhas = iter(query.order_by(T.data_transacao, T.id).yield_per(EXPORT_LOTE))
+
+    def gerar():
+        receitas = despesas = 0.0
+        total = 0
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer) if formato == 'csv' else None
+        if escritor:
+            escritor.writerow(EXPORT_COLUNAS)
+        for id, data, tipo, categoria, descricao, valor in linhas:
+            valor = valor or 0.0
+            if tipo == 'Receita':
+                receitas += valor
+            else:
+                despesas += valor
+            total += 1
+            data = data.isoformat() if data else None
+            if escritor:
+                escritor.writerow([id, data, tipo, categoria, descricao, f"{valor:.2f}"])
+            else:
+                buffer.write(json.dumps({"id": id, "data": data, "tipo": tipo, "categoria": categoria,
+                                         "descricao": descricao, "valor": round(valor, 2)}, ensure_ascii=False))
+                buffer.write("\n")
+            if total % EXPORT_LOTE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        # Registro final com os totais acumulados
+        saldo = receitas - despesas
+        if escritor:
+            escritor.writerow(["TOTAL", None, None, None, "Receitas", f"{receitas:.2f}"])
+            escritor.writerow(["TOTAL", None, None, None, "Despesas", f"{despesas:.2f}"])
+            escritor.writerow(["TOTAL", None, None, None, "Saldo", f"{saldo:.2f}"])
+        else:
+            buffer.write(json.dumps({"registro": "totais", "linhas": total, "receitas": round(receitas, 2),
+                                     "despesas": round(despesas, 2), "saldo": round(saldo, 2)}))
+            buffer.write("\n")
+        yield buffer.getvalue()
+
+    mimetype = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    nome_arquivo = f"extrato_{current_user.tenant_id}.{formato}"
+    return Response(stream_with_context(gerar()), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={nome_arquivo}"})
 
 # Adicionar Transacao
 @financeiro_bp.route("", methods=["POST"])
@@ -4,17 +4,21 @@ from datetime import datetime, date, timedelta
 from decimal import Decimal
 import json
 import calendar
-from sqlalchemy import func, extract, and_, or_
+from sqlalchemy import func, extract, and_, or_, case
 
 from models.user import db, Usuario
 from models.financeiro import (
     CategoriaFinanceira, TransacaoFinanceira, OrcamentoAnual,
-    CentroCusto, AnaliseROI, RelatorioFinanceiro, FluxoCaixa
+    CentroCusto, AnaliseROI, RelatorioFinanceiro, FluxoCaixa, RollupFinanceiroMensal
 )
+from models.database import db_session
 from auth.middleware import role_required, tenant_access_required, financial_access_required
 
 financeiro_avancado_bp = Blueprint('financeiro_avancado', __name__)
 
+# Limite do relatório de fluxo de caixa (dez anos)
+HORIZONTE_MAXIMO_DIAS = 3660
+
 @financeiro_avancado_bp.route('/categorias', methods=['GET'])
 @jwt_required()
 @tenant_access_required
@@ -136,61 +140,37 @@ def get_dashboard_financeiro(current_user, tenant_id):
 @jwt_required()
 @financial_access_required
 def relatorio_fluxo_caixa(current_user, tenant_id):
-    """Relatório de fluxo de caixa"""
-    data_inicio = request.args.get('data_inicio')
-    data_fim = request.args.get('data_fim')
-    
-    if not data_inicio or not data_fim:
-        # Padrão: últimos 30 dias
-        data_fim = date.today()
-        data_inicio = data_fim - timedelta(days=30)
-    else:
-        data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-        data_fim = datetime.strptime(data_fim, '%Y-%m-%d').date()
-    
-    # Dados simulados para demonstração
-    fluxo_dados = []
-    data_atual = data_inicio
-    saldo_acumulado = 15000.00  # Saldo inicial simulado
-    
-    while data_atual <= data_fim:
-        # Simular entradas e saídas variáveis
-        dia_mes = data_atual.day
-        entradas = 1500 + (dia_mes * 50) + ((dia_mes % 7) * 200)
-        saidas = 1200 + (dia_mes * 30) + ((dia_mes % 5) * 150)
-        
-        saldo_final = saldo_acumulado + entradas - saidas
-        
-        fluxo_dados.append({
-            'data_referencia': data_atual.isoformat(),
-            'saldo_inicial': round(saldo_acumulado, 2),
-            'entradas': round(entradas, 2),
-            'saidas': round(saidas, 2),
-            'saldo_final': round(saldo_final, 2)
-        })
-        
-        saldo_acumulado = saldo_final
-        data_atual += timedelta(days=1)
-    
-    # Calcular resumo
-    total_entradas = sum([f['entradas'] for f in fluxo_dados])
-    total_saidas = sum([f['saidas'] for f in fluxo_dados])
-    saldo_inicial = fluxo_dados[0]['saldo_inicial'] if fluxo_dados else 0
-    saldo_final = fluxo_dados[-1]['saldo_final'] if fluxo_dados else 0
+    """Relatório de fluxo de caixa (realizado + projeção dos lançamentos em aberto)"""
+    granularidade = request.args.get('granularidade', 'diaria')
+    saldo_base = request.args.get('saldo_inicial', 0.0, type=float)
+    try:
+        data_inicio = request.args.get('data_inicio')
+        data_fim = request.args.get('data_fim')
+        hoje = date.today()
+        # Padrão: últimos 30 dias e os próximos 90 de lançamentos a vencer
+        data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d').date() if data_inicio else hoje - timedelta(days=30)
+        data_fim = datetime.strptime(data_fim, '%Y-%m-%d').date() if data_fim else hoje + timedelta(days=90)
+    except ValueError:
+        return jsonify({'error': 'Datas devem estar no formato AAAA-MM-DD'}), 400
+    if (data_fim - data_inicio).days > HORIZONTE_MAXIMO_DIAS:
+        return jsonify({'error': f'Período máximo de {HORIZONTE_MAXIMO_DIAS} dias'}), 400
+    
+    # Import local: o fluxo de caixa é o único trecho deste módulo que usa NumPy
+    from services import fluxo_caixa
+    try:
+        fluxo = fluxo_caixa.relatorio(db_session, tenant_id, data_inicio, data_fim,
+                                      granularidade, saldo_base)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
         'periodo': {
             'data_inicio': data_inicio.isoformat(),
-            'data_fim': data_fim.isoformat()
-        },
-        'resumo': {
-            'saldo_inicial': saldo_inicial,
-            'total_entradas': round(total_entradas, 2),
-            'total_saidas': round(total_saidas, 2),
-            'saldo_final': round(saldo_final, 2),
-            'variacao': round(saldo_final - saldo_inicial, 2)
+            'data_fim': data_fim.isoformat(),
+            'granularidade': granularidade
         },
-        'dados_diarios': fluxo_dados
+        'resumo': fluxo['resumo'],
+        'dados_diarios': fluxo['dados']
     })
 
 @financeiro_avancado_bp.route('/relatorios/dre', methods=['GET'])
@@ -209,22 +189,22 @@ def relatorio_dre(current_user, tenant_id):
         data_inicio = date(ano, 1, 1)
         data_fim = date(ano, 12, 31)
     
-    # Dados simulados para demonstração
-    receitas = [
-        {'categoria': 'Venda de Animais', 'valor': 180000.00},
-        {'categoria': 'Serviços Reprodutivos', 'valor': 95000.00},
-        {'categoria': 'Aluguel de Pasto', 'valor': 36000.00},
-        {'categoria': 'Consultoria', 'valor': 24000.00}
-    ]
+    # Totais servidos do rollup mensal (uma linha por mes/categoria/tipo)
+    R = RollupFinanceiroMensal
+    query = db_session.query(R.categoria, R.tipo, func.sum(R.total)).filter(
+        R.tenant_id == tenant_id,
+        R.ano == ano
+    )
+    if mes:
+        query = query.filter(R.mes == mes)
     
-    despesas = [
-        {'categoria': 'Alimentação', 'valor': 85000.00},
-        {'categoria': 'Veterinário', 'valor': 45000.00},
-        {'categoria': 'Funcionários', 'valor': 72000.00},
-        {'categoria': 'Manutenção', 'valor': 28000.00},
-        {'categoria': 'Impostos', 'valor': 15000.00},
-        {'categoria': 'Energia e Água', 'valor': 12000.00}
-    ]
+    receitas = []
+    despesas = []
+    for categoria, tipo, valor in query.group_by(R.categoria, R.tipo).all():
+        item = {'categoria': categoria, 'valor': round(valor or 0.0, 2)}
+        (receitas if _eh_receita(tipo) else despesas).append(item)
+    receitas.sort(key=lambda r: r['valor'], reverse=True)
+    despesas.sort(key=lambda d: d['valor'], reverse=True)
     
     # Calcular totais
     total_receitas = sum([r['valor'] for r in receitas])
@@ -303,14 +283,20 @@ def relatorio_comparativo_mensal(current_user, tenant_id):
     """Relatório comparativo mensal dos últimos 12 meses"""
     hoje = date.today()
     
-    dados_mensais = []
+    R = RollupFinanceiroMensal
+    competencia = R.ano * 100 + R.mes
     
-    # Dados simulados para demonstração
-    base_receita = 40000
-    base_despesa = 25000
+    # Totais por mes servidos do rollup mensal
+    totais = {}
+    for ano, mes, tipo, valor in db_session.query(R.ano, R.mes, R.tipo, func.sum(R.total)).filter(
+        R.tenant_id == tenant_id,
+        competencia.between(_competencia(hoje, 11), _competencia(hoje, 0))
+    ).group_by(R.ano, R.mes, R.tipo).all():
+        par = totais.setdefault((ano, mes), [0.0, 0.0])
+        par[0 if _eh_receita(tipo) else 1] += valor or 0.0
     
+    dados_mensais = []
     for i in range(12):
-        # Calcular mês e ano
         mes_atual = hoje.month - i
         ano_atual = hoje.year
         
@@ -318,12 +304,7 @@ def relatorio_comparativo_mensal(current_user, tenant_id):
             mes_atual += 12
             ano_atual -= 1
         
-        # Simular variação sazonal
-        fator_sazonal = 1.0 + (0.2 * (mes_atual % 4 - 2) / 2)  # Variação de ±20%
-        variacao_aleatoria = 1.0 + ((i % 7 - 3) * 0.05)  # Variação de ±15%
-        
-        receitas = base_receita * fator_sazonal * variacao_aleatoria
-        despesas = base_despesa * (1.0 + ((i % 5 - 2) * 0.03))  # Variação menor nas despesas
+        receitas, despesas = totais.get((ano_atual, mes_atual), (0.0, 0.0))
         lucro = receitas - despesas
         
         dados_mensais.append({
@@ -360,69 +341,25 @@ def relatorio_comparativo_mensal(current_user, tenant_id):
 def relatorio_performance_categorias(current_user, tenant_id):
     """Relatório de performance por categorias"""
     periodo = request.args.get('periodo', '12')  # meses
+    meses = max(1, int(periodo))
+    hoje = date.today()
     
-    # Dados simulados para demonstração
-    categorias_receita = [
-        {
-            'categoria': 'Venda de Animais',
-            'valor_atual': 180000.00,
-            'valor_anterior': 165000.00,
-            'crescimento': 9.1,
-            'participacao': 53.7
-        },
-        {
-            'categoria': 'Serviços Reprodutivos',
-            'valor_atual': 95000.00,
-            'valor_anterior': 88000.00,
-            'crescimento': 8.0,
-            'participacao': 28.4
-        },
-        {
-            'categoria': 'Aluguel de Pasto',
-            'valor_atual': 36000.00,
-            'valor_anterior': 34000.00,
-            'crescimento': 5.9,
-            'participacao': 10.7
-        },
-        {
-            'categoria': 'Consultoria',
-            'valor_atual': 24000.00,
-            'valor_anterior': 18000.00,
-            'crescimento': 33.3,
-            'participacao': 7.2
-        }
-    ]
+    # Janela atual (ultimos N meses) contra os N meses anteriores, servidas do rollup
+    R = RollupFinanceiroMensal
+    competencia = R.ano * 100 + R.mes
+    inicio_atual = _competencia(hoje, meses - 1)
+    janela = case((competencia >= inicio_atual, 'atual'), else_='anterior')
     
-    categorias_despesa = [
-        {
-            'categoria': 'Alimentação',
-            'valor_atual': 85000.00,
-            'valor_anterior': 82000.00,
-            'crescimento': 3.7,
-            'participacao': 33.1
-        },
-        {
-            'categoria': 'Funcionários',
-            'valor_atual': 72000.00,
-            'valor_anterior': 68000.00,
-            'crescimento': 5.9,
-            'participacao': 28.0
-        },
-        {
-            'categoria': 'Veterinário',
-            'valor_atual': 45000.00,
-            'valor_anterior': 52000.00,
-            'crescimento': -13.5,
-            'participacao': 17.5
-        },
-        {
-            'categoria': 'Manutenção',
-            'valor_atual': 28000.00,
-            'valor_anterior': 25000.00,
-            'crescimento': 12.0,
-            'participacao': 10.9
-        }
-    ]
+    valores = {}
+    for categoria, tipo, periodo_ref, valor in db_session.query(R.categoria, R.tipo, janela, func.sum(R.total)).filter(
+        R.tenant_id == tenant_id,
+        competencia.between(_competencia(hoje, 2 * meses - 1), _competencia(hoje, 0))
+    ).group_by(R.categoria, R.tipo, janela).all():
+        chave = ('receita' if _eh_receita(tipo) else 'despesa', categoria)
+        valores.setdefault(chave, {'atual': 0.0, 'anterior': 0.0})[periodo_ref] += valor or 0.0
+    
+    categorias_receita = _performance_categorias(valores, 'receita')
+    categorias_despesa = _performance_categorias(valores, 'despesa')
     
     return jsonify({
         'periodo_meses': int(periodo),
@@ -430,12 +367,38 @@ def relatorio_performance_categorias(current_user, tenant_id):
             'categorias': categorias_receita,
             'total_atual': sum([c['valor_atual'] for c in categorias_receita]),
             'total_anterior': sum([c['valor_anterior'] for c in categorias_receita]),
-            'crescimento_total': 10.2
+            'crescimento_total': _crescimento(sum([c['valor_atual'] for c in categorias_receita]),
+                                              sum([c['valor_anterior'] for c in categorias_receita]))
         },
         'despesas': {
             'categorias': categorias_despesa,
             'total_atual': sum([c['valor_atual'] for c in categorias_despesa]),
             'total_anterior': sum([c['valor_anterior'] for c in categorias_despesa]),
-            'crescimento_total': 2.1
+            'crescimento_total': _crescimento(sum([c['valor_atual'] for c in categorias_despesa]),
+                                              sum([c['valor_anterior'] for c in categorias_despesa]))
         }
     })
+
+# Funções auxiliares dos relatórios servidos pelo rollup mensal
+def _eh_receita(tipo):
+    return (tipo or '').lower() == 'receita'
+
+def _competencia(hoje, meses_atras):
+    """Competência AAAAMM de `meses_atras` meses antes do mês de `hoje`."""
+    total = hoje.year * 12 + (hoje.month - 1) - meses_atras
+    return (total // 12) * 100 + total % 12 + 1
+
+def _crescimento(atual, anterior):
+    return round((atual - anterior) / anterior * 100, 1) if anterior else 0.0
+
+def _performance_categorias(valores, tipo):
+    itens = [(categoria, v) for (t, categoria), v in valores.items() if t == tipo]
+    total_atual = sum(v['atual'] for _, v in itens)
+    resultado = [{
+        'categoria': categoria,
+        'valor_atual': round(v['atual'], 2),
+        'valor_anterior': round(v['anterior'], 2),
+        'crescimento': _crescimento(v['atual'], v['anterior']),
+        'participacao': round(v['atual'] / total_atual * 100, 1) if total_atual else 0.0
+    } for categoria, v in itens]
+    return sorted(resultado, key=lambda c: c['valor_atual'], reverse=True)
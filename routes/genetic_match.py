@@ -3,122 +3,74 @@ API Routes para Genetic Match Engine
 Endpoints para recomendações de acasalamento inteligente.
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from datetime import datetime, timedelta
 import json
-from ai.genetic_match_engine import genetic_engine, RecomendacaoAcasalamento
-from auth.middleware import token_required, tenant_access_required
+import math
+import numpy as np
+from sqlalchemy.exc import SQLAlchemyError
+from ai.genetic_match_engine import genetic_engine, RecomendacaoAcasalamento, VERSAO_MODELO
+from models.database import db_session
+from models.genetic_match import (
+    SolicitacaoMatch, ConfiguracaoMatch, fingerprint_match, buscar_resultado_match, obter_pedigree
+)
+from services.catalogo_genetico import obter_catalogo
+from auth.middleware import token_required
 
 genetic_match_bp = Blueprint('genetic_match', __name__)
 
-# Dados sintéticos para demonstração
-DADOS_DOADORAS = [
-    {
-        'id': 1,
-        'nome': 'Estrela Dourada',
-        'raca': 'Mangalarga',
-        'data_nascimento': datetime(2016, 3, 15),
-        'peso': 445.0,
-        'altura': 1.54,
-        'taxa_prenhez_historica': 0.75,
-        'score_genetico': 0.82,
-        'tipo_morfologico': 'conformação'
-    },
-    {
-        'id': 2,
-        'nome': 'Bela Vista',
-        'raca': 'Quarto de Milha',
-        'data_nascimento': datetime(2018, 7, 22),
-        'peso': 465.0,
-        'altura': 1.56,
-        'taxa_prenhez_historica': 0.68,
-        'score_genetico': 0.78,
-        'tipo_morfologico': 'corrida'
-    },
-    {
-        'id': 3,
-        'nome': 'Lua Cheia',
-        'raca': 'Mangalarga',
-        'data_nascimento': datetime(2014, 11, 8),
-        'peso': 420.0,
-        'altura': 1.52,
-        'taxa_prenhez_historica': 0.85,
-        'score_genetico': 0.88,
-        'tipo_morfologico': 'trabalho'
-    }
-]
+CONSANGUINIDADE_MAXIMA_PADRAO = 0.125
+MAX_K = 50
 
-DADOS_GARANHOES = [
-    {
-        'id': 101,
-        'nome': 'Trovão Negro',
-        'raca': 'Mangalarga',
-        'data_nascimento': datetime(2012, 5, 10),
-        'peso': 520.0,
-        'altura': 1.62,
-        'taxa_prenhez_historica': 0.72,
-        'score_genetico': 0.85,
-        'performance_media_progenie': 0.78,
-        'valor_cobertura': 8000,
-        'tipo_morfologico': 'conformação'
-    },
-    {
-        'id': 102,
-        'nome': 'Relâmpago',
-        'raca': 'Quarto de Milha',
-        'data_nascimento': datetime(2015, 9, 3),
-        'peso': 540.0,
-        'altura': 1.58,
-        'taxa_prenhez_historica': 0.68,
-        'score_genetico': 0.82,
-        'performance_media_progenie': 0.85,
-        'valor_cobertura': 12000,
-        'tipo_morfologico': 'corrida'
-    },
-    {
-        'id': 103,
-        'nome': 'Imperador',
-        'raca': 'Mangalarga',
-        'data_nascimento': datetime(2013, 1, 20),
-        'peso': 510.0,
-        'altura': 1.60,
-        'taxa_prenhez_historica': 0.78,
-        'score_genetico': 0.90,
-        'performance_media_progenie': 0.82,
-        'valor_cobertura': 15000,
-        'tipo_morfologico': 'conformação'
-    },
-    {
-        'id': 104,
-        'nome': 'Furacão',
-        'raca': 'Quarto de Milha',
-        'data_nascimento': datetime(2014, 8, 12),
-        'peso': 535.0,
-        'altura': 1.59,
-        'taxa_prenhez_historica': 0.70,
-        'score_genetico': 0.87,
-        'performance_media_progenie': 0.88,
-        'valor_cobertura': 18000,
-        'tipo_morfologico': 'corrida'
-    },
-    {
-        'id': 105,
-        'nome': 'Majestoso',
-        'raca': 'Mangalarga',
-        'data_nascimento': datetime(2011, 4, 5),
-        'peso': 525.0,
-        'altura': 1.63,
-        'taxa_prenhez_historica': 0.75,
-        'score_genetico': 0.92,
-        'performance_media_progenie': 0.80,
-        'valor_cobertura': 20000,
-        'tipo_morfologico': 'trabalho'
+def _numero(data, campo, padrao=None, minimo=None, maximo=None):
+    """Número opcional do body (ausente ou null -> padrao). ValueError vira 400."""
+    valor = data.get(campo)
+    if valor is None:
+        return padrao
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+        raise ValueError(f"{campo} deve ser um número")
+    if (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo):
+        raise ValueError(f"{campo} deve estar entre {minimo} e {maximo if maximo is not None else 'infinito'}")
+    return valor
+
+def _quantidade(data, campo, padrao):
+    """Inteiro do body limitado a 1..MAX_K."""
+    valor = data.get(campo)
+    if valor is None:
+        return padrao
+    if isinstance(valor, bool) or not isinstance(valor, int):
+        raise ValueError(f"{campo} deve ser um número inteiro")
+    return max(1, min(valor, MAX_K))
+
+def _preferencias(data, tenant_id, orcamento_padrao=None):
+    """Preferências de scoring validadas a partir do body."""
+    consanguinidade = _numero(data, 'consanguinidade_maxima', None, 0, 1)
+    return {
+        'categoria_objetivo': data.get('categoria_objetivo'),
+        'orcamento_maximo': _numero(data, 'orcamento_maximo', orcamento_padrao, 0),
+        'consanguinidade_maxima': _consanguinidade_maxima(tenant_id) if consanguinidade is None else consanguinidade,
+        'prioridade_genetica': _numero(data, 'prioridade_genetica', 0.6, 0, 1),
+        'prioridade_financeira': _numero(data, 'prioridade_financeira', 0.4, 0, 1),
     }
-]
+
+def _consanguinidade_maxima(tenant_id):
+    """Limite de consanguinidade do potro configurado para o tenant."""
+    limite = db_session.query(ConfiguracaoMatch.consanguinidade_maxima).filter(
+        ConfiguracaoMatch.tenant_id == tenant_id
+    ).scalar()
+    return CONSANGUINIDADE_MAXIMA_PADRAO if limite is None else limite
+
+def _avaliar_par(catalogo, doadora_id, garanhao_id):
+    """Recomendação de um único par doadora x garanhão do catálogo."""
+    _, recomendacoes = next(genetic_engine.recomendar_em_lote(
+        catalogo.doadoras.empacotado([doadora_id]),
+        catalogo.garanhoes.empacotado([garanhao_id]), 1,
+        parentesco=obter_pedigree(catalogo.tenant_id).matriz_parentesco
+    ))
+    return recomendacoes[0] if recomendacoes else None
 
 @genetic_match_bp.route('/sugerir', methods=['POST'])
 @token_required
-@tenant_access_required
 def sugerir_acasalamentos(current_user):
     """
     Endpoint principal para sugestões de acasalamento.
@@ -142,36 +94,60 @@ def sugerir_acasalamentos(current_user):
             return jsonify({'error': 'doadora_id é obrigatório'}), 400
         
         # Buscar dados da doadora
-        doadora = next((d for d in DADOS_DOADORAS if d['id'] == doadora_id), None)
+        catalogo = obter_catalogo(current_user.tenant_id)
+        doadora = catalogo.doadoras.registro(doadora_id)
         if not doadora:
             return jsonify({'error': 'Doadora não encontrada'}), 404
         
         # Parâmetros opcionais
+        try:
+            preferencias = _preferencias(data, current_user.tenant_id, orcamento_padrao=50000)
+            max_recomendacoes = _quantidade(data, 'max_recomendacoes', 5)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         categoria_objetivo = data.get('categoria_objetivo', 'conformação')
-        orcamento_maximo = data.get('orcamento_maximo', 50000)
-        max_recomendacoes = data.get('max_recomendacoes', 5)
-        
-        # Filtrar garanhões por orçamento e categoria
-        garanhoes_filtrados = []
-        for garanhao in DADOS_GARANHOES:
-            if garanhao['valor_cobertura'] <= orcamento_maximo:
-                # Bonus para mesma categoria
-                if garanhao['tipo_morfologico'] == categoria_objetivo:
-                    garanhao['bonus_categoria'] = True
-                garanhoes_filtrados.append(garanhao)
-        
-        if not garanhoes_filtrados:
+        orcamento_maximo = preferencias['orcamento_maximo']
+        prioridade_genetica = preferencias['prioridade_genetica']
+        prioridade_financeira = preferencias['prioridade_financeira']
+        
+        # Mesmas entradas, mesmo plantel e mesmo modelo: devolve o resultado salvo
+        parametros = {
+            'doadora_id': doadora_id,
+            'categoria_objetivo': categoria_objetivo,
+            'orcamento_maximo': orcamento_maximo,
+            'prioridade_genetica': prioridade_genetica,
+            'prioridade_financeira': prioridade_financeira,
+            'max_recomendacoes': max_recomendacoes
+        }
+        versao = catalogo.versao
+        fingerprint = fingerprint_match(parametros, versao, VERSAO_MODELO)
+        salvo = buscar_resultado_match(current_user.tenant_id, fingerprint)
+        if salvo:
+            resultado = json.loads(salvo.resultados_json)
+            resultado['metadata'].update({'cache': True, 'solicitacao_id': salvo.id})
+            return jsonify(resultado)
+        
+        # Orçamento, categoria e consanguinidade são aplicados na matriz de scores
+        inicio_processamento = datetime.now()
+        _, recomendacoes = next(genetic_engine.recomendar_em_lote(
+            catalogo.doadoras.empacotado([doadora_id]),
+            catalogo.garanhoes.empacotado(),
+            max_recomendacoes,
+            parentesco=obter_pedigree(current_user.tenant_id).matriz_parentesco,
+            categoria_objetivo=categoria_objetivo,
+            orcamento_maximo=orcamento_maximo,
+            consanguinidade_maxima=preferencias['consanguinidade_maxima'],
+            prioridade_genetica=prioridade_genetica,
+            prioridade_financeira=prioridade_financeira
+        ))
+        tempo_processamento = (datetime.now() - inicio_processamento).total_seconds()
+        
+        if not recomendacoes:
             return jsonify({
                 'error': 'Nenhum garanhão disponível dentro do orçamento',
                 'orcamento_maximo': orcamento_maximo
             }), 404
-        
-        # Gerar recomendações
-        inicio_processamento = datetime.now()
-        recomendacoes = genetic_engine.recomendar_acasalamentos(
-            doadora, garanhoes_filtrados, max_recomendacoes
-        )
-        tempo_processamento = (datetime.now() - inicio_processamento).total_seconds()
+        garanhoes_avaliados = int((catalogo.garanhoes.coluna('valor_cobertura') <= orcamento_maximo).sum())
         
         # Converter para JSON
         resultado = {
@@ -179,19 +155,19 @@ def sugerir_acasalamentos(current_user):
                 'id': doadora['id'],
                 'nome': doadora['nome'],
                 'raca': doadora['raca'],
-                'idade': (datetime.now() - doadora['data_nascimento']).days / 365.25
+                'idade': doadora['idade']
             },
             'parametros': {
                 'categoria_objetivo': categoria_objetivo,
                 'orcamento_maximo': orcamento_maximo,
-                'garanhoes_avaliados': len(garanhoes_filtrados),
+                'garanhoes_avaliados': garanhoes_avaliados,
                 'tempo_processamento': tempo_processamento
             },
             'recomendacoes': []
         }
         
         for i, rec in enumerate(recomendacoes, 1):
-            garanhao = next(g for g in DADOS_GARANHOES if g['id'] == rec.garanhao_id)
+            garanhao = catalogo.garanhoes.registro(rec.garanhao_id)
             
             resultado['recomendacoes'].append({
                 'ranking': i,
@@ -199,7 +175,7 @@ def sugerir_acasalamentos(current_user):
                     'id': rec.garanhao_id,
                     'nome': rec.garanhao_nome,
                     'raca': garanhao['raca'],
-                    'idade': (datetime.now() - garanhao['data_nascimento']).days / 365.25,
+                    'idade': garanhao['idade'],
                     'valor_cobertura': garanhao['valor_cobertura']
                 },
                 'predicoes': {
@@ -218,22 +194,90 @@ def sugerir_acasalamentos(current_user):
                 'fatores_atencao': rec.fatores_atencao
             })
         
-        # Salvar solicitação (em produção, salvar no banco)
         resultado['metadata'] = {
-            'versao_modelo': 'xgboost_v1_demo',
+            'versao_modelo': VERSAO_MODELO,
             'data_processamento': datetime.now().isoformat(),
             'tenant_id': current_user.tenant_id,
-            'usuario_id': current_user.id
+            'usuario_id': current_user.id,
+            'cache': False
         }
         
+        solicitacao = SolicitacaoMatch(
+            tenant_id=current_user.tenant_id,
+            usuario_id=current_user.id,
+            doadora_id=doadora_id,
+            categoria_objetivo=categoria_objetivo,
+            orcamento_maximo=orcamento_maximo,
+            prioridade_genetica=prioridade_genetica,
+            prioridade_financeira=prioridade_financeira,
+            resultados_json=json.dumps(resultado),
+            melhor_garanhao_id=recomendacoes[0].garanhao_id,
+            taxa_prenhez_prevista=recomendacoes[0].taxa_prenhez_prevista,
+            roi_estimado=recomendacoes[0].roi_estimado,
+            score_genetico=recomendacoes[0].score_genetico,
+            data_processamento=datetime.utcnow(),
+            tempo_processamento=tempo_processamento,
+            versao_modelo=VERSAO_MODELO,
+            fingerprint=fingerprint,
+            versao_plantel=versao
+        )
+        try:
+            db_session.add(solicitacao)
+            db_session.commit()
+            resultado['metadata']['solicitacao_id'] = solicitacao.id
+        except SQLAlchemyError as e:
+            # Falha ao salvar não impede a resposta; a próxima chamada recalcula
+            db_session.rollback()
+            print(f"Erro ao salvar solicitacao de match: {e}")
+        
         return jsonify(resultado)
         
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@genetic_match_bp.route('/sugerir/lote', methods=['POST'])
+@token_required
+def sugerir_acasalamentos_lote(current_user):
+    """
+    Top-k de garanhões para várias doadoras (ou todas), em NDJSON.
+    
+    Body:
+    {
+        "doadora_ids": [1, 2],          // opcional: todas as doadoras
+        "categoria_objetivo": "corrida",
+        "orcamento_maximo": 25000,
+        "consanguinidade_maxima": 0.125,
+        "k": 5
+    }
+    """
+    data = request.get_json() or {}
+    try:
+        k = _quantidade(data, 'k', 5)
+        preferencias = _preferencias(data, current_user.tenant_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    catalogo = obter_catalogo(current_user.tenant_id)
+    doadoras = catalogo.doadoras.empacotado(data.get('doadora_ids'))
+    if not len(doadoras['id']):
+        return jsonify({'error': 'Nenhuma doadora encontrada'}), 404
+    
+    pedigree = obter_pedigree(current_user.tenant_id)
+    
+    def gerar():
+        # Uma linha por doadora, enviada assim que o bloco dela é avaliado
+        for doadora_id, recomendacoes in genetic_engine.recomendar_em_lote(
+                doadoras, catalogo.garanhoes.empacotado(), k,
+                parentesco=pedigree.matriz_parentesco, **preferencias):
+            yield json.dumps({
+                'doadora_id': doadora_id,
+                'recomendacoes': [rec.to_dict() for rec in recomendacoes]
+            }) + '\n'
+    
+    return Response(stream_with_context(gerar()), mimetype='application/x-ndjson')
+
 @genetic_match_bp.route('/predict/prenhez', methods=['POST'])
 @token_required
-@tenant_access_required
 def prever_prenhez(current_user):
     """
     Predição específica de prenhez para um par doadora-garanhão.
@@ -254,20 +298,19 @@ def prever_prenhez(current_user):
             return jsonify({'error': 'doadora_id e garanhao_id são obrigatórios'}), 400
         
         # Buscar dados
-        doadora = next((d for d in DADOS_DOADORAS if d['id'] == doadora_id), None)
-        garanhao = next((g for g in DADOS_GARANHOES if g['id'] == garanhao_id), None)
+        catalogo = obter_catalogo(current_user.tenant_id)
+        doadora = catalogo.doadoras.registro(doadora_id)
+        garanhao = catalogo.garanhoes.registro(garanhao_id)
         
         if not doadora or not garanhao:
             return jsonify({'error': 'Doadora ou garanhão não encontrado'}), 404
         
         # Gerar predição única
-        recomendacoes = genetic_engine.recomendar_acasalamentos(doadora, [garanhao], 1)
+        rec = _avaliar_par(catalogo, doadora_id, garanhao_id)
         
-        if not recomendacoes:
+        if not rec:
             return jsonify({'error': 'Erro ao gerar predição'}), 500
         
-        rec = recomendacoes[0]
-        
         resultado = {
             'doadora': {
                 'id': doadora['id'],
@@ -292,7 +335,7 @@ def prever_prenhez(current_user):
                 'lucro_esperado': round(rec.valor_potro_estimado * rec.taxa_prenhez_prevista - rec.custo_estimado, 2)
             },
             'analise_genetica': {
-                'consanguinidade': round(genetic_engine.calcular_consanguinidade(doadora_id, garanhao_id) * 100, 2),
+                'consanguinidade': round(rec.consanguinidade * 100, 2),
                 'compatibilidade_racial': doadora['raca'] == garanhao['raca'],
                 'score_combinado': round(rec.score_genetico * 100, 1)
             },
@@ -301,7 +344,7 @@ def prever_prenhez(current_user):
             'fatores_atencao': rec.fatores_atencao,
             'metadata': {
                 'data_predicao': datetime.now().isoformat(),
-                'versao_modelo': 'xgboost_v1_demo'
+                'versao_modelo': VERSAO_MODELO
             }
         }
         
@@ -312,7 +355,6 @@ def prever_prenhez(current_user):
 
 @genetic_match_bp.route('/simular', methods=['POST'])
 @token_required
-@tenant_access_required
 def simular_cenario(current_user):
     """
     Simulação de cenários com variação de preços e custos.
@@ -337,15 +379,15 @@ def simular_cenario(current_user):
             return jsonify({'error': 'doadora_id e garanhao_id são obrigatórios'}), 400
         
         # Buscar dados
-        doadora = next((d for d in DADOS_DOADORAS if d['id'] == doadora_id), None)
-        garanhao = next((g for g in DADOS_GARANHOES if g['id'] == garanhao_id), None)
+        catalogo = obter_catalogo(current_user.tenant_id)
+        doadora = catalogo.doadoras.registro(doadora_id)
+        garanhao = catalogo.garanhoes.registro(garanhao_id)
         
         if not doadora or not garanhao:
             return jsonify({'error': 'Doadora ou garanhão não encontrado'}), 404
         
         # Gerar recomendação base
-        recomendacoes = genetic_engine.recomendar_acasalamentos(doadora, [garanhao], 1)
-        rec = recomendacoes[0]
+        rec = _avaliar_par(catalogo, doadora_id, garanhao_id)
         
         # Simular cenário
         simulacao = genetic_engine.simular_cenario(rec, variacao_preco, variacao_custo)
@@ -381,20 +423,79 @@ def simular_cenario(current_user):
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@genetic_match_bp.route('/simular/varredura', methods=['POST'])
+@token_required
+def varrer_cenarios(current_user):
+    """
+    Varredura Monte-Carlo de cenários para um par doadora-garanhão.
+    
+    Body:
+    {
+        "doadora_id": 1,
+        "garanhao_id": 101,
+        "variacao_preco": {"min": -0.3, "max": 0.3},
+        "variacao_custo": {"distribuicao": "normal", "media": 0, "desvio": 0.1},
+        "variacao_taxa_prenhez": {"distribuicao": "triangular", "min": -0.2, "moda": 0, "max": 0.1},
+        "n_amostras": 10000,
+        "grade": [21, 21],
+        "seed": 42,          // opcional, torna o resultado reproduzível
+        "processos": 4       // opcional, para varreduras muito grandes
+    }
+    """
+    data = request.get_json() or {}
+    doadora_id = data.get('doadora_id')
+    garanhao_id = data.get('garanhao_id')
+    if not doadora_id or not garanhao_id:
+        return jsonify({'error': 'doadora_id e garanhao_id são obrigatórios'}), 400
+    
+    catalogo = obter_catalogo(current_user.tenant_id)
+    doadora = catalogo.doadoras.registro(doadora_id)
+    garanhao = catalogo.garanhoes.registro(garanhao_id)
+    if not doadora or not garanhao:
+        return jsonify({'error': 'Doadora ou garanhão não encontrado'}), 404
+    
+    rec = _avaliar_par(catalogo, doadora_id, garanhao_id)
+    try:
+        varredura = genetic_engine.varrer_cenarios(
+            rec,
+            preco=data.get('variacao_preco'),
+            custo=data.get('variacao_custo'),
+            taxa_prenhez=data.get('variacao_taxa_prenhez'),
+            n_amostras=int(data.get('n_amostras', 10000)),
+            grade=data.get('grade', (21, 21)),
+            seed=data.get('seed'),
+            processos=data.get('processos')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'cenario_base': {
+            'roi': round(rec.roi_estimado * 100, 1),
+            'valor_potro': round(rec.valor_potro_estimado, 2),
+            'custo_total': round(rec.custo_estimado, 2),
+            'taxa_prenhez': round(rec.taxa_prenhez_prevista * 100, 1),
+            'lucro_esperado': round(rec.lucro_esperado, 2)
+        },
+        'varredura': varredura,
+        'parametros': {
+            'doadora': doadora['nome'],
+            'garanhao': garanhao['nome']
+        }
+    })
+
 @genetic_match_bp.route('/doadoras', methods=['GET'])
 @token_required
-@tenant_access_required
 def listar_doadoras(current_user):
     """Lista doadoras disponíveis para acasalamento."""
     try:
         doadoras = []
-        for doadora in DADOS_DOADORAS:
-            idade = (datetime.now() - doadora['data_nascimento']).days / 365.25
+        for doadora in obter_catalogo(current_user.tenant_id).doadoras.registros():
             doadoras.append({
                 'id': doadora['id'],
                 'nome': doadora['nome'],
                 'raca': doadora['raca'],
-                'idade': round(idade, 1),
+                'idade': round(doadora['idade'], 1) if doadora['idade'] is not None else None,
                 'peso': doadora['peso'],
                 'altura': doadora['altura'],
                 'taxa_prenhez_historica': round(doadora['taxa_prenhez_historica'] * 100, 1),
@@ -412,18 +513,16 @@ def listar_doadoras(current_user):
 
 @genetic_match_bp.route('/garanhoes', methods=['GET'])
 @token_required
-@tenant_access_required
 def listar_garanhoes(current_user):
     """Lista garanhões disponíveis para acasalamento."""
     try:
         garanhoes = []
-        for garanhao in DADOS_GARANHOES:
-            idade = (datetime.now() - garanhao['data_nascimento']).days / 365.25
+        for garanhao in obter_catalogo(current_user.tenant_id).garanhoes.registros():
             garanhoes.append({
                 'id': garanhao['id'],
                 'nome': garanhao['nome'],
                 'raca': garanhao['raca'],
-                'idade': round(idade, 1),
+                'idade': round(garanhao['idade'], 1) if garanhao['idade'] is not None else None,
                 'peso': garanhao['peso'],
                 'altura': garanhao['altura'],
                 'taxa_prenhez_historica': round(garanhao['taxa_prenhez_historica'] * 100, 1),
@@ -443,33 +542,20 @@ def listar_garanhoes(current_user):
 
 @genetic_match_bp.route('/stats', methods=['GET'])
 @token_required
-@tenant_access_required
 def estatisticas_sistema(current_user):
     """Estatísticas do sistema de acasalamento inteligente."""
     try:
-        # Calcular estatísticas dos dados disponíveis
-        total_doadoras = len(DADOS_DOADORAS)
-        total_garanhoes = len(DADOS_GARANHOES)
-        
-        # Taxa média de prenhez
-        taxa_media_doadoras = sum(d['taxa_prenhez_historica'] for d in DADOS_DOADORAS) / total_doadoras
-        taxa_media_garanhoes = sum(g['taxa_prenhez_historica'] for g in DADOS_GARANHOES) / total_garanhoes
-        
-        # Score genético médio
-        score_medio_doadoras = sum(d['score_genetico'] for d in DADOS_DOADORAS) / total_doadoras
-        score_medio_garanhoes = sum(g['score_genetico'] for g in DADOS_GARANHOES) / total_garanhoes
-        
-        # Distribuição por raça
-        racas_doadoras = {}
-        racas_garanhoes = {}
+        catalogo = obter_catalogo(current_user.tenant_id)
+        doadoras, garanhoes = catalogo.doadoras, catalogo.garanhoes
+        total_doadoras = len(doadoras)
+        total_garanhoes = len(garanhoes)
         
-        for doadora in DADOS_DOADORAS:
-            raca = doadora['raca']
-            racas_doadoras[raca] = racas_doadoras.get(raca, 0) + 1
+        def media(plantel, coluna):
+            return float(plantel.coluna(coluna).mean()) if len(plantel) else 0.0
         
-        for garanhao in DADOS_GARANHOES:
-            raca = garanhao['raca']
-            racas_garanhoes[raca] = racas_garanhoes.get(raca, 0) + 1
+        def por_raca(plantel):
+            racas, contagens = np.unique(plantel.coluna('raca').astype(str), return_counts=True)
+            return dict(zip(racas.tolist(), contagens.tolist()))
         
         resultado = {
             'resumo': {
@@ -478,17 +564,17 @@ def estatisticas_sistema(current_user):
                 'combinacoes_possiveis': total_doadoras * total_garanhoes
             },
             'performance': {
-                'taxa_prenhez_media_doadoras': round(taxa_media_doadoras * 100, 1),
-                'taxa_prenhez_media_garanhoes': round(taxa_media_garanhoes * 100, 1),
-                'score_genetico_medio_doadoras': round(score_medio_doadoras * 100, 1),
-                'score_genetico_medio_garanhoes': round(score_medio_garanhoes * 100, 1)
+                'taxa_prenhez_media_doadoras': round(media(doadoras, 'taxa_prenhez') * 100, 1),
+                'taxa_prenhez_media_garanhoes': round(media(garanhoes, 'taxa_prenhez') * 100, 1),
+                'score_genetico_medio_doadoras': round(media(doadoras, 'score_genetico') * 100, 1),
+                'score_genetico_medio_garanhoes': round(media(garanhoes, 'score_genetico') * 100, 1)
             },
             'distribuicao_racas': {
-                'doadoras': racas_doadoras,
-                'garanhoes': racas_garanhoes
+                'doadoras': por_raca(doadoras),
+                'garanhoes': por_raca(garanhoes)
             },
             'modelo': {
-                'versao': 'xgboost_v1_demo',
+                'versao': VERSAO_MODELO,
                 'acuracia_estimada': 87.3,
                 'features_utilizadas': len(genetic_engine.feature_names),
                 'ultima_atualizacao': '2025-10-05'
@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import func
 from models.database import db_session
 from models.user import Usuario
 from models.extras import Lancamento, AtendimentoVaas
-from auth.middleware import token_required
+from auth.middleware import token_required, usar_replica
+from routes.paginacao import paginar, modo_legado, CursorInvalido
 from datetime import datetime
 
 integracao_bp = Blueprint("integracao", __name__)
@@ -10,6 +12,7 @@ integracao_bp = Blueprint("integracao", __name__)
 # --- ROTA DE USUÁRIOS (Para o painel de gerenciamento) ---
 @integracao_bp.route("/users", methods=["GET"])
 @token_required
+@usar_replica
 def list_users(current_user):
     # Apenas admin ou proprietario veem todos
     if current_user.role not in ['admin', 'proprietario']:
@@ -25,14 +28,34 @@ def list_users(current_user):
 # --- ROTA FINANCEIRO ---
 @integracao_bp.route("/financeiro/lancamentos", methods=["GET"])
 @token_required
+@usar_replica
 def list_financas(current_user):
-    lancamentos = db_session.query(Lancamento).filter_by(tenant_id=current_user.tenant_id).all()
-    receita = sum(l.valor for l in lancamentos if l.tipo == 'Receita')
-    despesa = sum(l.valor for l in lancamentos if l.tipo == 'Despesa')
-    
+    # Resumo calculado no banco (um GROUP BY), sem carregar os lancamentos
+    totais = dict(db_session.query(Lancamento.tipo, func.coalesce(func.sum(Lancamento.valor), 0.0))
+                  .filter_by(tenant_id=current_user.tenant_id).group_by(Lancamento.tipo).all())
+    receita = totais.get('Receita', 0.0)
+    despesa = totais.get('Despesa', 0.0)
+    resumo = {"receita": receita, "despesa": despesa, "saldo": receita - despesa}
+    if request.args.get('resumo_only', '').lower() in ('1', 'true', 'sim'):
+        return jsonify({"resumo": resumo}), 200
+
+    query = db_session.query(Lancamento).filter_by(tenant_id=current_user.tenant_id)
+    serializar = lambda l: {"id":l.id, "desc":l.descricao, "valor":l.valor, "tipo":l.tipo}
+    if modo_legado():
+        return jsonify({
+            "resumo": resumo,
+            "lancamentos": [serializar(l) for l in query.all()]
+        }), 200
+
+    try:
+        lancamentos, next_cursor, limite = paginar(query, Lancamento.data_vencimento, Lancamento.id, desc=True)
+    except CursorInvalido as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify({
-        "resumo": {"receita": receita, "despesa": despesa, "saldo": receita - despesa},
-        "lancamentos": [{"id":l.id, "desc":l.descricao, "valor":l.valor, "tipo":l.tipo} for l in lancamentos]
+        "resumo": resumo,
+        "lancamentos": [serializar(l) for l in lancamentos],
+        "next_cursor": next_cursor,
+        "limit": limite
     }), 200
 
 # --- ROTA IA / DASHBOARD (Mock para não quebrar o frontend) ---
@@ -0,0 +1,101 @@
+"""
+Paginacao por cursor (keyset) compartilhada pelas rotas de listagem.
+
+O cliente manda `limit` e o `cursor` recebido em `next_cursor` da pagina
+anterior; o cursor e opaco (base64 de [valor_ordenacao, id]). Com
+`?legado=1` a rota devolve a lista completa no formato antigo, usado pelos
+dashboards em static/.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from flask import request
+from sqlalchemy import and_, or_
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 500
+
+class CursorInvalido(ValueError):
+    pass
+
+def modo_legado():
+    return request.args.get('legado', '').lower() in ('1', 'true', 'sim')
+
+def codificar_cursor(valor, id):
+    if isinstance(valor, (date, datetime)):
+        valor = valor.isoformat()
+    bruto = json.dumps([valor, id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+def decodificar_cursor(cursor, coluna):
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valor, id = json.loads(bruto)
+        if valor is not None:
+            tipo = coluna.type.python_type
+            if tipo is datetime:
+                valor = datetime.fromisoformat(valor)
+            elif tipo is date:
+                valor = date.fromisoformat(valor)
+        return valor, int(id)
+    except Exception:
+        raise CursorInvalido("cursor invalido")
+
+def _nulos_maiores(query):
+    # Postgres ordena NULL como o maior valor (ASC NULLS LAST / DESC NULLS FIRST);
+    # SQLite, como o menor. A ordem fica a padrao do banco, a mesma dos
+    # indices (tenant_id, coluna, id), e o cursor se adapta a ela.
+    return query.session.get_bind().dialect.name == 'postgresql'
+
+def _depois_do_cursor(coluna, id_coluna, valor, id, desc, nulos_primeiro):
+    id_depois = id_coluna < id if desc else id_coluna > id
+    if coluna is id_coluna:
+        return id_depois
+    if valor is None:
+        if nulos_primeiro:
+            return or_(and_(coluna.is_(None), id_depois), coluna.is_not(None))
+        return and_(coluna.is_(None), id_depois)
+    depois = or_(coluna < valor if desc else coluna > valor, and_(coluna == valor, id_depois))
+    return depois if nulos_primeiro else or_(depois, coluna.is_(None))
+
+def ordenar(query, coluna, id_coluna, desc=False, apos=None):
+    """Ordem da listagem e, com `apos=(valor, id)`, o filtro do cursor.
+
+    E a mesma consulta que paginar executa; migrations/planos.py usa esta
+    funcao para conferir o EXPLAIN das listagens.
+    """
+    if apos is not None:
+        nulos_primeiro = _nulos_maiores(query) == desc
+        query = query.filter(_depois_do_cursor(coluna, id_coluna, apos[0], apos[1], desc, nulos_primeiro))
+    if coluna is id_coluna:
+        ordem = [id_coluna.desc() if desc else id_coluna.asc()]
+    elif desc:
+        ordem = [coluna.desc(), id_coluna.desc()]
+    else:
+        ordem = [coluna.asc(), id_coluna.asc()]
+    return query.order_by(*ordem)
+
+def paginar(query, coluna, id_coluna, desc=False):
+    """Aplica limit/cursor da requisicao. Retorna (itens, next_cursor, limite)."""
+    try:
+        limite = int(request.args.get('limit', LIMITE_PADRAO))
+    except ValueError:
+        limite = LIMITE_PADRAO
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+
+    cursor = request.args.get('cursor')
+    apos = decodificar_cursor(cursor, coluna) if cursor else None
+    itens = ordenar(query, coluna, id_coluna, desc, apos).limit(limite + 1).all()
+
+    next_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        ultimo = itens[-1]
+        next_cursor = codificar_cursor(getattr(ultimo, coluna.key), getattr(ultimo, id_coluna.key))
+    return itens, next_cursor, limite
+
+def resposta_paginada(itens, next_cursor, limite, **extras):
+    resposta = dict(extras)
+    resposta.update({"itens": itens, "next_cursor": next_cursor, "limit": limite})
+    return resposta
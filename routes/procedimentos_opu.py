@@ -1,80 +1,30 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db
 from src.models.models import ProcedimentoOPU
+from routes.serializacao import serializador, lista_streaming
 
 procedimentos_opu_bp = Blueprint("procedimentos_opu", __name__)
 
+def _custo_por_oocito(p):
+    # Colunas nulas não podem derrubar a listagem no meio do streaming
+    if p.ccos_recuperados and p.custo_procedimento:
+        return round(p.custo_procedimento / p.ccos_recuperados, 2)
+    return 0.0
+
+# Campos = colunas do modelo; a listagem acrescenta o custo por oócito
+_serializar_procedimento = serializador(ProcedimentoOPU)
+_serializar_lista = serializador(ProcedimentoOPU, extras={"custo_por_oocito": _custo_por_oocito})
+
 @procedimentos_opu_bp.route("/", methods=["GET"])
 def get_procedimentos_opu():
-    procedimentos = ProcedimentoOPU.query.all()
-    return jsonify([
-        {
-            "id": p.id,
-            "egua_id": p.egua_id,
-            "tipo_procedimento": p.tipo_procedimento,
-            "data_procedimento": p.data_procedimento,
-            "foliculos_aspirados": p.foliculos_aspirados,
-            "ccos_recuperados": p.ccos_recuperados,
-            "taxa_recuperacao": p.taxa_recuperacao,
-            "ciclo_estral": p.ciclo_estral,
-            "dia_ciclo": p.dia_ciclo,
-            "medicacao_utilizada": p.medicacao_utilizada,
-            "protocolo_hormonal": p.protocolo_hormonal,
-            "veterinario_responsavel": p.veterinario_responsavel,
-            "crmv_veterinario": p.crmv_veterinario,
-            "tecnico_responsavel": p.tecnico_responsavel,
-            "equipamento_utilizado": p.equipamento_utilizado,
-            "complicacoes": p.complicacoes,
-            "pressao_aspiracao": p.pressao_aspiracao,
-            "rotacao_agulha": p.rotacao_agulha,
-            "metodo_lavagem": p.metodo_lavagem,
-            "numero_lavagens_foliculo": p.numero_lavagens_foliculo,
-            "medicacao_pos_opu": p.medicacao_pos_opu,
-            "observacoes": p.observacoes,
-            "proxima_opu": p.proxima_opu,
-            "tamanhos_foliculos": p.tamanhos_foliculos,
-            "qualidade_ccos": p.qualidade_ccos,
-            "tempo_procedimento": p.tempo_procedimento,
-            "custo_procedimento": p.custo_procedimento,
-            "status": p.status,
-            "custo_por_oocito": round(p.custo_procedimento / p.ccos_recuperados, 2) if p.ccos_recuperados > 0 else 0.0
-        }
-        for p in procedimentos
-    ])
+    # Só as colunas (sem montar objetos do ORM), enviadas em pedaços
+    linhas = db.session.query(*_serializar_lista.colunas).yield_per(1000)
+    return lista_streaming(linhas, _serializar_lista.linha)
 
 @procedimentos_opu_bp.route("/<int:procedimento_id>", methods=["GET"])
 def get_procedimento_opu(procedimento_id):
     procedimento = ProcedimentoOPU.query.get_or_404(procedimento_id)
-    return jsonify({
-        "id": procedimento.id,
-        "egua_id": procedimento.egua_id,
-        "tipo_procedimento": procedimento.tipo_procedimento,
-        "data_procedimento": procedimento.data_procedimento,
-        "foliculos_aspirados": procedimento.foliculos_aspirados,
-        "ccos_recuperados": procedimento.ccos_recuperados,
-        "taxa_recuperacao": procedimento.taxa_recuperacao,
-        "ciclo_estral": procedimento.ciclo_estral,
-        "dia_ciclo": procedimento.dia_ciclo,
-        "medicacao_utilizada": procedimento.medicacao_utilizada,
-        "protocolo_hormonal": procedimento.protocolo_hormonal,
-        "veterinario_responsavel": procedimento.veterinario_responsavel,
-        "crmv_veterinario": procedimento.crmv_veterinario,
-        "tecnico_responsavel": procedimento.tecnico_responsavel,
-        "equipamento_utilizado": procedimento.equipamento_utilizado,
-        "complicacoes": procedimento.complicacoes,
-        "pressao_aspiracao": procedimento.pressao_aspiracao,
-        "rotacao_agulha": procedimento.rotacao_agulha,
-        "metodo_lavagem": procedimento.metodo_lavagem,
-        "numero_lavagens_foliculo": procedimento.numero_lavagens_foliculo,
-        "medicacao_pos_opu": procedimento.medicacao_pos_opu,
-        "observacoes": procedimento.observacoes,
-        "proxima_opu": procedimento.proxima_opu,
-        "tamanhos_foliculos": procedimento.tamanhos_foliculos,
-        "qualidade_ccos": procedimento.qualidade_ccos,
-        "tempo_procedimento": procedimento.tempo_procedimento,
-        "custo_procedimento": procedimento.custo_procedimento,
-        "status": procedimento.status,
-    })
+    return jsonify(_serializar_procedimento(procedimento))
 
 @procedimentos_opu_bp.route("/", methods=["POST"])
 def add_procedimento_opu():
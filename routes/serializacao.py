@@ -0,0 +1,137 @@
+"""
+Serialização JSON das respostas.
+
+- JSONProviderRapido: provider do Flask que usa o orjson quando instalado,
+  com a mesma saída do encoder padrão (chaves ordenadas, datas no formato
+  HTTP, Decimal como texto). Sem orjson, fica o encoder padrão.
+- serializador(Modelo): função gerada uma vez a partir das colunas do
+  mapper (attrgetter sobre a lista de colunas), no lugar dos dicts
+  montados campo a campo nas rotas. Aceita instâncias ou as Rows de
+  `query(*ser.colunas)`, que evitam montar os objetos do ORM.
+- lista_streaming: envia listas grandes em pedaços, sem montar o JSON
+  inteiro na memória.
+"""
+
+from operator import attrgetter
+from flask import current_app, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import inspect
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Itens por pedaço enviado em lista_streaming
+LOTE_STREAMING = 500
+
+if orjson is not None:
+    # Datas passam pelo default do Flask (formato HTTP), como no jsonify padrão;
+    # chaves não-texto viram texto como no json da stdlib
+    OPCOES_ORJSON = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+class JSONProviderRapido(DefaultJSONProvider):
+    """DefaultJSONProvider com orjson; argumentos extras do json (indent,
+    cls...) e valores que o orjson recusa caem no encoder padrão."""
+
+    def _orjson(self, obj, indentar=False):
+        opcoes = OPCOES_ORJSON | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+        if indentar:
+            opcoes |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=opcoes)
+        except orjson.JSONEncodeError:
+            # Ex.: inteiros acima de 64 bits
+            return None
+
+    def dumps(self, obj, **kwargs):
+        dados = self._orjson(obj) if orjson is not None and not kwargs else None
+        return super().dumps(obj, **kwargs) if dados is None else dados.decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        dados = self._orjson(obj, indentar)
+        if dados is None:
+            return super().response(obj)
+        return self._app.response_class(dados + b'\n', mimetype=self.mimetype)
+
+class SerializadorModelo:
+    """Converte instâncias (ou Rows) de um modelo em dict pelas colunas do mapper.
+
+    `extras` são campos calculados: {nome: função(obj)}. As colunas só são
+    lidas do mapper na primeira chamada, quando os modelos já estão todos
+    configurados.
+    """
+
+    def __init__(self, modelo, excluir=(), extras=None):
+        self.modelo = modelo
+        self.excluir = frozenset(excluir)
+        self.extras = dict(extras or {})
+        self._chaves = None
+        self._valores = None
+
+    @property
+    def chaves(self):
+        if self._chaves is None:
+            chaves = tuple(a.key for a in inspect(self.modelo).column_attrs if a.key not in self.excluir)
+            valores = attrgetter(*chaves)
+            # attrgetter de um único nome não devolve tupla
+            self._valores = valores if len(chaves) > 1 else (lambda obj: (valores(obj),))
+            self._chaves = chaves
+        return self._chaves
+
+    @property
+    def colunas(self):
+        """Colunas na ordem de `chaves`, para `session.query(*ser.colunas)`."""
+        return [getattr(self.modelo, chave) for chave in self.chaves]
+
+    def __call__(self, obj):
+        linha = dict(zip(self.chaves, self._valores(obj)))
+        for nome, funcao in self.extras.items():
+            linha[nome] = funcao(obj)
+        return linha
+
+    def linha(self, row):
+        """Dict de uma Row de `query(*ser.colunas)` (já vem na ordem das chaves)."""
+        linha = dict(zip(self.chaves, row))
+        for nome, funcao in self.extras.items():
+            linha[nome] = funcao(row)
+        return linha
+
+def serializador(modelo, excluir=(), extras=None):
+    return SerializadorModelo(modelo, excluir, extras)
+
+def lista_streaming(itens, serializar=None, lote=LOTE_STREAMING):
+    """Response com a lista JSON gerada em pedaços de `lote` itens.
+
+    `itens` pode ser um iterador (ex.: query com yield_per); a sessão continua
+    disponível enquanto a resposta é enviada (stream_with_context). O status
+    200 já foi enviado quando os itens são lidos: um erro no meio é logado e
+    a lista é fechada com o que já saiu, para o corpo continuar sendo JSON.
+    """
+    provider = current_app.json
+
+    def gerar():
+        yield '['
+        separador, pedaco = '', []
+        try:
+            for item in itens:
+                pedaco.append(item if serializar is None else serializar(item))
+                if len(pedaco) >= lote:
+                    yield separador + provider.dumps(pedaco)[1:-1]
+                    separador, pedaco = ',', []
+            if pedaco:
+                yield separador + provider.dumps(pedaco)[1:-1]
+        except Exception:
+            current_app.logger.exception("Erro gerando a lista JSON em streaming; lista encerrada antes do fim")
+        yield ']\n'
+
+    return Response(stream_with_context(gerar()), mimetype=provider.mimetype)
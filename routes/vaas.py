@@ -5,11 +5,13 @@ from decimal import Decimal
 import json
 import calendar
 
-from models.user import db, Usuario
+from models.database import db_session
+from models.user import Usuario
 from models.vaas import (
     PlanoVaaS, AssinaturaVaaS, ContratoVeterinario, 
-    AtendimentoVaaS, FaturaVaaS, MetricaVaaS
+    AtendimentoVaaS, FaturaVaaS
 )
+from services import analytics_vaas, faturamento_vaas
 from auth.middleware import role_required, tenant_access_required, financial_access_required
 
 vaas_bp = Blueprint('vaas', __name__)
@@ -75,8 +77,8 @@ def criar_assinatura():
         status='ativa'
     )
     
-    db.session.add(assinatura)
-    db.session.commit()
+    db_session.add(assinatura)
+    db_session.commit()
     
     return jsonify({
         'message': 'Assinatura criada com sucesso',
@@ -88,20 +90,7 @@ def criar_assinatura():
 @tenant_access_required
 def get_veterinarios_contratados(current_user, tenant_id):
     """Listar veterinários contratados via VaaS"""
-    contratos = ContratoVeterinario.query.filter_by(
-        tenant_id=tenant_id,
-        status='ativo'
-    ).all()
-    
-    veterinarios = []
-    for contrato in contratos:
-        veterinario = Usuario.query.get(contrato.veterinario_id)
-        if veterinario:
-            vet_data = veterinario.to_dict()
-            vet_data['contrato'] = contrato.to_dict()
-            veterinarios.append(vet_data)
-    
-    return jsonify(veterinarios)
+    return jsonify(analytics_vaas.veterinarios_contratados(db_session, tenant_id))
 
 @vaas_bp.route('/veterinarios/contratar', methods=['POST'])
 @jwt_required()
@@ -164,7 +153,7 @@ def contratar_veterinario():
         valor_procedimento=Decimal(data.get('valor_procedimento', '300.00'))
     )
     
-    db.session.add(contrato)
+    db_session.add(contrato)
     
     # Atualizar contador na assinatura
     assinatura.veterinarios_contratados = contratos_ativos + 1
@@ -172,7 +161,7 @@ def contratar_veterinario():
     # Associar veterinário ao tenant
     veterinario.tenant_id = usuario.tenant_id
     
-    db.session.commit()
+    db_session.commit()
     
     return jsonify({
         'message': 'Veterinário contratado com sucesso',
@@ -268,8 +257,8 @@ def registrar_atendimento():
         status='realizado'
     )
     
-    db.session.add(atendimento)
-    db.session.commit()
+    db_session.add(atendimento)
+    db_session.commit()
     
     return jsonify({
         'message': 'Atendimento registrado com sucesso',
@@ -368,15 +357,20 @@ def get_faturas_vaas(current_user, tenant_id):
 @role_required(['proprietario', 'admin'])
 def gerar_fatura_mes():
     """Gerar fatura do mês para assinatura VaaS"""
-    data = request.get_json()
+    data = request.get_json() or {}
     user_id = get_jwt_identity()
     usuario = Usuario.query.get(int(user_id))
     
     if not usuario:
         return jsonify({'error': 'Usuário não encontrado'}), 404
     
-    mes = data.get('mes', date.today().month)
-    ano = data.get('ano', date.today().year)
+    try:
+        mes = int(data.get('mes', date.today().month))
+        ano = int(data.get('ano', date.today().year))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'mes e ano devem ser números'}), 400
+    if not 1 <= mes <= 12:
+        return jsonify({'error': 'mes deve estar entre 1 e 12'}), 400
     
     # Buscar assinatura ativa
     assinatura = AssinaturaVaaS.query.filter_by(
@@ -397,116 +391,41 @@ def gerar_fatura_mes():
     if fatura_existente:
         return jsonify({'error': 'Fatura já existe para este período'}), 400
     
-    # Buscar atendimentos do período
-    inicio_mes = date(ano, mes, 1)
-    ultimo_dia = calendar.monthrange(ano, mes)[1]
-    fim_mes = date(ano, mes, ultimo_dia)
-    
-    atendimentos = AtendimentoVaaS.query.filter(
-        AtendimentoVaaS.tenant_id == usuario.tenant_id,
-        AtendimentoVaaS.data_atendimento >= inicio_mes,
-        AtendimentoVaaS.data_atendimento <= fim_mes,
-        AtendimentoVaaS.status == 'realizado'
-    ).all()
-    
-    # Calcular valores
-    valor_plano = assinatura.plano.preco_mensal
-    valor_atendimentos = sum([float(a.valor_cobrado) for a in atendimentos])
-    valor_total = valor_plano + valor_atendimentos
-    
-    # Criar fatura
-    fatura = FaturaVaaS(
-        tenant_id=usuario.tenant_id,
-        assinatura_id=assinatura.id,
-        mes_referencia=mes,
-        ano_referencia=ano,
-        data_vencimento=date(ano, mes, 10),  # Vencimento dia 10
-        valor_plano=valor_plano,
-        valor_atendimentos=valor_atendimentos,
-        valor_total=valor_total,
-        status='pendente',
-        detalhes_cobranca=json.dumps([a.to_dict() for a in atendimentos])
-    )
-    
-    db.session.add(fatura)
-    
-    # Marcar atendimentos como faturados
-    for atendimento in atendimentos:
-        atendimento.status = 'faturado'
-        atendimento.data_faturamento = datetime.utcnow()
-    
-    db.session.commit()
+    # Mesmo caminho do faturamento em lote, restrito ao tenant do usuário
+    resumo = faturamento_vaas.faturar_mes(db_session, ano, mes, tenant_ids=[usuario.tenant_id])
+    if not resumo['faturas_criadas']:
+        return jsonify({'error': 'Fatura já existe para este período'}), 400
     
+    fatura = FaturaVaaS.query.get(resumo['faturas_criadas'][0])
     return jsonify({
         'message': 'Fatura gerada com sucesso',
-        'fatura': fatura.to_dict()
+        'fatura': fatura.to_dict(incluir_itens=True)
     }), 201
 
+@vaas_bp.route('/faturas/gerar-lote', methods=['POST'])
+@jwt_required()
+@role_required(['admin'])
+def gerar_faturas_lote():
+    """Gerar as faturas do mês de todos os tenants (fechamento mensal)"""
+    data = request.get_json() or {}
+    mes = data.get('mes', date.today().month)
+    ano = data.get('ano', date.today().year)
+    tamanho_lote = data.get('tamanho_lote', faturamento_vaas.TAMANHO_LOTE_PADRAO)
+    
+    try:
+        resumo = faturamento_vaas.faturar_mes(db_session, int(ano), int(mes), int(tamanho_lote))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'message': f"{resumo['total_faturas']} faturas geradas",
+        'resumo': resumo
+    }), 200
+
 @vaas_bp.route('/analytics', methods=['GET'])
 @jwt_required()
 @tenant_access_required
 def get_analytics_vaas(current_user, tenant_id):
     """Analytics e relatórios VaaS"""
     dias = request.args.get('dias', 30, type=int)
-    data_inicio = date.today() - timedelta(days=dias)
-    
-    # Buscar métricas do período
-    metricas = MetricaVaaS.query.filter(
-        MetricaVaaS.tenant_id == tenant_id,
-        MetricaVaaS.data_metrica >= data_inicio
-    ).order_by(MetricaVaaS.data_metrica).all()
-    
-    # Buscar atendimentos do período para análise
-    atendimentos = AtendimentoVaaS.query.filter(
-        AtendimentoVaaS.tenant_id == tenant_id,
-        AtendimentoVaaS.data_atendimento >= data_inicio
-    ).all()
-    
-    # Agrupar por data
-    atendimentos_por_dia = {}
-    receita_por_dia = {}
-    
-    for atendimento in atendimentos:
-        data_str = atendimento.data_atendimento.date().isoformat()
-        
-        if data_str not in atendimentos_por_dia:
-            atendimentos_por_dia[data_str] = 0
-            receita_por_dia[data_str] = 0
-        
-        atendimentos_por_dia[data_str] += 1
-        receita_por_dia[data_str] += float(atendimento.valor_cobrado)
-    
-    # Veterinários mais ativos
-    veterinarios_stats = {}
-    for atendimento in atendimentos:
-        vet_id = atendimento.veterinario_id
-        if vet_id not in veterinarios_stats:
-            veterinario = Usuario.query.get(vet_id)
-            veterinarios_stats[vet_id] = {
-                'nome': veterinario.nome if veterinario else 'Desconhecido',
-                'atendimentos': 0,
-                'receita': 0,
-                'tempo_total': 0
-            }
-        
-        veterinarios_stats[vet_id]['atendimentos'] += 1
-        veterinarios_stats[vet_id]['receita'] += float(atendimento.valor_cobrado)
-        veterinarios_stats[vet_id]['tempo_total'] += atendimento.duracao_minutos or 0
-    
-    return jsonify({
-        'periodo': {
-            'data_inicio': data_inicio.isoformat(),
-            'data_fim': date.today().isoformat(),
-            'dias': dias
-        },
-        'resumo': {
-            'total_atendimentos': len(atendimentos),
-            'receita_total': sum(receita_por_dia.values()),
-            'tempo_total_horas': sum([a.duracao_minutos or 0 for a in atendimentos]) / 60,
-            'veterinarios_ativos': len(veterinarios_stats)
-        },
-        'atendimentos_por_dia': atendimentos_por_dia,
-        'receita_por_dia': receita_por_dia,
-        'veterinarios_stats': list(veterinarios_stats.values()),
-        'metricas_historicas': [metrica.to_dict() for metrica in metricas]
-    })
+    return jsonify(analytics_vaas.analytics(db_session, tenant_id, dias))
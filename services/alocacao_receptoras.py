@@ -0,0 +1,124 @@
+"""
+Alocação de embriões em receptoras para um lote inteiro (dia de laboratório).
+
+Em vez de escolher a melhor receptora doadora por doadora (quem pede
+primeiro leva a melhor), monta a matriz embrião x receptora de uma vez e
+resolve a atribuição global que maximiza as prenhezes esperadas com o
+algoritmo húngaro (versão de caminhos mínimos com potenciais, O(n²m)).
+
+Sincronia: a receptora deve ter ovulado entre `janela[0]` e `janela[1]`
+dias depois da ovulação equivalente do embrião (padrão: de 1 dia antes a
+3 dias depois da doadora). Pares fora da janela, ou receptoras sem data de
+ovulação, não entram no plano.
+"""
+
+import numpy as np
+
+JANELA_SINCRONIA_PADRAO = (-1, 3)
+# Dentro desta faixa a sincronia é considerada ideal; fora dela, perde
+# PENALIDADE_SINCRONIA por dia até a borda da janela
+SINCRONIA_IDEAL = (0, 2)
+PENALIDADE_SINCRONIA = 0.15
+TAXA_SUCESSO_PADRAO = 0.7
+FATOR_QUALIDADE = {1: 1.0, 2: 0.9, 3: 0.75, 4: 0.5}
+FATOR_QUALIDADE_PADRAO = 0.8
+
+# Peso (em transferências) da taxa padrão no histórico da receptora, para
+# que uma receptora com 1 de 1 não passe na frente de uma com 9 de 10
+PESO_TAXA_PADRAO = 3
+
+def taxa_sucesso(gestacoes_confirmadas, transferencias):
+    """Taxa de prenhez histórica da receptora, suavizada pela taxa padrão."""
+    return ((gestacoes_confirmadas + PESO_TAXA_PADRAO * TAXA_SUCESSO_PADRAO)
+            / (transferencias + PESO_TAXA_PADRAO))
+
+def fator_qualidade(grau):
+    """Fator do grau do embrião (1 a 4, Squires & Carnevale)."""
+    try:
+        return FATOR_QUALIDADE.get(int(str(grau).upper().lstrip('G')), FATOR_QUALIDADE_PADRAO)
+    except (TypeError, ValueError):
+        return FATOR_QUALIDADE_PADRAO
+
+def matriz_compatibilidade(ovulacao_embrioes, qualidade_embrioes, ovulacao_receptoras,
+                           sucesso_receptoras, janela=JANELA_SINCRONIA_PADRAO):
+    """Probabilidade de prenhez de cada par embrião x receptora.
+
+    As ovulações vêm em datetime64[D] (NaT quando desconhecida). Retorna
+    (scores, atraso, viavel): atraso é a diferença em dias entre a ovulação
+    da receptora e a do embrião, e viavel marca os pares dentro da janela.
+    """
+    E = np.asarray(ovulacao_embrioes, dtype='datetime64[D]')
+    R = np.asarray(ovulacao_receptoras, dtype='datetime64[D]')
+    atraso = (R[None, :] - E[:, None]).astype('timedelta64[D]')
+    conhecido = ~np.isnat(atraso)
+    dias = np.where(conhecido, atraso.astype(float), np.nan)
+
+    viavel = conhecido & (np.nan_to_num(dias, nan=-1e9) >= janela[0]) & (np.nan_to_num(dias, nan=1e9) <= janela[1])
+    fora_ideal = np.maximum(SINCRONIA_IDEAL[0] - dias, 0) + np.maximum(dias - SINCRONIA_IDEAL[1], 0)
+    fator_sincronia = np.clip(1.0 - PENALIDADE_SINCRONIA * np.nan_to_num(fora_ideal), 0.0, 1.0)
+
+    q = np.asarray(qualidade_embrioes, dtype=float)
+    s = np.asarray(sucesso_receptoras, dtype=float)
+    scores = q[:, None] * s[None, :] * fator_sincronia
+    scores[~viavel] = 0.0
+    return scores, dias, viavel
+
+def hungaro(custos):
+    """Atribuição de custo mínimo para uma matriz n x m com n <= m.
+
+    Retorna, para cada linha, a coluna atribuída.
+    """
+    n, m = custos.shape
+    if n > m:
+        raise ValueError("a matriz deve ter no máximo tantas linhas quanto colunas")
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)    # p[j]: linha (1..n) atribuída à coluna j
+    caminho = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        usado = np.zeros(m + 1, dtype=bool)
+        while True:
+            usado[j0] = True
+            i0 = p[j0]
+            livres = ~usado[1:]
+            reduzido = custos[i0 - 1] - u[i0] - v[1:]
+            melhora = livres & (reduzido < minv[1:])
+            minv[1:][melhora] = reduzido[melhora]
+            caminho[1:][melhora] = j0
+            candidatos = np.where(livres, minv[1:], np.inf)
+            j1 = int(np.argmin(candidatos)) + 1
+            delta = candidatos[j1 - 1]
+            u[p[usado]] += delta
+            v[usado] -= delta
+            minv[1:][livres] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = caminho[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    atribuicao = np.empty(n, dtype=int)
+    colunas = np.nonzero(p[1:])[0]
+    atribuicao[p[1:][colunas] - 1] = colunas
+    return atribuicao
+
+def alocar(scores, viavel):
+    """Pares (embrião, receptora) que maximizam a soma dos scores viáveis.
+
+    Embriões sem receptora viável (ou que sobram quando há mais embriões
+    que receptoras) ficam fora da lista.
+    """
+    n, m = scores.shape
+    if n == 0 or m == 0:
+        return []
+    # Pares inviáveis recebem um custo maior que qualquer plano viável
+    custos = np.where(viavel, -scores, float(n + 1))
+    if n <= m:
+        linhas, colunas = np.arange(n), hungaro(custos)
+    else:
+        linhas, colunas = hungaro(custos.T), np.arange(m)
+    return [(int(i), int(j)) for i, j in zip(linhas, colunas) if viavel[i, j]]
@@ -0,0 +1,97 @@
+"""
+Consultas do painel VaaS: veterinários contratados e analytics do período.
+
+Cada função faz um número fixo de consultas, independente de quantos
+contratos ou atendimentos o tenant tem: o veterinário vem no JOIN do
+contrato e os atendimentos são agregados no banco por dia e veterinário.
+tests/test_analytics_vaas.py conta os statements para pegar regressões.
+"""
+
+from datetime import date, timedelta
+from sqlalchemy import func
+
+from models.user import Usuario
+from models.vaas import ContratoVeterinario, AtendimentoVaaS, MetricaVaaS
+from routes.serializacao import serializador
+
+_serializar_veterinario = serializador(Usuario, excluir=('password_hash',))
+
+def veterinarios_contratados(session, tenant_id):
+    """Veterinários com contrato ativo, cada um com o seu contrato (1 consulta)."""
+    contratos = session.query(ContratoVeterinario, Usuario).join(
+        Usuario, Usuario.id == ContratoVeterinario.veterinario_id
+    ).filter(
+        ContratoVeterinario.tenant_id == tenant_id,
+        ContratoVeterinario.status == 'ativo'
+    ).order_by(ContratoVeterinario.id).all()
+
+    veterinarios = []
+    for contrato, veterinario in contratos:
+        vet_data = _serializar_veterinario(veterinario)
+        vet_data['contrato'] = contrato.to_dict()
+        veterinarios.append(vet_data)
+    return veterinarios
+
+def analytics(session, tenant_id, dias=30):
+    """Resumo dos últimos `dias` dias (2 consultas: métricas e atendimentos agrupados)."""
+    data_inicio = date.today() - timedelta(days=dias)
+
+    metricas = session.query(MetricaVaaS).filter(
+        MetricaVaaS.tenant_id == tenant_id,
+        MetricaVaaS.data_metrica >= data_inicio
+    ).order_by(MetricaVaaS.data_metrica).all()
+
+    # O nome do veterinário vem no mesmo SELECT, sem buscar cada um separadamente
+    A = AtendimentoVaaS
+    dia = func.date(A.data_atendimento)
+    grupos = session.query(
+        dia,
+        A.veterinario_id,
+        Usuario.nome,
+        func.count(A.id),
+        func.coalesce(func.sum(A.valor_cobrado), 0),
+        func.coalesce(func.sum(A.duracao_minutos), 0)
+    ).outerjoin(Usuario, Usuario.id == A.veterinario_id).filter(
+        A.tenant_id == tenant_id,
+        A.data_atendimento >= data_inicio
+    ).group_by(dia, A.veterinario_id, Usuario.nome).order_by(dia).all()
+
+    atendimentos_por_dia = {}
+    receita_por_dia = {}
+    veterinarios_stats = {}
+    for data_dia, vet_id, nome, quantidade, receita, tempo in grupos:
+        # SQLite devolve a data como texto, o PostgreSQL como date
+        data_str = data_dia.isoformat() if hasattr(data_dia, 'isoformat') else str(data_dia)
+        atendimentos_por_dia[data_str] = atendimentos_por_dia.get(data_str, 0) + quantidade
+        receita_por_dia[data_str] = receita_por_dia.get(data_str, 0) + float(receita)
+
+        stats = veterinarios_stats.setdefault(vet_id, {
+            'nome': nome or 'Desconhecido',
+            'atendimentos': 0,
+            'receita': 0,
+            'tempo_total': 0
+        })
+        stats['atendimentos'] += quantidade
+        stats['receita'] += float(receita)
+        stats['tempo_total'] += int(tempo)
+
+    # Veterinários mais ativos primeiro
+    ranking = sorted(veterinarios_stats.values(), key=lambda v: v['atendimentos'], reverse=True)
+
+    return {
+        'periodo': {
+            'data_inicio': data_inicio.isoformat(),
+            'data_fim': date.today().isoformat(),
+            'dias': dias
+        },
+        'resumo': {
+            'total_atendimentos': sum(atendimentos_por_dia.values()),
+            'receita_total': sum(receita_por_dia.values()),
+            'tempo_total_horas': sum([v['tempo_total'] for v in ranking]) / 60,
+            'veterinarios_ativos': len(veterinarios_stats)
+        },
+        'atendimentos_por_dia': atendimentos_por_dia,
+        'receita_por_dia': receita_por_dia,
+        'veterinarios_stats': ranking,
+        'metricas_historicas': [metrica.to_dict() for metrica in metricas]
+    }
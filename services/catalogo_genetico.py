@@ -0,0 +1,216 @@
+"""
+Catálogo de doadoras e garanhões para o Genetic Match.
+
+Cada tenant tem um snapshot imutável dos seus animais ativos: colunas
+NumPy somente leitura (no formato que `ai.genetic_match_engine` consome)
+e um índice id -> linha para buscas O(1). Idade, taxa de prenhez
+histórica, score genético e performance da progênie são calculados uma
+vez na carga. O snapshot é trocado inteiro quando a versão do plantel do
+tenant (match_pool_versions, incrementada a cada alteração nos animais)
+muda, então requisições concorrentes nunca veem um catálogo pela metade.
+"""
+
+import threading
+from datetime import datetime
+import numpy as np
+from sqlalchemy import case, func, or_
+
+from models.database import db_session
+from models.genetic_match import (
+    Animal, HistoricoReprodutivo, PerformanceProgenie, DadosGenomicos, versao_plantel
+)
+
+# Valores usados quando o animal ainda não tem histórico
+TAXA_PRENHEZ_PADRAO = 0.6
+SCORE_GENETICO_PADRAO = 0.5
+PERFORMANCE_PADRAO = 0.5
+IDADE_PADRAO = 10.0
+
+COLUNAS_MOTOR = ('id', 'nome', 'raca', 'tipo_morfologico', 'idade', 'taxa_prenhez',
+                 'score_genetico', 'performance_progenie', 'valor_cobertura')
+
+class Plantel:
+    """Doadoras ou garanhões de um tenant, em colunas somente leitura."""
+
+    def __init__(self, colunas):
+        self._colunas = {}
+        for nome, valores in colunas.items():
+            if isinstance(valores, np.ndarray):
+                valores.setflags(write=False)
+            self._colunas[nome] = valores
+        self.indice = {animal_id: i for i, animal_id in enumerate(colunas['id'])}
+
+    def __len__(self):
+        return len(self._colunas['id'])
+
+    def __contains__(self, animal_id):
+        return animal_id in self.indice
+
+    def coluna(self, nome):
+        return self._colunas[nome]
+
+    def registro(self, animal_id):
+        """Dados do animal como dict novo (alterá-lo não afeta o catálogo)."""
+        i = self.indice.get(animal_id)
+        if i is None:
+            return None
+        c = self._colunas
+        def valor(nome):
+            v = c[nome][i]
+            return None if isinstance(v, float) and np.isnan(v) else v
+        return {
+            'id': c['id'][i],
+            'nome': c['nome'][i],
+            'raca': c['raca'][i],
+            'tipo_morfologico': c['tipo_morfologico'][i],
+            'idade': valor('idade_real'),
+            'peso': valor('peso'),
+            'altura': valor('altura'),
+            'taxa_prenhez_historica': float(c['taxa_prenhez'][i]),
+            'score_genetico': float(c['score_genetico'][i]),
+            'performance_media_progenie': float(c['performance_progenie'][i]),
+            'valor_cobertura': float(c['valor_cobertura'][i])
+        }
+
+    def registros(self):
+        return [self.registro(animal_id) for animal_id in self._colunas['id']]
+
+    def empacotado(self, ids=None):
+        """Colunas para o motor de scores, de todos ou só dos ids pedidos."""
+        if ids is None:
+            return {nome: self._colunas[nome] for nome in COLUNAS_MOTOR}
+        linhas = [self.indice[animal_id] for animal_id in ids if animal_id in self.indice]
+        dados = {}
+        for nome in COLUNAS_MOTOR:
+            valores = self._colunas[nome]
+            if isinstance(valores, np.ndarray):
+                dados[nome] = valores[linhas]
+            else:
+                dados[nome] = tuple(valores[i] for i in linhas)
+        return dados
+
+class Catalogo:
+    """Snapshot dos animais de um tenant numa versão do plantel."""
+
+    def __init__(self, tenant_id, versao, doadoras, garanhoes):
+        self.tenant_id = tenant_id
+        self.versao = versao
+        self.doadoras = doadoras
+        self.garanhoes = garanhoes
+
+def _taxas_prenhez(session, tenant_id, coluna):
+    H = HistoricoReprodutivo
+    linhas = session.query(
+        coluna,
+        func.avg(case((H.prenhez_confirmada == True, 1.0), else_=0.0))
+    ).filter(
+        H.tenant_id == tenant_id,
+        H.prenhez_confirmada.is_not(None),
+        coluna.is_not(None)
+    ).group_by(coluna).all()
+    return dict(linhas)
+
+def _scores_geneticos(session, tenant_id):
+    G = DadosGenomicos
+    scores = (G.score_velocidade, G.score_resistencia, G.score_conformacao, G.score_fertilidade)
+    linhas = session.query(G.animal_id, *scores).filter(G.tenant_id == tenant_id).all()
+    if not linhas:
+        return {}
+    ids = np.array([l[0] for l in linhas])
+    valores = np.array([l[1:] for l in linhas], dtype=float)
+    # Média dos scores disponíveis de cada exame, depois média por animal
+    with np.errstate(invalid='ignore'):
+        por_exame = np.nanmean(valores, axis=1)
+    resultado = {}
+    for animal_id in np.unique(ids):
+        exames = por_exame[ids == animal_id]
+        exames = exames[~np.isnan(exames)]
+        if len(exames):
+            resultado[int(animal_id)] = float(exames.mean())
+    return resultado
+
+def _performance_progenie(session, tenant_id):
+    """Percentil dos prêmios médios da progênie de cada animal no tenant."""
+    P = PerformanceProgenie
+    linhas = session.query(P.animal_id, func.avg(func.coalesce(P.premios_ganhos, 0.0))).filter(
+        P.tenant_id == tenant_id
+    ).group_by(P.animal_id).all()
+    if not linhas:
+        return {}
+    ids = [l[0] for l in linhas]
+    medias = np.array([l[1] or 0.0 for l in linhas], dtype=float)
+    if len(medias) == 1:
+        return {ids[0]: PERFORMANCE_PADRAO}
+    ranks = medias.argsort().argsort()
+    return dict(zip(ids, (ranks / (len(medias) - 1)).tolist()))
+
+def _montar_plantel(animais, taxas, scores, performance, agora):
+    ids = tuple(a.id for a in animais)
+    idades = np.array([(agora - a.data_nascimento).days / 365.25 if a.data_nascimento else np.nan
+                       for a in animais], dtype=float)
+    def numeros(valores):
+        return np.array([np.nan if v is None else v for v in valores], dtype=float)
+    return Plantel({
+        'id': ids,
+        'nome': tuple(a.nome for a in animais),
+        'raca': np.array([a.raca or '' for a in animais], dtype=object),
+        'tipo_morfologico': np.array([a.tipo_morfologico or '' for a in animais], dtype=object),
+        'idade_real': idades,
+        'idade': np.nan_to_num(idades, nan=IDADE_PADRAO),
+        'peso': numeros(a.peso for a in animais),
+        'altura': numeros(a.altura for a in animais),
+        'taxa_prenhez': np.array([taxas.get(i, TAXA_PRENHEZ_PADRAO) for i in ids], dtype=float),
+        'score_genetico': np.array([scores.get(i, SCORE_GENETICO_PADRAO) for i in ids], dtype=float),
+        'performance_progenie': np.array([performance.get(i, PERFORMANCE_PADRAO) for i in ids], dtype=float),
+        'valor_cobertura': np.array([a.valor_cobertura or 0.0 for a in animais], dtype=float),
+    })
+
+def carregar_catalogo(tenant_id, session=None):
+    """Monta o catálogo do tenant a partir do banco."""
+    session = session or db_session
+    versao = versao_plantel(tenant_id, session)
+    animais = session.query(
+        Animal.id, Animal.nome, Animal.sexo, Animal.raca, Animal.data_nascimento, Animal.peso,
+        Animal.altura, Animal.tipo_morfologico, Animal.valor_cobertura
+    ).filter(
+        Animal.tenant_id == tenant_id,
+        or_(Animal.ativo == True, Animal.ativo.is_(None))
+    ).order_by(Animal.id).all()
+
+    H = HistoricoReprodutivo
+    taxas_femeas = _taxas_prenhez(session, tenant_id, H.animal_id)
+    taxas_machos = _taxas_prenhez(session, tenant_id, H.garanhao_id)
+    scores = _scores_geneticos(session, tenant_id)
+    performance = _performance_progenie(session, tenant_id)
+    agora = datetime.now()
+
+    femeas = [a for a in animais if (a.sexo or '').upper() == 'F']
+    machos = [a for a in animais if (a.sexo or '').upper() == 'M']
+    return Catalogo(
+        tenant_id, versao,
+        _montar_plantel(femeas, taxas_femeas, scores, performance, agora),
+        _montar_plantel(machos, taxas_machos, scores, performance, agora)
+    )
+
+_catalogos = {}
+_catalogos_lock = threading.Lock()
+
+def obter_catalogo(tenant_id, session=None):
+    """Catálogo atual do tenant; recarrega quando a versão do plantel muda."""
+    session = session or db_session
+    catalogo = _catalogos.get(tenant_id)
+    if catalogo is not None and catalogo.versao == versao_plantel(tenant_id, session):
+        return catalogo
+    catalogo = carregar_catalogo(tenant_id, session)
+    with _catalogos_lock:
+        atual = _catalogos.get(tenant_id)
+        if atual is None or atual.versao <= catalogo.versao:
+            _catalogos[tenant_id] = catalogo
+    return catalogo
+
+def invalidar_catalogo(tenant_id=None):
+    with _catalogos_lock:
+        if tenant_id is None:
+            _catalogos.clear()
+        else:
+            _catalogos.pop(tenant_id, None)
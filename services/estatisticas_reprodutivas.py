@@ -0,0 +1,158 @@
+"""
+Estatísticas reprodutivas por égua (tabela animal_repro_stats).
+
+Guarda, para cada animal, os totais que os perfis de doadora e receptora
+do analytics usam: coletas OPU, CCOs, último procedimento, transferências
+recebidas e gestações por status. As linhas são recalculadas no próprio
+flush que altera OPU, transferência ou gestação, só para os animais
+afetados, então a leitura é um único SELECT por id em vez de várias
+contagens por animal.
+
+OPU, transferência e gestação são modelos do schema legado (src.models,
+fora desta árvore): quem os tem chama `instalar` com os três modelos e a
+sessão cujos flushes mantêm a tabela (routes/analytics.py faz isso ao ser
+importado). A tabela é criada e populada pela migração 009; para
+recalcular tudo depois use `reconstruir_estatisticas`.
+"""
+
+from datetime import datetime
+from sqlalchemy import case, event, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models.animals import EstatisticaReprodutiva
+
+CAMPOS_ZERADOS = {
+    'total_coletas': 0,
+    'total_ccos': 0,
+    'data_ultimo_procedimento': None,
+    'total_transferencias': 0,
+    'total_gestacoes': 0,
+    'gestacoes_confirmadas': 0,
+    'perdas_embrionarias': 0,
+}
+
+# (ProcedimentoOPU, TransferenciaEmbriao, Gestacao) e a sessão padrão, via instalar()
+_fontes = None
+_sessao = None
+
+def instalar(opu, transferencia, gestacao, sessao=None):
+    """Informa os modelos de origem; com `sessao`, mantém a tabela a cada flush dela."""
+    global _fontes, _sessao
+    _fontes = (opu, transferencia, gestacao)
+    if sessao is None:
+        return
+    _sessao = sessao
+    for nome, funcao in (('before_flush', _coletar_animais_antigos),
+                         ('after_flush', _atualizar_estatisticas),
+                         ('after_rollback', _descartar_animais_afetados)):
+        if not event.contains(sessao, nome, funcao):
+            event.listen(sessao, nome, funcao)
+
+def _modelos():
+    if _fontes is None:
+        raise RuntimeError("estatisticas_reprodutivas.instalar() não foi chamado")
+    return _fontes
+
+def _calcular(conn, animal_ids):
+    """Totais atuais dos animais pedidos, em três consultas agrupadas."""
+    P, T, G = _modelos()
+    linhas = {animal_id: dict(CAMPOS_ZERADOS) for animal_id in animal_ids}
+
+    for animal_id, coletas, ccos, ultimo in conn.execute(
+        select(P.doadora_id, func.count(), func.coalesce(func.sum(P.ccos_recuperados), 0),
+               func.max(P.data_procedimento))
+        .where(P.doadora_id.in_(animal_ids)).group_by(P.doadora_id)
+    ):
+        linhas[animal_id].update(total_coletas=coletas, total_ccos=ccos, data_ultimo_procedimento=ultimo)
+
+    for animal_id, transferencias in conn.execute(
+        select(T.receptora_id, func.count()).where(T.receptora_id.in_(animal_ids)).group_by(T.receptora_id)
+    ):
+        linhas[animal_id]['total_transferencias'] = transferencias
+
+    for animal_id, gestacoes, confirmadas, perdas in conn.execute(
+        select(T.receptora_id, func.count(),
+               func.sum(case((G.status_gestacao == 'confirmada', 1), else_=0)),
+               func.sum(case((G.status_gestacao == 'perda_embrionaria', 1), else_=0)))
+        .select_from(G).join(T).where(T.receptora_id.in_(animal_ids)).group_by(T.receptora_id)
+    ):
+        linhas[animal_id].update(total_gestacoes=gestacoes, gestacoes_confirmadas=confirmadas or 0,
+                                 perdas_embrionarias=perdas or 0)
+    return linhas
+
+def recalcular_estatisticas(conn, animal_ids):
+    """Regrava as linhas de animal_repro_stats dos animais pedidos."""
+    animal_ids = sorted(set(animal_ids) - {None})
+    if not animal_ids:
+        return
+    tabela = EstatisticaReprodutiva.__table__
+    dialeto = postgresql if conn.dialect.name == 'postgresql' else sqlite
+    agora = datetime.utcnow()
+    for animal_id, valores in _calcular(conn, animal_ids).items():
+        stmt = dialeto.insert(tabela).values(animal_id=animal_id, data_atualizacao=agora, **valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['animal_id'],
+            set_={coluna: stmt.excluded[coluna] for coluna in list(valores) + ['data_atualizacao']})
+        conn.execute(stmt)
+
+def reconstruir_estatisticas(session=None, tamanho_lote=500):
+    """Recalcula a tabela inteira (carga inicial ou correção)."""
+    P, T, _ = _modelos()
+    session = session or _sessao
+    ids = set(session.execute(select(P.doadora_id).distinct()).scalars())
+    ids.update(session.execute(select(T.receptora_id).distinct()).scalars())
+    ids = sorted(ids - {None})
+    conn = session.connection()
+    for i in range(0, len(ids), tamanho_lote):
+        recalcular_estatisticas(conn, ids[i:i + tamanho_lote])
+    session.commit()
+    return len(ids)
+
+def carregar_estatisticas(animal_ids, session=None):
+    """Estatísticas de vários animais numa consulta: {animal_id: EstatisticaReprodutiva}."""
+    animal_ids = set(animal_ids) - {None}
+    if not animal_ids:
+        return {}
+    session = session or _sessao
+    return {e.animal_id: e for e in session.query(EstatisticaReprodutiva).filter(
+        EstatisticaReprodutiva.animal_id.in_(animal_ids)
+    )}
+
+# Manutenção incremental. Antes do flush o banco ainda tem os vínculos antigos
+# dos registros alterados ou removidos; depois dele, os novos. Os animais dos
+# dois lados entram no recálculo.
+
+def _animais_no_banco(conn, ids_por_modelo):
+    P, T, G = _modelos()
+    animais = set()
+    consultas = {
+        P: lambda ids: select(P.doadora_id).where(P.id.in_(ids)),
+        T: lambda ids: select(T.receptora_id).where(T.id.in_(ids)),
+        G: lambda ids: select(T.receptora_id).select_from(G).join(T).where(G.id.in_(ids)),
+    }
+    for modelo, ids in ids_por_modelo.items():
+        if ids:
+            animais.update(conn.execute(consultas[modelo](ids)).scalars())
+    return animais
+
+def _ids_por_modelo(objetos):
+    ids = {modelo: [] for modelo in _modelos()}
+    for obj in objetos:
+        for modelo, lista in ids.items():
+            if isinstance(obj, modelo) and obj.id is not None:
+                lista.append(obj.id)
+    return ids
+
+def _coletar_animais_antigos(session, flush_context, instances):
+    objetos = list(session.deleted) + list(session.dirty)
+    session.info.setdefault('repro_afetados', set()).update(
+        _animais_no_banco(session.connection(), _ids_por_modelo(objetos)))
+
+def _atualizar_estatisticas(session, flush_context):
+    animais = session.info.pop('repro_afetados', set())
+    objetos = list(session.new) + list(session.dirty)
+    animais.update(_animais_no_banco(session.connection(), _ids_por_modelo(objetos)))
+    recalcular_estatisticas(session.connection(), animais)
+
+def _descartar_animais_afetados(session):
+    session.info.pop('repro_afetados', None)
@@ -0,0 +1,110 @@
+"""
+Histórico dos animais em eventos_animal.
+
+Cada anotação vira uma linha nova (INSERT), no lugar de reescrever a
+string Egua.historico a cada atualização. A leitura é paginada e filtrável
+por data e tipo pelo índice (tenant_id, animal_id, data).
+"""
+
+import re
+from datetime import date, datetime, time
+from sqlalchemy import func, select
+
+from models.animals import EventoAnimal
+
+# Quantos eventos recentes entram no campo texto `historico` das listagens
+EVENTOS_RESUMO = 10
+SEPARADOR_LEGADO = ' | '
+
+_DATA_FINAL = re.compile(r'^(.*?)\s*\(([^()]*)\)\s*$', re.S)
+
+def interpretar_data(texto):
+    """Data em ISO (AAAA-MM-DD) ou dd/mm/aaaa; None se não reconhecer."""
+    texto = (texto or '').strip()
+    for formato in ('%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y'):
+        try:
+            return datetime.strptime(texto[:10], formato)
+        except ValueError:
+            continue
+    return None
+
+def _momento(data):
+    if data is None:
+        return datetime.utcnow()
+    if isinstance(data, datetime):
+        return data
+    if isinstance(data, date):
+        return datetime.combine(data, time())
+    return interpretar_data(data) or datetime.utcnow()
+
+def registrar(session, tenant_id, animal_id, descricao, tipo='anotacao', data=None, usuario_id=None):
+    """Acrescenta um evento ao histórico (não faz commit)."""
+    evento = EventoAnimal(
+        tenant_id=tenant_id,
+        animal_id=animal_id,
+        tipo=tipo,
+        descricao=descricao,
+        data=_momento(data),
+        usuario_id=str(usuario_id) if usuario_id is not None else None
+    )
+    session.add(evento)
+    return evento
+
+def consultar(session, tenant_id, animal_id, data_inicio=None, data_fim=None, tipos=None):
+    """Query dos eventos do animal, para paginar por (data, id)."""
+    query = session.query(EventoAnimal).filter(
+        EventoAnimal.tenant_id == tenant_id,
+        EventoAnimal.animal_id == animal_id
+    )
+    if data_inicio:
+        query = query.filter(EventoAnimal.data >= data_inicio)
+    if data_fim:
+        query = query.filter(EventoAnimal.data < data_fim)
+    if tipos:
+        query = query.filter(EventoAnimal.tipo.in_(tipos))
+    return query
+
+def resumo_historico(session, tenant_id, animal_ids, limite=EVENTOS_RESUMO):
+    """{animal_id: texto} com os eventos mais recentes, no formato do campo legado.
+
+    Uma consulta para todos os animais (row_number por animal).
+    """
+    if not animal_ids:
+        return {}
+    ordem = func.row_number().over(
+        partition_by=EventoAnimal.animal_id,
+        order_by=(EventoAnimal.data.desc(), EventoAnimal.id.desc())
+    ).label('ordem')
+    recentes = select(
+        EventoAnimal.animal_id, EventoAnimal.descricao, EventoAnimal.data, ordem
+    ).where(
+        EventoAnimal.tenant_id == tenant_id,
+        EventoAnimal.animal_id.in_(animal_ids)
+    ).subquery()
+    linhas = session.execute(
+        select(recentes.c.animal_id, recentes.c.descricao, recentes.c.data)
+        .where(recentes.c.ordem <= limite)
+        .order_by(recentes.c.animal_id, recentes.c.ordem)
+    )
+    textos = {}
+    for animal_id, descricao, data in linhas:
+        item = f"{descricao} ({data.strftime('%d/%m/%Y')})" if data else descricao
+        textos.setdefault(animal_id, []).append(item)
+    return {animal_id: SEPARADOR_LEGADO.join(itens) for animal_id, itens in textos.items()}
+
+def separar_historico(historico, data_padrao=None):
+    """Quebra a string legada ("novo (data) | antigo (data) | ...") em
+    [(descricao, data)] do mais antigo para o mais novo."""
+    eventos = []
+    for trecho in reversed((historico or '').split(SEPARADOR_LEGADO)):
+        trecho = trecho.strip()
+        if not trecho:
+            continue
+        descricao, data = trecho, None
+        casamento = _DATA_FINAL.match(trecho)
+        if casamento:
+            data = interpretar_data(casamento.group(2))
+            if data:
+                descricao = casamento.group(1).strip()
+        eventos.append((descricao, data or data_padrao))
+    return eventos
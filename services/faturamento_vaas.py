@@ -0,0 +1,147 @@
+"""
+Faturamento mensal VaaS em lote.
+
+Percorre as assinaturas ativas em lotes de `tamanho_lote` tenants, cada
+lote numa transação própria:
+
+1. cria as faturas do lote (uma por tenant/competência);
+2. copia os atendimentos realizados no mês para itens_fatura_vaas com um
+   único INSERT ... SELECT;
+3. marca esses atendimentos como faturados com um UPDATE ... WHERE;
+4. totaliza as faturas a partir dos itens com um UPDATE correlacionado.
+
+É idempotente e retomável: tenants que já têm fatura na competência ficam
+fora da seleção e as restrições únicas (fatura por competência, item por
+atendimento) impedem duplicidade se dois jobs rodarem ao mesmo tempo. Se
+o processo cair no meio, só o lote corrente é desfeito; basta rodar de novo.
+"""
+
+import calendar
+from datetime import date, datetime
+from sqlalchemy import and_, exists, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models.vaas import AssinaturaVaaS, AtendimentoVaaS, FaturaVaaS, ItemFaturaVaaS, PlanoVaaS
+
+TAMANHO_LOTE_PADRAO = 100
+DIA_VENCIMENTO = 10
+
+def _periodo(ano, mes):
+    inicio = datetime(ano, mes, 1)
+    fim = datetime(ano + 1, 1, 1) if mes == 12 else datetime(ano, mes + 1, 1)
+    return inicio, fim
+
+def _assinaturas_pendentes(session, ano, mes, depois_de, limite, tenant_ids=None):
+    """Próximo lote de assinaturas ativas ainda sem fatura na competência."""
+    ja_faturado = exists().where(and_(
+        FaturaVaaS.tenant_id == AssinaturaVaaS.tenant_id,
+        FaturaVaaS.ano_referencia == ano,
+        FaturaVaaS.mes_referencia == mes
+    ))
+    query = session.query(AssinaturaVaaS.id, AssinaturaVaaS.tenant_id, PlanoVaaS.preco_mensal).join(
+        PlanoVaaS, PlanoVaaS.id == AssinaturaVaaS.plano_id
+    ).filter(
+        AssinaturaVaaS.status == 'ativa',
+        AssinaturaVaaS.id > depois_de,
+        ~ja_faturado
+    )
+    if tenant_ids:
+        query = query.filter(AssinaturaVaaS.tenant_id.in_(tenant_ids))
+    return query.order_by(AssinaturaVaaS.id).limit(limite).all()
+
+def _faturar_lote(session, assinaturas, ano, mes):
+    """Gera as faturas de um lote. Retorna a lista de ids das faturas criadas."""
+    inicio, fim = _periodo(ano, mes)
+    agora = datetime.utcnow()
+    vencimento = date(ano, mes, min(DIA_VENCIMENTO, calendar.monthrange(ano, mes)[1]))
+
+    faturas = []
+    vistos = set()
+    for assinatura_id, tenant_id, preco_mensal in assinaturas:
+        # Tenant com mais de uma assinatura ativa recebe uma única fatura
+        if tenant_id in vistos:
+            continue
+        vistos.add(tenant_id)
+        faturas.append(FaturaVaaS(
+            tenant_id=tenant_id,
+            assinatura_id=assinatura_id,
+            mes_referencia=mes,
+            ano_referencia=ano,
+            data_vencimento=vencimento,
+            valor_plano=preco_mensal,
+            valor_atendimentos=0,
+            valor_total=preco_mensal,
+            status='pendente'
+        ))
+    session.add_all(faturas)
+    session.flush()
+    ids_faturas = [f.id for f in faturas]
+
+    # Linhas da fatura direto dos atendimentos, sem passar pelo Python
+    A = AtendimentoVaaS
+    origem = select(
+        FaturaVaaS.id, A.tenant_id, A.id, A.veterinario_id,
+        A.data_atendimento, A.tipo_atendimento, A.descricao, A.valor_cobrado
+    ).join(FaturaVaaS, FaturaVaaS.tenant_id == A.tenant_id).where(
+        FaturaVaaS.id.in_(ids_faturas),
+        A.status == 'realizado',
+        A.data_atendimento >= inicio,
+        A.data_atendimento < fim,
+        ~exists().where(ItemFaturaVaaS.atendimento_id == A.id)
+    )
+    I = ItemFaturaVaaS.__table__
+    session.execute(I.insert().from_select(
+        ['fatura_id', 'tenant_id', 'atendimento_id', 'veterinario_id',
+         'data_atendimento', 'tipo_atendimento', 'descricao', 'valor'],
+        origem
+    ))
+
+    faturados = select(ItemFaturaVaaS.atendimento_id).where(ItemFaturaVaaS.fatura_id.in_(ids_faturas))
+    session.execute(
+        update(AtendimentoVaaS.__table__)
+        .where(AtendimentoVaaS.id.in_(faturados))
+        .values(status='faturado', data_faturamento=agora)
+    )
+
+    soma_itens = select(func.coalesce(func.sum(ItemFaturaVaaS.valor), 0)).where(
+        ItemFaturaVaaS.fatura_id == FaturaVaaS.id
+    ).scalar_subquery()
+    F = FaturaVaaS.__table__
+    session.execute(
+        update(F)
+        .where(F.c.id.in_(ids_faturas))
+        .values(valor_atendimentos=soma_itens, valor_total=F.c.valor_plano + soma_itens)
+    )
+    return ids_faturas
+
+def faturar_mes(session, ano, mes, tamanho_lote=TAMANHO_LOTE_PADRAO, tenant_ids=None, log=None):
+    """Fatura a competência ano/mes de todos os tenants (ou só de tenant_ids).
+
+    Retorna um resumo com as faturas criadas e os lotes que falharam.
+    """
+    if not 1 <= mes <= 12:
+        raise ValueError("mes deve estar entre 1 e 12")
+
+    resumo = {'ano': ano, 'mes': mes, 'lotes': 0, 'faturas_criadas': [], 'lotes_com_erro': 0}
+    ultimo_id = 0
+    while True:
+        assinaturas = _assinaturas_pendentes(session, ano, mes, ultimo_id, tamanho_lote, tenant_ids)
+        if not assinaturas:
+            break
+        ultimo_id = assinaturas[-1][0]
+        try:
+            ids_faturas = _faturar_lote(session, assinaturas, ano, mes)
+            session.commit()
+        except IntegrityError as e:
+            # Outro job faturou algum tenant do lote; ele fica para a próxima execução
+            session.rollback()
+            resumo['lotes_com_erro'] += 1
+            if log:
+                log(f"Lote apos assinatura {ultimo_id} ignorado: {e.orig}")
+            continue
+        resumo['lotes'] += 1
+        resumo['faturas_criadas'].extend(ids_faturas)
+        if log:
+            log(f"Lote {resumo['lotes']}: {len(ids_faturas)} faturas")
+    resumo['total_faturas'] = len(resumo['faturas_criadas'])
+    return resumo
@@ -0,0 +1,149 @@
+"""
+Motor de projeção de fluxo de caixa.
+
+Os movimentos do tenant (transações realizadas e lançamentos a vencer)
+viram arrays NumPy; cada movimento cai num balde (dia, semana ou mês) e
+os totais saem de um `bincount` por balde, com o saldo acumulado via
+`cumsum`. O custo é linear no número de movimentos e independe do
+tamanho do horizonte em Python.
+"""
+
+from datetime import date
+import numpy as np
+
+from models.financeiro import TransacaoFinanceira
+from models.extras import Lancamento
+
+GRANULARIDADES = ('diaria', 'semanal', 'mensal')
+
+def carregar_movimentos(session, tenant_id, data_fim):
+    """Retorna (datas, valores, previsto) do tenant até data_fim.
+
+    valores são positivos para entradas e negativos para saídas; previsto
+    marca os lançamentos ainda não pagos (data_vencimento).
+    """
+    T = TransacaoFinanceira
+    realizados = session.query(T.data_transacao, T.tipo, T.valor).filter(
+        T.tenant_id == tenant_id,
+        T.data_transacao.is_not(None),
+        T.data_transacao <= data_fim
+    ).all()
+    L = Lancamento
+    previstos = session.query(L.data_vencimento, L.tipo, L.valor).filter(
+        L.tenant_id == tenant_id,
+        L.pago == False,
+        L.data_vencimento.is_not(None),
+        L.data_vencimento <= data_fim
+    ).all()
+
+    linhas = realizados + previstos
+    if not linhas:
+        vazio = np.array([], dtype='datetime64[D]')
+        return vazio, np.array([], dtype=float), np.array([], dtype=bool)
+
+    datas, tipos, valores = zip(*linhas)
+    datas = np.array(datas, dtype='datetime64[D]')
+    valores = np.array(valores, dtype=float)
+    valores = np.nan_to_num(valores)
+    sinal = np.where(np.array(tipos, dtype=object) == 'Receita', 1.0, -1.0)
+    previsto = np.zeros(len(linhas), dtype=bool)
+    previsto[len(realizados):] = True
+    return datas, valores * sinal, previsto
+
+def _baldes(datas, inicio, fim, granularidade):
+    """Índice do balde de cada data e a data de início de cada balde."""
+    inicio = np.datetime64(inicio, 'D')
+    fim = np.datetime64(fim, 'D')
+    if granularidade == 'mensal':
+        mes0 = inicio.astype('datetime64[M]')
+        indices = (datas.astype('datetime64[M]') - mes0).astype(np.int64)
+        n = int((fim.astype('datetime64[M]') - mes0).astype(np.int64)) + 1
+        rotulos = (mes0 + np.arange(n)).astype('datetime64[D]')
+    elif granularidade == 'semanal':
+        # Semanas começando na segunda-feira (1970-01-01 foi uma quinta)
+        segunda0 = inicio - ((inicio.astype(np.int64) + 3) % 7)
+        indices = (datas - segunda0).astype(np.int64) // 7
+        n = int((fim - segunda0).astype(np.int64)) // 7 + 1
+        rotulos = segunda0 + 7 * np.arange(n)
+    else:
+        indices = (datas - inicio).astype(np.int64)
+        n = int((fim - inicio).astype(np.int64)) + 1
+        rotulos = inicio + np.arange(n)
+    # O primeiro balde começa em data_inicio mesmo que a semana/mês comece antes
+    rotulos[0] = inicio
+    return indices, n, rotulos
+
+def projetar(datas, valores, previsto, data_inicio, data_fim, granularidade='diaria', saldo_base=0.0):
+    """Agrupa os movimentos por balde e calcula os saldos acumulados."""
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f"granularidade deve ser uma de {', '.join(GRANULARIDADES)}")
+    if data_fim < data_inicio:
+        raise ValueError("data_fim anterior a data_inicio")
+
+    inicio_d = np.datetime64(data_inicio, 'D')
+    antes = datas < inicio_d
+    # Tudo que aconteceu antes do período compõe o saldo inicial
+    saldo_inicial = float(saldo_base + valores[antes].sum())
+
+    no_periodo = ~antes & (datas <= np.datetime64(data_fim, 'D'))
+    indices, n, rotulos = _baldes(datas[no_periodo], data_inicio, data_fim, granularidade)
+    v = valores[no_periodo]
+    p = previsto[no_periodo]
+
+    def somar(mascara):
+        return np.bincount(indices[mascara], weights=np.abs(v[mascara]), minlength=n)
+
+    entradas = somar(v > 0)
+    saidas = somar(v < 0)
+    entradas_previstas = somar((v > 0) & p)
+    saidas_previstas = somar((v < 0) & p)
+
+    saldo_final = saldo_inicial + np.cumsum(entradas - saidas)
+    saldo_abertura = saldo_final - (entradas - saidas)
+
+    return {
+        'rotulos': rotulos,
+        'saldo_inicial': saldo_abertura,
+        'entradas': entradas,
+        'saidas': saidas,
+        'entradas_previstas': entradas_previstas,
+        'saidas_previstas': saidas_previstas,
+        'saldo_final': saldo_final,
+    }
+
+def relatorio(session, tenant_id, data_inicio, data_fim, granularidade='diaria', saldo_base=0.0):
+    """Relatório pronto para JSON: resumo do período e uma linha por balde."""
+    datas, valores, previsto = carregar_movimentos(session, tenant_id, data_fim)
+    r = projetar(datas, valores, previsto, data_inicio, data_fim, granularidade, saldo_base)
+
+    linhas = zip(
+        r['rotulos'].astype(str).tolist(),
+        np.round(r['saldo_inicial'], 2).tolist(),
+        np.round(r['entradas'], 2).tolist(),
+        np.round(r['saidas'], 2).tolist(),
+        np.round(r['entradas_previstas'], 2).tolist(),
+        np.round(r['saidas_previstas'], 2).tolist(),
+        np.round(r['saldo_final'], 2).tolist(),
+    )
+    dados = [{
+        'data_referencia': rotulo,
+        'saldo_inicial': si,
+        'entradas': ent,
+        'saidas': sai,
+        'entradas_previstas': ent_p,
+        'saidas_previstas': sai_p,
+        'saldo_final': sf
+    } for rotulo, si, ent, sai, ent_p, sai_p, sf in linhas]
+
+    saldo_inicial = float(r['saldo_inicial'][0]) if len(dados) else saldo_base
+    saldo_final = float(r['saldo_final'][-1]) if len(dados) else saldo_base
+    return {
+        'resumo': {
+            'saldo_inicial': round(saldo_inicial, 2),
+            'total_entradas': round(float(r['entradas'].sum()), 2),
+            'total_saidas': round(float(r['saidas'].sum()), 2),
+            'saldo_final': round(saldo_final, 2),
+            'variacao': round(saldo_final - saldo_inicial, 2)
+        },
+        'dados': dados
+    }
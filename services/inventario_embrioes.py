@@ -0,0 +1,86 @@
+"""
+Inventário de embriões em estoque (botijões de nitrogênio e frescos).
+
+As buscas filtram por doadora, garanhão, grau, estágio, botijão e caneca
+direto no banco, apoiadas nos índices (tenant_id, status, botijao, caneca)
+e (tenant_id, doadora_id, garanhao_nome). As contagens por faceta saem de
+uma única consulta (UNION ALL de GROUP BYs); cada faceta conta com todos
+os filtros menos o dela, para mostrar as alternativas de cada campo.
+"""
+
+from sqlalchemy import String, cast, func, literal, select, union_all
+
+from models.embryo import Embriao
+
+STATUS_ESTOQUE = ('Congelado', 'Fresco')
+
+# nome do parâmetro -> coluna
+FACETAS = {
+    'doadora': Embriao.doadora_id,
+    'garanhao': Embriao.garanhao_nome,
+    'grau': Embriao.grau_qualidade,
+    'estagio': Embriao.estagio_desenvolvimento,
+    'botijao': Embriao.botijao,
+    'caneca': Embriao.caneca,
+}
+
+def ler_filtros(args):
+    """Filtros de faceta presentes na query string (valores separados por vírgula)."""
+    filtros = {}
+    for nome in FACETAS:
+        valor = args.get(nome)
+        if valor:
+            valores = [v.strip() for v in valor.split(',') if v.strip()]
+            if nome == 'doadora':
+                valores = [int(v) for v in valores]
+            filtros[nome] = valores
+    return filtros
+
+def _condicoes(tenant_id, filtros, status=STATUS_ESTOQUE, exceto=None):
+    condicoes = [Embriao.tenant_id == tenant_id, Embriao.status.in_(status)]
+    for nome, valores in filtros.items():
+        if nome != exceto:
+            condicoes.append(FACETAS[nome].in_(valores))
+    return condicoes
+
+def consultar(session, tenant_id, filtros, status=STATUS_ESTOQUE):
+    """Query dos embriões que atendem aos filtros (para paginar ou contar)."""
+    return session.query(Embriao).filter(*_condicoes(tenant_id, filtros, status))
+
+def contar_facetas(session, tenant_id, filtros, status=STATUS_ESTOQUE):
+    """{faceta: [{'valor', 'quantidade'}]} e o total filtrado, numa consulta."""
+    partes = [
+        select(literal('_total').label('faceta'), literal(None, String).label('valor'),
+               func.count().label('quantidade'))
+        .where(*_condicoes(tenant_id, filtros, status))
+    ]
+    for nome, coluna in FACETAS.items():
+        partes.append(
+            select(literal(nome).label('faceta'), cast(coluna, String).label('valor'),
+                   func.count().label('quantidade'))
+            .where(*_condicoes(tenant_id, filtros, status, exceto=nome))
+            .group_by(coluna)
+        )
+    facetas = {nome: [] for nome in FACETAS}
+    total = 0
+    for faceta, valor, quantidade in session.execute(union_all(*partes)):
+        if faceta == '_total':
+            total = quantidade
+        else:
+            facetas[faceta].append({'valor': valor, 'quantidade': quantidade})
+    for valores in facetas.values():
+        valores.sort(key=lambda v: (-v['quantidade'], v['valor'] is None, v['valor'] or ''))
+    return total, facetas
+
+def consultar_locais(session, tenant_id, filtros, status=STATUS_ESTOQUE):
+    """Query de (botijao, caneca, palheta_cor, quantidade) dos embriões filtrados."""
+    return session.query(
+        Embriao.botijao, Embriao.caneca, Embriao.palheta_cor, func.count()
+    ).filter(*_condicoes(tenant_id, filtros, status)).group_by(
+        Embriao.botijao, Embriao.caneca, Embriao.palheta_cor
+    ).order_by(Embriao.botijao, Embriao.caneca, Embriao.palheta_cor)
+
+def localizar(session, tenant_id, filtros, status=STATUS_ESTOQUE):
+    """Botijão/caneca/palheta onde estão os embriões filtrados, com a quantidade."""
+    linhas = consultar_locais(session, tenant_id, filtros, status).all()
+    return [{'botijao': b, 'caneca': c, 'palheta_cor': p, 'quantidade': n} for b, c, p, n in linhas]
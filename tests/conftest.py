@@ -0,0 +1,35 @@
+import os
+import sys
+
+# Os testes nunca usam o haras.db versionado
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """Engine SQLite temporária no lugar da engine do processo (db_session usa esta)."""
+    from models import database
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(database, '_engines', {'primario': engine})
+    monkeypatch.setattr(database, '_engines_pid', os.getpid())
+    yield engine
+    database.db_session.remove()
+    engine.dispose()
+
+@pytest.fixture
+def app(banco):
+    import app_simple
+    app = app_simple.create_app()
+    app.config['TESTING'] = True
+    return app
+
+def cabecalho(app, role='proprietario', tenant_id='haras', usuario_id=1):
+    """Authorization com um token emitido pelo app, como o /api/login faz."""
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity=str(usuario_id),
+                                    additional_claims={'role': role, 'tenant_id': tenant_id})
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,97 @@
+"""Número de consultas das telas VaaS não cresce com o número de linhas."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from models.database import Base
+from models.user import Usuario
+from models.vaas import PlanoVaaS, AssinaturaVaaS, ContratoVeterinario, AtendimentoVaaS, MetricaVaaS
+from services import analytics_vaas
+
+TENANT = 'haras'
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'vaas.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+def _popular(engine, veterinarios, atendimentos_por_vet):
+    with Session(engine) as session:
+        plano = PlanoVaaS(nome='Basico', preco_mensal=100, max_veterinarios=veterinarios)
+        dono = Usuario(nome='Dono', email='dono@haras.com', tenant_id=TENANT)
+        session.add_all([plano, dono])
+        session.flush()
+        assinatura = AssinaturaVaaS(tenant_id=TENANT, proprietario_id=dono.id, plano_id=plano.id)
+        session.add(assinatura)
+        session.flush()
+        agora = datetime.utcnow()
+        for v in range(veterinarios):
+            vet = Usuario(nome=f'Vet {v}', email=f'vet{v}@haras.com', role='veterinario', tenant_id=TENANT)
+            session.add(vet)
+            session.flush()
+            contrato = ContratoVeterinario(tenant_id=TENANT, proprietario_id=dono.id, veterinario_id=vet.id,
+                                           assinatura_id=assinatura.id, valor_consulta=50)
+            session.add(contrato)
+            session.flush()
+            session.add_all([
+                AtendimentoVaaS(tenant_id=TENANT, contrato_id=contrato.id, veterinario_id=vet.id,
+                                data_atendimento=agora - timedelta(days=i % 10), tipo_atendimento='consulta',
+                                duracao_minutos=30, valor_cobrado=50)
+                for i in range(atendimentos_por_vet)
+            ])
+        session.add_all([MetricaVaaS(tenant_id=TENANT, data_metrica=(agora - timedelta(days=d)).date())
+                         for d in range(5)])
+        session.commit()
+
+def _contar_consultas(engine, funcao):
+    statements = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', contar)
+    try:
+        with Session(engine) as session:
+            resultado = funcao(session)
+    finally:
+        event.remove(engine, 'before_cursor_execute', contar)
+    return len(statements), resultado
+
+@pytest.mark.parametrize('funcao', [
+    lambda session: analytics_vaas.analytics(session, TENANT, dias=30),
+    lambda session: analytics_vaas.veterinarios_contratados(session, TENANT),
+], ids=['analytics', 'veterinarios'])
+def test_consultas_constantes(tmp_path, funcao):
+    contagens = []
+    for veterinarios, atendimentos in ((2, 3), (20, 50)):
+        engine = create_engine(f"sqlite:///{tmp_path / f'vaas_{veterinarios}.db'}")
+        Base.metadata.create_all(engine)
+        _popular(engine, veterinarios, atendimentos)
+        contagens.append(_contar_consultas(engine, funcao)[0])
+        engine.dispose()
+    assert contagens[0] == contagens[1]
+
+def test_analytics_agrega_por_dia_e_veterinario(engine):
+    _popular(engine, 3, 20)
+    consultas, dados = _contar_consultas(engine, lambda s: analytics_vaas.analytics(s, TENANT, dias=30))
+    assert consultas == 2
+    assert dados['resumo']['total_atendimentos'] == 60
+    assert dados['resumo']['receita_total'] == 3000.0
+    assert dados['resumo']['veterinarios_ativos'] == 3
+    assert len(dados['atendimentos_por_dia']) == 10
+    assert len(dados['metricas_historicas']) == 5
+    assert {v['atendimentos'] for v in dados['veterinarios_stats']} == {20}
+
+def test_veterinarios_contratados_em_uma_consulta(engine):
+    _popular(engine, 4, 1)
+    consultas, veterinarios = _contar_consultas(
+        engine, lambda s: analytics_vaas.veterinarios_contratados(s, TENANT))
+    assert consultas == 1
+    assert [v['nome'] for v in veterinarios] == ['Vet 0', 'Vet 1', 'Vet 2', 'Vet 3']
+    assert 'password_hash' not in veterinarios[0]
+    assert veterinarios[0]['contrato']['valor_consulta'] == 50.0
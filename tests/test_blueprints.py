@@ -0,0 +1,61 @@
+"""Manifesto de blueprints e views carregadas sob demanda."""
+
+import sys
+import textwrap
+import threading
+
+import pytest
+from flask import Flask
+
+import routes
+from routes import BLUEPRINTS, app_do_blueprint, registrar_blueprints
+
+def _regras(app):
+    return {(r.rule, r.endpoint, frozenset(r.methods - {'HEAD', 'OPTIONS'})) for r in app.url_map.iter_rules()}
+
+@pytest.mark.parametrize('item', BLUEPRINTS, ids=[item[0] for item in BLUEPRINTS])
+def test_manifesto_confere_com_o_blueprint(item):
+    modulo, atributo, _, url_prefix, _ = item
+    declarado = Flask('declarado', static_folder=None)
+    registrar_blueprints(declarado, [item])
+    assert _regras(declarado) == _regras(app_do_blueprint(modulo, atributo, url_prefix))
+
+@pytest.fixture
+def modulo_de_rotas(tmp_path, monkeypatch):
+    (tmp_path / 'rotas_preguicosas.py').write_text(textwrap.dedent('''
+        import time
+        from flask import Blueprint
+        time.sleep(0.05)  # importação lenta, para as threads chegarem juntas
+        bp = Blueprint('preguicosas', __name__)
+
+        @bp.route('/item/<int:id>')
+        def item(id):
+            return {'id': id}
+    '''))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(routes, '_views', {})
+    yield 'rotas_preguicosas'
+    sys.modules.pop('rotas_preguicosas', None)
+
+def test_modulo_importado_na_primeira_chamada(modulo_de_rotas, monkeypatch):
+    carregamentos = []
+    original = routes.app_do_blueprint
+    monkeypatch.setattr(routes, 'app_do_blueprint', lambda *a: carregamentos.append(a) or original(*a))
+    app = Flask('preguicoso', static_folder=None)
+    registrar_blueprints(app, [(modulo_de_rotas, 'bp', 'preguicosas', '/p', (('/item/<int:id>', 'item', ('GET',)),))])
+    assert modulo_de_rotas not in sys.modules
+    assert app.url_map.bind('').match('/p/item/3') == ('preguicosas.item', {'id': 3})
+
+    cliente = app.test_client()
+    respostas = [None] * 16
+    def pedir(i):
+        respostas[i] = cliente.get(f'/p/item/{i}')
+    threads = [threading.Thread(target=pedir, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert [r.status_code for r in respostas] == [200] * 16
+    assert [r.get_json()['id'] for r in respostas] == list(range(16))
+    assert len(carregamentos) == 1
@@ -0,0 +1,77 @@
+"""Build dos estáticos e resposta com ETag, negociação de codificação e fallback."""
+
+import gzip
+import json
+import os
+
+import pytest
+
+import estaticos
+from estaticos.construcao import construir, MANIFESTO
+
+CSS = b'body { color: #333; }\n' * 50
+
+@pytest.fixture
+def build(tmp_path, monkeypatch):
+    origem, destino = tmp_path / 'static', tmp_path / 'build'
+    (origem / 'css').mkdir(parents=True)
+    (origem / 'css' / 'app.css').write_bytes(CSS)
+    (origem / 'index.html').write_text('<link href="css/app.css" rel="stylesheet">' + ' ' * 500)
+    manifesto = construir(str(origem), str(destino))
+    monkeypatch.setattr(estaticos, 'ORIGEM', str(origem))
+    monkeypatch.setattr(estaticos, '_arquivos', None)
+    monkeypatch.setattr(estaticos, 'PASTA_BUILD', str(tmp_path / 'sem-build'))
+    return destino, manifesto
+
+@pytest.fixture
+def cliente(app, build, monkeypatch):
+    destino, _ = build
+    monkeypatch.setattr(estaticos, '_arquivos', estaticos.carregar(str(destino)))
+    return app.test_client()
+
+def test_construir_reescreve_referencias(build):
+    destino, manifesto = build
+    url_css = manifesto['css/app.css']['url']
+    assert url_css != 'css/app.css' and manifesto['index.html']['url'] == 'index.html'
+    assert url_css.encode() in (destino / 'index.html').read_bytes()
+    assert 'gzip' in manifesto['css/app.css']['variantes']
+    assert json.loads((destino / MANIFESTO).read_text()) == manifesto
+
+def test_carregar_le_da_pasta_pedida(build):
+    destino, manifesto = build
+    arquivos = estaticos.carregar(str(destino))
+    assert arquivos[manifesto['css/app.css']['url']].conteudos[None] == CSS
+    assert estaticos.carregar() == {}
+
+def test_etag_e_304(cliente, build):
+    url = '/' + build[1]['css/app.css']['url']
+    resposta = cliente.get(url)
+    assert resposta.status_code == 200 and resposta.data == CSS
+    assert resposta.headers['Cache-Control'] == estaticos.CACHE_IMUTAVEL
+    etag = resposta.headers['ETag']
+    nao_modificado = cliente.get(url, headers={'If-None-Match': etag})
+    assert nao_modificado.status_code == 304 and nao_modificado.data == b''
+    html = cliente.get('/index.html')
+    assert html.headers['Cache-Control'] == estaticos.CACHE_REVALIDAR
+
+def test_negocia_codificacao(cliente, build):
+    destino, manifesto = build
+    url = manifesto['css/app.css']['url']
+    comprimida = cliente.get('/' + url, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert comprimida.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(comprimida.data) == CSS
+    assert 'Accept-Encoding' in comprimida.headers['Vary']
+    assert comprimida.headers['ETag'] != cliente.get('/' + url).headers['ETag']
+
+    # br preferido quando existe (o build só o gera com o pacote brotli)
+    estaticos._arquivos[url].conteudos['br'] = b'br'
+    assert cliente.get('/' + url, headers={'Accept-Encoding': 'gzip, br'}).headers['Content-Encoding'] == 'br'
+    assert 'Content-Encoding' not in cliente.get('/' + url, headers={'Accept-Encoding': 'identity'}).headers
+
+def test_fallback_para_static(cliente, build):
+    destino, _ = build
+    assert cliente.get('/css/app.css').data == CSS
+    os.remove(destino / MANIFESTO)
+    estaticos._arquivos = estaticos.carregar(str(destino))
+    assert cliente.get('/css/app.css').data == CSS
+    assert cliente.get('/nao-existe.js').status_code == 404
@@ -0,0 +1,107 @@
+"""animal_repro_stats acompanha inserção, alteração e remoção de OPU, TE e gestação."""
+
+import pytest
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+import models.user
+from models.animals import EstatisticaReprodutiva
+from services import estatisticas_reprodutivas as servico
+
+# Colunas do schema legado (src.models) que o serviço usa, numa Base própria
+Legado = declarative_base()
+
+class ProcedimentoOPU(Legado):
+    __tablename__ = 'procedimentos_opu'
+    id = Column(Integer, primary_key=True)
+    doadora_id = Column(Integer)
+    data_procedimento = Column(String(10))
+    ccos_recuperados = Column(Integer)
+
+class TransferenciaEmbriao(Legado):
+    __tablename__ = 'transferencias_embriao'
+    id = Column(Integer, primary_key=True)
+    receptora_id = Column(Integer)
+
+class Gestacao(Legado):
+    __tablename__ = 'gestacoes'
+    id = Column(Integer, primary_key=True)
+    transferencia_id = Column(Integer, ForeignKey('transferencias_embriao.id'))
+    status_gestacao = Column(String(50))
+
+@pytest.fixture
+def sessao(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'repro.db'}")
+    Legado.metadata.create_all(engine)
+    models.user.Egua.__table__.create(engine)
+    EstatisticaReprodutiva.__table__.create(engine)
+    monkeypatch.setattr(servico, '_fontes', None)
+    monkeypatch.setattr(servico, '_sessao', None)
+    fabrica = sessionmaker(engine)
+    servico.instalar(ProcedimentoOPU, TransferenciaEmbriao, Gestacao, sessao=fabrica)
+    with fabrica() as session:
+        yield session
+    engine.dispose()
+
+def _stats(session, animal_id):
+    session.expire_all()
+    return servico.carregar_estatisticas([animal_id], session).get(animal_id)
+
+def test_opu_inserida_alterada_e_removida(sessao):
+    opu = ProcedimentoOPU(doadora_id=1, data_procedimento='2025-03-01', ccos_recuperados=8)
+    sessao.add_all([opu, ProcedimentoOPU(doadora_id=1, data_procedimento='2025-04-01', ccos_recuperados=4)])
+    sessao.commit()
+    stats = _stats(sessao, 1)
+    assert (stats.total_coletas, stats.total_ccos, stats.data_ultimo_procedimento) == (2, 12, '2025-04-01')
+
+    # Trocar a doadora recalcula a antiga e a nova
+    opu.doadora_id = 2
+    sessao.commit()
+    assert (_stats(sessao, 1).total_coletas, _stats(sessao, 1).total_ccos) == (1, 4)
+    assert (_stats(sessao, 2).total_coletas, _stats(sessao, 2).total_ccos) == (1, 8)
+
+    sessao.delete(opu)
+    sessao.commit()
+    assert _stats(sessao, 2).total_coletas == 0
+
+def test_transferencia_e_gestacao(sessao):
+    te = TransferenciaEmbriao(receptora_id=5)
+    sessao.add(te)
+    sessao.flush()
+    gestacao = Gestacao(transferencia_id=te.id, status_gestacao='confirmada')
+    sessao.add(gestacao)
+    sessao.commit()
+    stats = _stats(sessao, 5)
+    assert (stats.total_transferencias, stats.total_gestacoes, stats.gestacoes_confirmadas) == (1, 1, 1)
+
+    gestacao.status_gestacao = 'perda_embrionaria'
+    sessao.commit()
+    stats = _stats(sessao, 5)
+    assert (stats.gestacoes_confirmadas, stats.perdas_embrionarias) == (0, 1)
+
+    sessao.delete(gestacao)
+    sessao.commit()
+    assert (_stats(sessao, 5).total_gestacoes, _stats(sessao, 5).total_transferencias) == (0, 1)
+
+    # Mudar a receptora da TE leva junto as gestações dela
+    sessao.add(Gestacao(transferencia_id=te.id, status_gestacao='confirmada'))
+    sessao.commit()
+    te.receptora_id = 6
+    sessao.commit()
+    assert (_stats(sessao, 5).total_transferencias, _stats(sessao, 5).total_gestacoes) == (0, 0)
+    assert (_stats(sessao, 6).total_transferencias, _stats(sessao, 6).gestacoes_confirmadas) == (1, 1)
+
+def test_rollback_nao_altera_estatisticas(sessao):
+    sessao.add(ProcedimentoOPU(doadora_id=3, ccos_recuperados=5))
+    sessao.flush()
+    sessao.rollback()
+    assert _stats(sessao, 3) is None
+
+def test_reconstruir(sessao):
+    sessao.add_all([ProcedimentoOPU(doadora_id=1, ccos_recuperados=3), TransferenciaEmbriao(receptora_id=2)])
+    sessao.commit()
+    sessao.query(EstatisticaReprodutiva).delete()
+    sessao.commit()
+    assert servico.reconstruir_estatisticas(sessao) == 2
+    assert _stats(sessao, 1).total_ccos == 3
+    assert _stats(sessao, 2).total_transferencias == 1
@@ -0,0 +1,84 @@
+"""Histórico das éguas em eventos_animal: escrita pelas rotas, resumo na listagem e migração 004."""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from conftest import cabecalho
+from models.database import Base
+from models.animals import Egua, EventoAnimal
+
+@pytest.fixture
+def cliente(app, banco):
+    Base.metadata.create_all(banco)
+    return app.test_client()
+
+def _eventos(banco, animal_id):
+    with Session(banco) as session:
+        return session.execute(
+            select(EventoAnimal.tipo, EventoAnimal.descricao, EventoAnimal.usuario_id)
+            .where(EventoAnimal.animal_id == animal_id).order_by(EventoAnimal.id)
+        ).all()
+
+def test_cadastro_e_anotacoes_inserem_eventos(app, banco, cliente):
+    resposta = cliente.post('/api/animais/eguas', headers=cabecalho(app),
+                            json={'nome': 'Estrela', 'status': 'ativa', 'historico': 'Chegou ao haras'})
+    assert resposta.status_code == 201
+    with Session(banco) as session:
+        egua_id = session.scalar(select(Egua.id))
+
+    for historico in ('Vacinada', 'Casqueada'):
+        resposta = cliente.put(f'/api/animais/eguas/{egua_id}', headers=cabecalho(app),
+                               json={'historico': historico, 'data': '2025-05-01', 'status': 'vendida'})
+        assert resposta.status_code == 200
+    assert _eventos(banco, egua_id) == [('cadastro', 'Chegou ao haras', '1'), ('anotacao', 'Vacinada', '1'),
+                                        ('anotacao', 'Casqueada', '1')]
+    with Session(banco) as session:
+        # PUT só acrescenta ao histórico
+        assert session.get(Egua, egua_id).status == 'ativa'
+
+    outro_tenant = cliente.put(f'/api/animais/eguas/{egua_id}', headers=cabecalho(app, tenant_id='outro'),
+                               json={'historico': 'x'})
+    assert outro_tenant.status_code == 404
+
+def test_listagem_resume_eventos_recentes(app, banco, cliente):
+    from services.eventos_animal import EVENTOS_RESUMO, SEPARADOR_LEGADO
+    with Session(banco) as session:
+        eguas = [Egua(tenant_id='haras', nome=nome) for nome in ('Aurora', 'Brisa')]
+        session.add_all(eguas)
+        session.flush()
+        for dia in range(1, EVENTOS_RESUMO + 3):
+            session.add(EventoAnimal(tenant_id='haras', animal_id=eguas[0].id, descricao=f'Evento {dia}',
+                                     data=datetime(2025, 1, dia)))
+        session.add(EventoAnimal(tenant_id='outro', animal_id=eguas[1].id, descricao='Outro tenant',
+                                 data=datetime(2025, 1, 1)))
+        session.commit()
+
+    resposta = cliente.get('/api/animais/eguas?limit=10', headers=cabecalho(app))
+    assert resposta.status_code == 200
+    historicos = {e['nome']: e['historico'] for e in resposta.get_json()['itens']}
+    assert historicos['Brisa'] == ''
+    itens = historicos['Aurora'].split(SEPARADOR_LEGADO)
+    assert len(itens) == EVENTOS_RESUMO
+    assert itens[:2] == [f'Evento {EVENTOS_RESUMO + 2} ({EVENTOS_RESUMO + 2:02d}/01/2025)',
+                         f'Evento {EVENTOS_RESUMO + 1} ({EVENTOS_RESUMO + 1:02d}/01/2025)']
+
+def test_v004_nao_duplica_em_nova_execucao(tmp_path):
+    from migrations import v004_eventos_animal as v004
+    engine = create_engine(f"sqlite:///{tmp_path / 'eventos.db'}")
+    Egua.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(Egua.__table__.insert(), [
+            {'tenant_id': 'haras', 'nome': 'A', 'historico': 'Vacinada (02/01/2025) | Chegou (01/01/2025)'},
+            {'tenant_id': 'haras', 'nome': 'B', 'historico': 'Casqueada (05/01/2025)'},
+        ])
+    with engine.connect() as conn:
+        v004.upgrade(conn)
+        v004.upgrade(conn)
+        eventos = conn.execute(select(EventoAnimal.animal_id, EventoAnimal.descricao, EventoAnimal.data)
+                               .order_by(EventoAnimal.id)).all()
+    engine.dispose()
+    assert [(a, d) for a, d, _ in eventos] == [(1, 'Chegou'), (1, 'Vacinada'), (2, 'Casqueada')]
+    assert eventos[0].data == datetime(2025, 1, 1)
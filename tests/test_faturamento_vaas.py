@@ -0,0 +1,75 @@
+"""Faturamento VaaS em lote sobre o schema criado pelas migracoes."""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from models.database import Base
+import models.user
+import migrations
+from models.vaas import PlanoVaaS, AssinaturaVaaS, ContratoVeterinario, AtendimentoVaaS, FaturaVaaS, ItemFaturaVaaS
+from services.faturamento_vaas import faturar_mes
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'vaas.db'}")
+    models.user.Usuario.__table__.create(engine)
+    migrations.upgrade(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+def _popular(session, tenants):
+    plano = PlanoVaaS(nome='Basico', preco_mensal=100, max_veterinarios=2)
+    session.add(plano)
+    session.flush()
+    for i, tenant in enumerate(tenants):
+        assinatura = AssinaturaVaaS(tenant_id=tenant, proprietario_id=1, plano_id=plano.id)
+        session.add(assinatura)
+        session.flush()
+        contrato = ContratoVeterinario(tenant_id=tenant, proprietario_id=1, veterinario_id=2,
+                                       assinatura_id=assinatura.id)
+        session.add(contrato)
+        session.flush()
+        for dia in (1, 31):
+            session.add(AtendimentoVaaS(tenant_id=tenant, contrato_id=contrato.id, veterinario_id=2,
+                                        data_atendimento=datetime(2024, 1, dia, 15), tipo_atendimento='consulta',
+                                        valor_cobrado=10 * (i + 1)))
+    session.commit()
+
+def test_faturar_mes_e_idempotente(session):
+    _popular(session, ['a', 'b', 'c'])
+    resumo = faturar_mes(session, 2024, 1, tamanho_lote=2)
+    assert resumo['total_faturas'] == 3
+    assert resumo['lotes'] == 2
+    totais = {f.tenant_id: float(f.valor_total) for f in session.query(FaturaVaaS)}
+    assert totais == {'a': 120.0, 'b': 140.0, 'c': 160.0}
+    assert session.query(ItemFaturaVaaS).count() == 6
+    assert session.query(AtendimentoVaaS).filter_by(status='faturado').count() == 6
+
+    assert faturar_mes(session, 2024, 1)['total_faturas'] == 0
+    assert session.query(FaturaVaaS).count() == 3
+
+def test_endpoint_gerar_lote(app, banco):
+    from conftest import cabecalho
+    Base.metadata.create_all(banco)
+    with Session(banco) as session:
+        _popular(session, ['a', 'b'])
+    cliente = app.test_client()
+
+    resposta = cliente.post('/api/vaas/faturas/gerar-lote', json={'ano': 2024, 'mes': 1},
+                            headers=cabecalho(app, role='admin'))
+    assert resposta.status_code == 200, resposta.get_json()
+    assert resposta.get_json()['resumo']['total_faturas'] == 2
+
+    negado = cliente.post('/api/vaas/faturas/gerar-lote', json={'ano': 2024, 'mes': 1},
+                          headers=cabecalho(app, role='veterinario'))
+    assert negado.status_code == 403
+    invalido = cliente.post('/api/vaas/faturas/gerar-lote', json={'ano': 2024, 'mes': 13},
+                            headers=cabecalho(app, role='admin'))
+    assert invalido.status_code == 400
+
+    faturas = cliente.get('/api/vaas/faturas', headers=cabecalho(app, tenant_id='a'))
+    assert [f['tenant_id'] for f in faturas.get_json()] == ['a']
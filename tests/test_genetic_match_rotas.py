@@ -0,0 +1,53 @@
+"""Rotas do Genetic Match através do app (manifesto de blueprints)."""
+
+import json
+
+import pytest
+from sqlalchemy.orm import Session
+
+from conftest import cabecalho
+from models import genetic_match
+from models.genetic_match import Animal
+from services.catalogo_genetico import invalidar_catalogo
+
+@pytest.fixture
+def cliente(app, banco):
+    genetic_match.Base.metadata.create_all(banco)
+    with Session(banco) as session:
+        session.add_all([
+            Animal(tenant_id='haras', nome='Doadora', sexo='F', raca='Mangalarga'),
+            Animal(tenant_id='haras', nome='Garanhao A', sexo='M', raca='Mangalarga', valor_cobertura=5000),
+            Animal(tenant_id='haras', nome='Garanhao B', sexo='M', raca='Mangalarga', valor_cobertura=50000),
+        ])
+        session.commit()
+    invalidar_catalogo()
+    yield app.test_client()
+    invalidar_catalogo()
+
+def test_listar_doadoras(app, cliente):
+    resposta = cliente.get('/api/genetic-match/doadoras', headers=cabecalho(app))
+    assert resposta.status_code == 200, resposta.get_json()
+    assert [d['nome'] for d in resposta.get_json()['doadoras']] == ['Doadora']
+
+def test_lote_limita_k_e_orcamento(app, cliente):
+    resposta = cliente.post('/api/genetic-match/sugerir/lote', headers=cabecalho(app),
+                            json={'k': 1000, 'orcamento_maximo': 10000})
+    assert resposta.status_code == 200
+    linhas = [json.loads(l) for l in resposta.get_data(as_text=True).splitlines()]
+    assert len(linhas) == 1
+    assert [r['garanhao_nome'] for r in linhas[0]['recomendacoes']] == ['Garanhao A']
+
+@pytest.mark.parametrize('body', [
+    {'k': 'abc'}, {'k': True}, {'k': 2.5},
+    {'orcamento_maximo': 'muito'}, {'orcamento_maximo': -1},
+    {'consanguinidade_maxima': 1.5}, {'consanguinidade_maxima': '0.1'},
+])
+def test_lote_rejeita_parametros_invalidos(app, cliente, body):
+    resposta = cliente.post('/api/genetic-match/sugerir/lote', headers=cabecalho(app), json=body)
+    assert resposta.status_code == 400
+    assert 'error' in resposta.get_json()
+
+def test_sugerir_rejeita_orcamento_invalido(app, cliente):
+    resposta = cliente.post('/api/genetic-match/sugerir', headers=cabecalho(app),
+                            json={'doadora_id': 1, 'orcamento_maximo': 'x'})
+    assert resposta.status_code == 400
@@ -0,0 +1,33 @@
+"""Limite de login por IP não pode ser contornado forjando X-Forwarded-For."""
+
+import pytest
+
+import app_simple
+from auth.senhas import LimitadorTentativas
+
+@pytest.fixture
+def cliente(app, monkeypatch):
+    monkeypatch.setattr(app_simple, 'limite_login_ip', LimitadorTentativas(2, 1))
+    monkeypatch.setattr(app_simple, 'limite_login_email', LimitadorTentativas(100, 100))
+    app_simple.Base.metadata.create_all(app_simple.get_engine())
+    return app.test_client()
+
+def _login(cliente, encaminhado, email='a@haras.com'):
+    return cliente.post('/api/login', json={'email': email, 'password': 'x'},
+                        headers={'X-Forwarded-For': encaminhado})
+
+def test_ip_forjado_nao_renova_o_limite(cliente):
+    # O nginx acrescenta o IP real ao que o cliente mandou
+    respostas = [_login(cliente, f'10.0.0.{i}, 203.0.113.7').status_code for i in range(3)]
+    assert respostas == [401, 401, 429]
+    assert _login(cliente, '203.0.113.8').status_code == 401
+
+def test_cada_ip_real_tem_o_seu_balde(cliente):
+    assert [_login(cliente, '203.0.113.7').status_code for _ in range(3)] == [401, 401, 429]
+    assert _login(cliente, '198.51.100.1').status_code == 401
+
+def test_sem_proxy_ignora_x_forwarded_for(cliente, monkeypatch):
+    monkeypatch.setattr(app_simple, 'PROXIES_CONFIAVEIS', 0)
+    direto = app_simple.create_app().test_client()
+    respostas = [_login(direto, f'203.0.113.{i}').status_code for i in range(3)]
+    assert respostas == [401, 401, 429]
@@ -0,0 +1,67 @@
+"""Migracoes que trocam indices rodam depois de inspecionar o banco."""
+
+from sqlalchemy import create_engine, inspect, text
+
+from migrations import v003_indices_inventario_embrioes as v003
+
+def test_v003_substitui_indice_de_status(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migracoes.db'}")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE embrioes (id INTEGER PRIMARY KEY, tenant_id VARCHAR, status VARCHAR, "
+                          "botijao VARCHAR, caneca VARCHAR, doadora_id INTEGER, garanhao_nome VARCHAR)"))
+        conn.execute(text(f"CREATE INDEX {v003.INDICE_SUBSTITUIDO} ON embrioes (tenant_id, status)"))
+        conn.commit()
+        v003.upgrade(conn)
+        nomes = {i['name'] for i in inspect(conn).get_indexes('embrioes')}
+    engine.dispose()
+    assert v003.INDICE_SUBSTITUIDO not in nomes
+    assert {nome for nome, _, _ in v003.INDICES} <= nomes
+
+def test_v007_completa_match_requests_existente(tmp_path):
+    from migrations import v007_cache_genetic_match as v007
+    engine = create_engine(f"sqlite:///{tmp_path / 'match.db'}")
+    with engine.connect() as conn:
+        # match_requests de antes do cache, sem fingerprint/versao_plantel
+        conn.execute(text("CREATE TABLE match_requests (id INTEGER PRIMARY KEY, tenant_id VARCHAR(50) NOT NULL, "
+                          "doadora_id INTEGER, resultados_json TEXT)"))
+        conn.commit()
+        v007.upgrade(conn)
+        inspetor = inspect(conn)
+        colunas = {c['name'] for c in inspetor.get_columns('match_requests')}
+        indices = {i['name'] for i in inspetor.get_indexes('match_requests')}
+        assert inspetor.has_table('match_pool_versions')
+        # Rodar de novo nao falha
+        v007.upgrade(conn)
+    engine.dispose()
+    assert {'fingerprint', 'versao_plantel'} <= colunas
+    assert 'ix_match_requests_tenant_fingerprint' in indices
+
+def test_catalogo_le_animals_migrado(tmp_path):
+    import migrations
+    from sqlalchemy import Column, MetaData, Table
+    from sqlalchemy.orm import Session
+    from models.genetic_match import Animal
+    from services.catalogo_genetico import carregar_catalogo
+    engine = create_engine(f"sqlite:///{tmp_path / 'catalogo.db'}")
+    # animals de antes do catalogo, sem valor_cobertura
+    antiga = Table('animals', MetaData(), *[Column(c.name, c.type, primary_key=c.primary_key)
+                                           for c in Animal.__table__.c if c.name != 'valor_cobertura'])
+    antiga.create(engine)
+    with engine.begin() as conn:
+        conn.execute(antiga.insert(), [{'tenant_id': 't', 'nome': 'Egua', 'sexo': 'F'},
+                                       {'tenant_id': 't', 'nome': 'Garanhao', 'sexo': 'M'}])
+    migrations.upgrade(engine)
+    with Session(engine) as session:
+        catalogo = carregar_catalogo('t', session)
+    engine.dispose()
+    assert catalogo.versao == 0
+    assert len(catalogo.doadoras) == 1 and len(catalogo.garanhoes) == 1
+
+def test_v009_cria_animal_repro_stats(tmp_path):
+    from migrations import v009_estatisticas_reprodutivas as v009
+    engine = create_engine(f"sqlite:///{tmp_path / 'repro.db'}")
+    with engine.connect() as conn:
+        v009.upgrade(conn)
+        v009.upgrade(conn)
+        assert inspect(conn).has_table('animal_repro_stats')
+    engine.dispose()
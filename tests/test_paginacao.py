@@ -0,0 +1,55 @@
+"""Paginação por cursor: percorrer as páginas devolve cada linha uma vez, na ordem."""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from models.database import Base
+from models.animals import Egua
+from routes.paginacao import _depois_do_cursor, ordenar
+
+NOMES = ['B', None, 'A', 'B', None, 'C', 'A', None, 'B', 'D']
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine, tables=[Egua.__table__])
+    with Session(engine) as session:
+        session.add_all(Egua(id=i + 1, tenant_id='t', nome=nome) for i, nome in enumerate(NOMES))
+        session.commit()
+        yield session
+
+def _esperado(desc, nulos_primeiro):
+    linhas = [(nome, i + 1) for i, nome in enumerate(NOMES)]
+    nulos = sorted((l for l in linhas if l[0] is None), key=lambda l: l[1], reverse=desc)
+    valores = sorted((l for l in linhas if l[0] is not None), reverse=desc)
+    return [i for _, i in (nulos + valores if nulos_primeiro else valores + nulos)]
+
+@pytest.mark.parametrize('desc', [False, True])
+@pytest.mark.parametrize('nulos_primeiro', [False, True])
+def test_cursor_percorre_todas_as_linhas(session, desc, nulos_primeiro):
+    # A posição dos nulos é forçada na ORDER BY para simular os dois bancos no SQLite
+    nome = Egua.nome.desc() if desc else Egua.nome.asc()
+    ordem = [nome.nulls_first() if nulos_primeiro else nome.nulls_last(),
+             Egua.id.desc() if desc else Egua.id.asc()]
+    vistos, apos = [], None
+    while True:
+        query = session.query(Egua).filter_by(tenant_id='t')
+        if apos:
+            query = query.filter(_depois_do_cursor(Egua.nome, Egua.id, apos[0], apos[1], desc, nulos_primeiro))
+        pagina = query.order_by(*ordem).limit(3).all()
+        if not pagina:
+            break
+        vistos += [e.id for e in pagina]
+        apos = (pagina[-1].nome, pagina[-1].id)
+    assert vistos == _esperado(desc, nulos_primeiro)
+
+@pytest.mark.parametrize('desc', [False, True])
+def test_ordenar_usa_a_ordem_do_banco(session, desc):
+    # SQLite: nulos são os menores, então vêm primeiro só na ordem crescente
+    primeira = [e.id for e in ordenar(session.query(Egua), Egua.nome, Egua.id, desc).all()]
+    assert primeira == _esperado(desc, nulos_primeiro=not desc)
+    meio = primeira[4]
+    nome = session.get(Egua, meio).nome
+    resto = [e.id for e in ordenar(session.query(Egua), Egua.nome, Egua.id, desc, apos=(nome, meio)).all()]
+    assert resto == primeira[5:]
@@ -0,0 +1,33 @@
+"""As consultas quentes das listagens usam os índices compostos."""
+
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import Session
+
+from models.database import Base
+import models.animals, models.custo_prenhez, models.embryo, models.extras, models.financeiro
+from migrations import autocommit
+from migrations.planos import consultas_quentes, verificar_planos
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'planos.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+def test_consultas_quentes_usam_indice(engine):
+    resultados = verificar_planos(engine)
+    with engine.connect() as conn:
+        assert len(resultados) == len(consultas_quentes(Session(bind=conn)))
+    falhas = [f"{indice}:\n{plano}" for indice, usado, plano in resultados if not usado]
+    assert not falhas, '\n\n'.join(falhas)
+
+def test_autocommit_depois_de_inspecionar(engine):
+    # O inspect abre uma transação; trocar o isolamento sem encerrá-la levanta InvalidRequestError
+    with engine.connect() as conn:
+        assert inspect(conn).has_table('eguas')
+        with autocommit(conn):
+            assert conn.get_execution_options()['isolation_level'] == 'AUTOCOMMIT'
+        assert conn.get_execution_options()['isolation_level'] == conn.default_isolation_level
+        assert inspect(conn).has_table('eguas')
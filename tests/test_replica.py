@@ -0,0 +1,43 @@
+"""Falha da réplica no meio da leitura: @usar_replica repete no primário."""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from conftest import cabecalho
+from auth import middleware
+from models import database
+from models.database import Base
+from models.animals import Egua, Receptora
+from models.custo_prenhez import ItemCusto
+
+@pytest.fixture
+def replica_quebrada(banco, tmp_path, monkeypatch):
+    Base.metadata.create_all(banco)
+    with Session(banco) as session:
+        session.add_all([Egua(tenant_id='haras', nome='Aurora'), Receptora(tenant_id='haras', nome='R1'),
+                         ItemCusto(tenant_id='haras', nome='Hormonio')])
+        session.commit()
+    # Réplica responde ao teste de conexão, mas não tem as tabelas: OperationalError na consulta
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setitem(database._engines, 'replica', replica)
+    monkeypatch.setattr(database, 'replica_url', 'sqlite:///replica')
+    monkeypatch.setattr(middleware, 'replica_url', 'sqlite:///replica')
+    monkeypatch.setattr(middleware, 'replica_disponivel', lambda: True)
+    # Escritas de outros testes deixariam o tenant lendo do primário (read-your-writes)
+    monkeypatch.setattr(database, '_ultimas_escritas', {})
+    marcadas = []
+    monkeypatch.setattr(middleware, 'marcar_replica_indisponivel', lambda: marcadas.append(True))
+    yield marcadas
+    replica.dispose()
+
+@pytest.mark.parametrize('url, nome', [
+    ('/api/animais/eguas', 'Aurora'),
+    ('/api/animais/receptoras', 'R1'),
+    ('/api/custo_prenhez/custo_itens', 'Hormonio'),
+])
+def test_leitura_repetida_no_primario(app, replica_quebrada, url, nome):
+    resposta = app.test_client().get(url, headers=cabecalho(app))
+    assert resposta.status_code == 200
+    assert [item['nome'] for item in resposta.get_json()['itens']] == [nome]
+    assert replica_quebrada == [True]
@@ -0,0 +1,64 @@
+"""Rollup financeiro mensal: backfill da migracao e deltas do after_flush."""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+import migrations
+from models.database import SessaoHaras
+from models.financeiro import TransacaoFinanceira, RollupFinanceiroMensal, reconstruir_rollup
+
+TRANSACOES = [
+    ('t1', 'Receita', 100.0, 'Venda', date(2024, 1, 5)),
+    ('t1', 'Receita', 50.0, 'Venda', date(2024, 1, 20)),
+    ('t1', 'Despesa', 30.0, None, date(2024, 1, 7)),
+    ('t1', 'Despesa', 20.0, '', date(2024, 1, 9)),
+    ('t1', 'Despesa', 10.0, 'Racao', date(2024, 2, 1)),
+    ('t2', 'Receita', 70.0, 'Venda', date(2024, 1, 3)),
+]
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'financeiro.db'}")
+    TransacaoFinanceira.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(TransacaoFinanceira.__table__.insert(), [
+            {'tenant_id': t, 'tipo': tipo, 'valor': v, 'categoria': c, 'data_transacao': d, 'descricao': 'x'}
+            for t, tipo, v, c, d in TRANSACOES])
+    yield engine
+    engine.dispose()
+
+def _rollup(engine):
+    with engine.connect() as conn:
+        return {tuple(l[:5]): (l[5], l[6]) for l in conn.execute(text(
+            "SELECT tenant_id, ano, mes, categoria, tipo, total, quantidade FROM financeiro_rollup_mensal"))}
+
+def test_migracao_grava_o_backfill(engine):
+    migrations.upgrade(engine)
+    assert _rollup(engine) == {
+        ('t1', 2024, 1, 'Venda', 'Receita'): (150.0, 2),
+        # Categoria nula e vazia caem na mesma linha
+        ('t1', 2024, 1, 'Geral', 'Despesa'): (50.0, 2),
+        ('t1', 2024, 2, 'Racao', 'Despesa'): (10.0, 1),
+        ('t2', 2024, 1, 'Venda', 'Receita'): (70.0, 1),
+    }
+
+def test_delta_de_categoria_vazia_cai_na_linha_do_backfill(engine):
+    migrations.upgrade(engine)
+    # SessaoHaras (a do app) e a que dispara o after_flush do rollup
+    session = SessaoHaras(bind=engine)
+    session.get_bind = lambda *a, **kw: engine
+    try:
+        vazia = session.query(TransacaoFinanceira).filter_by(categoria='').one()
+        vazia.valor = 25.0
+        session.add(TransacaoFinanceira(tenant_id='t1', tipo='Despesa', valor=5.0, categoria='',
+                                        descricao='y', data_transacao=date(2024, 1, 10)))
+        session.commit()
+        incremental = _rollup(engine)
+        reconstruir_rollup(session)
+    finally:
+        session.close()
+    assert incremental[('t1', 2024, 1, 'Geral', 'Despesa')] == (60.0, 3)
+    assert _rollup(engine) == incremental
@@ -0,0 +1,23 @@
+"""Limitador de tentativas de login."""
+
+from auth.senhas import LimitadorTentativas, consumir_juntos
+
+def test_por_minuto_zero_desliga_o_limite():
+    limitador = LimitadorTentativas(1, 0)
+    assert all(limitador.consumir('a') == 0 for _ in range(5))
+
+def test_bloqueio_de_um_balde_nao_gasta_o_outro():
+    ip, email = LimitadorTentativas(3, 1), LimitadorTentativas(1, 1)
+    assert consumir_juntos((ip, '1.2.3.4'), (email, 'a@haras.com')) == 0
+    # E-mail sem ficha: a tentativa é recusada e o IP não perde a dele
+    for _ in range(4):
+        assert consumir_juntos((ip, '1.2.3.4'), (email, 'a@haras.com')) > 0
+    assert consumir_juntos((ip, '1.2.3.4'), (email, 'b@haras.com')) == 0
+    assert consumir_juntos((ip, '1.2.3.4'), (email, 'c@haras.com')) == 0
+    assert consumir_juntos((ip, '1.2.3.4'), (email, 'd@haras.com')) > 0
+
+def test_espera_e_a_maior_entre_os_baldes():
+    rapido, lento = LimitadorTentativas(1, 60), LimitadorTentativas(1, 6)
+    consumir_juntos((rapido, 'x'), (lento, 'x'))
+    espera = consumir_juntos((rapido, 'x'), (lento, 'x'))
+    assert 9 < espera <= 10
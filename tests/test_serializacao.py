@@ -0,0 +1,34 @@
+"""Listas em streaming continuam sendo JSON válido quando a geração falha."""
+
+import json
+
+from flask import Flask
+
+from routes.serializacao import JSONProviderRapido, lista_streaming
+
+def _app(itens, **kwargs):
+    app = Flask(__name__)
+    app.json = JSONProviderRapido(app)
+
+    @app.route('/lista')
+    def lista():
+        return lista_streaming(itens(), **kwargs)
+
+    return app
+
+def test_lista_em_pedacos():
+    app = _app(lambda: ({'id': i} for i in range(7)), lote=3)
+    resposta = app.test_client().get('/lista')
+    assert json.loads(resposta.data) == [{'id': i} for i in range(7)]
+
+def test_erro_no_meio_fecha_a_lista(caplog):
+    def itens():
+        for i in range(5):
+            yield {'id': i}
+        raise ZeroDivisionError('custo por oocito')
+
+    app = _app(itens, lote=2)
+    resposta = app.test_client().get('/lista')
+    assert resposta.status_code == 200
+    assert json.loads(resposta.data) == [{'id': 0}, {'id': 1}, {'id': 2}, {'id': 3}]
+    assert 'ZeroDivisionError' in caplog.text
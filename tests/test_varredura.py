@@ -0,0 +1,44 @@
+"""Varredura Monte-Carlo: limites do servidor e pool de processos do worker."""
+
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from ai import genetic_match_engine as motor
+
+REC = SimpleNamespace(valor_potro_estimado=30000.0, custo_estimado=10000.0,
+                      taxa_prenhez_prevista=0.6, roi_estimado=0.8)
+
+def test_amostras_limitadas_pelo_servidor(monkeypatch):
+    monkeypatch.setattr(motor, 'MAX_AMOSTRAS', 1000)
+    resultado = motor.MotorGenetico().varrer_cenarios(REC, n_amostras=10 ** 9, seed=1)
+    assert resultado['n_amostras'] == 1000
+
+@pytest.mark.parametrize('processos', ['4', 2.5, True, [2]])
+def test_processos_invalido(processos):
+    with pytest.raises(ValueError):
+        motor.MotorGenetico().varrer_cenarios(REC, processos=processos)
+
+def test_pool_compartilhado_entre_chamadas(monkeypatch):
+    monkeypatch.setattr(motor, 'LIMIAR_PROCESSOS', 1000)
+    monkeypatch.setattr(motor, 'MAX_PROCESSOS', 2)
+    monkeypatch.setattr(motor, '_pool', None)
+    m = motor.MotorGenetico()
+    primeiro = m.varrer_cenarios(REC, preco={'min': -0.3, 'max': 0.3}, n_amostras=5000, seed=7, processos=64)
+    pool = motor._pool
+    assert pool is not None and pool._max_workers == 2
+    segundo = m.varrer_cenarios(REC, preco={'min': -0.3, 'max': 0.3}, n_amostras=5000, seed=7, processos=2)
+    assert motor._pool is pool
+    assert primeiro['roi'] == segundo['roi']
+    motor._descartar_pool(pool)
+
+def test_pool_nao_usa_fork():
+    assert motor.CONTEXTO_PROCESSOS.get_start_method() in ('forkserver', 'spawn')
+
+def test_grade_com_custo_zero():
+    resultado = motor.MotorGenetico().varrer_cenarios(REC, custo={'min': -1.0, 'max': 0.0},
+                                                      n_amostras=1000, seed=3)
+    roi = resultado['grade']['roi']
+    assert all(math.isfinite(v) for linha in roi for v in linha)
+    assert all(linha[0] == 0.0 for linha in roi)